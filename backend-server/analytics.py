@@ -0,0 +1,362 @@
+import hashlib
+import json
+import math
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from history_store import student_id_for
+
+DIMENSIONS = ("classification", "country", "career_stage")
+BUCKET_FORMATS = ("hour", "day", "week", "month")
+
+# Trailing "(Advanced)" style levels on programming languages in the profile summary
+LEVEL_SUFFIX_RE = re.compile(r"\s*\([^)]*\)\s*$")
+
+
+def normalize_skill(skill: str) -> str:
+    return " ".join(LEVEL_SUFFIX_RE.sub("", skill).lower().split())
+
+
+def career_stage(profile_summary: Dict[str, Any]) -> str:
+    """student, entry, early_career or experienced, from enrollment status and job history"""
+    education = profile_summary.get("education") or {}
+    enrollment = (education.get("enrollment_status") or "").lower()
+    highest = (education.get("highest_education") or "").lower()
+    if (("student" in enrollment or "enrolled" in enrollment) and "not" not in enrollment) or "pursuing" in highest:
+        return "student"
+    job_titles = (profile_summary.get("professional_experience") or {}).get("job_titles") or []
+    if len(job_titles) >= 2:
+        return "experienced"
+    return "early_career" if job_titles else "entry"
+
+
+def time_bucket(timestamp: Optional[str], bucket: str = "day") -> Optional[str]:
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    if bucket == "hour":
+        return moment.strftime("%Y-%m-%dT%H")
+    if bucket == "week":
+        year, week, _ = moment.isocalendar()
+        return f"{year}-W{week:02d}"
+    if bucket == "month":
+        return moment.strftime("%Y-%m")
+    return moment.strftime("%Y-%m-%d")
+
+
+def result_facts(result_data: Dict[str, Any], bucket: str = "day") -> Dict[str, Any]:
+    """What one stored result contributes to the cohort aggregates"""
+    summary = result_data.get("profile_summary") or {}
+    technical = summary.get("technical_skills") or {}
+    learning = summary.get("learning_preferences") or {}
+    skills = {
+        normalize_skill(skill)
+        for key in ("programming_languages", "software_proficiency", "other_technical_skills")
+        for skill in technical.get(key) or []
+    }
+    return {
+        "bucket": time_bucket(result_data.get("timestamp"), bucket),
+        "classification": result_data.get("classification") or "unclassified",
+        "country": (summary.get("personal_info") or {}).get("location") or "unknown",
+        "career_stage": career_stage(summary),
+        "skills": sorted(skill for skill in skills if skill),
+        # Skills the student says they still need to acquire
+        "missing_skills": sorted({normalize_skill(skill) for skill in learning.get("skills_to_acquire") or []} - {""}),
+    }
+
+
+class CohortAnalytics:
+    """Cohort aggregates kept up to date on every result write, so reading them never scans history.
+
+    - counts: exact counts per dimension for the current cohort (bucket "all", one entry per student,
+      replaced when the student is re-analyzed) and analyses per time bucket (activity trend)
+    - sketch: count-min sketches of skill frequency per classification and cohort-wide ("*")
+    - top_items: the top_k skills per scope, tracked by their sketch estimates
+    - contributions: what each student's latest result added to the current cohort, taken back out in
+      the same transaction when the student is re-analyzed
+
+    Everything lives in SQLite (WAL), so every server process updates and reads the same aggregates.
+    submit() hands a result to a background writer thread that applies up to batch_size queued results
+    per transaction, so a save never waits on the analytics write lock.
+    """
+
+    def __init__(
+        self,
+        path: str = "analytics.db",
+        bucket: str = "day",
+        width: int = 2048,
+        depth: int = 4,
+        top_k: int = 20,
+        retention: int = 365,
+        batch_size: int = 100
+    ):
+        if bucket not in BUCKET_FORMATS:
+            raise ValueError(f"Unknown analytics bucket: {bucket}")
+        self.path = path
+        self.bucket = bucket
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.retention = retention
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._latest_bucket: Optional[str] = None
+        self.reconnect()
+
+    def reconnect(self):
+        """Open a fresh connection (a forked worker must not reuse its parent's, nor has its writer thread)"""
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS counts (
+                bucket TEXT NOT NULL,
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (bucket, dimension, value)
+            );
+            CREATE TABLE IF NOT EXISTS sketch (
+                kind TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                col INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (kind, row, col)
+            );
+            CREATE TABLE IF NOT EXISTS top_items (
+                kind TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                item TEXT NOT NULL,
+                estimate INTEGER NOT NULL,
+                PRIMARY KEY (kind, scope, item)
+            );
+            CREATE INDEX IF NOT EXISTS idx_top_items_estimate ON top_items(kind, scope, estimate);
+            CREATE TABLE IF NOT EXISTS contributions (
+                student TEXT PRIMARY KEY,
+                facts TEXT NOT NULL
+            );
+            """
+        )
+
+    def _cells(self, key: str) -> List[tuple]:
+        # blake2b rather than hash(), which is salted per process
+        return [
+            (row, int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8, salt=row.to_bytes(8, "big")).digest(), "big") % self.width)
+            for row in range(self.depth)
+        ]
+
+    def _count(self, bucket: str, facts: Dict[str, Any], delta: int):
+        self._conn.executemany(
+            """INSERT INTO counts (bucket, dimension, value, count) VALUES (?, ?, ?, ?)
+               ON CONFLICT(bucket, dimension, value) DO UPDATE SET count = count + excluded.count""",
+            [(bucket, dimension, facts[dimension], delta) for dimension in DIMENSIONS],
+        )
+
+    def _sketch_add(self, kind: str, key: str, delta: int) -> int:
+        """Add delta to a key's count-min cells and return its new estimate"""
+        cells = self._cells(key)
+        self._conn.executemany(
+            """INSERT INTO sketch (kind, row, col, count) VALUES (?, ?, ?, ?)
+               ON CONFLICT(kind, row, col) DO UPDATE SET count = count + excluded.count""",
+            [(kind, row, col, delta) for row, col in cells],
+        )
+        condition = " OR ".join("(row = ? AND col = ?)" for _ in cells)
+        (estimate,) = self._conn.execute(
+            f"SELECT MIN(count) FROM sketch WHERE kind = ? AND ({condition})",
+            [kind] + [value for cell in cells for value in cell],
+        ).fetchone()
+        return max(0, estimate or 0)
+
+    def _offer(self, kind: str, scope: str, item: str, estimate: int):
+        """Keep the scope's top_k items by estimate"""
+        tracked = self._conn.execute(
+            "SELECT 1 FROM top_items WHERE kind = ? AND scope = ? AND item = ?", (kind, scope, item)
+        ).fetchone()
+        if tracked:
+            if estimate > 0:
+                self._conn.execute(
+                    "UPDATE top_items SET estimate = ? WHERE kind = ? AND scope = ? AND item = ?", (estimate, kind, scope, item)
+                )
+            else:
+                self._conn.execute("DELETE FROM top_items WHERE kind = ? AND scope = ? AND item = ?", (kind, scope, item))
+            return
+        if estimate <= 0:
+            return
+        (size,) = self._conn.execute("SELECT COUNT(*) FROM top_items WHERE kind = ? AND scope = ?", (kind, scope)).fetchone()
+        if size >= self.top_k:
+            smallest = self._conn.execute(
+                "SELECT item, estimate FROM top_items WHERE kind = ? AND scope = ? ORDER BY estimate LIMIT 1", (kind, scope)
+            ).fetchone()
+            if estimate <= smallest[1]:
+                return
+            self._conn.execute("DELETE FROM top_items WHERE kind = ? AND scope = ? AND item = ?", (kind, scope, smallest[0]))
+        self._conn.execute(
+            "INSERT INTO top_items (kind, scope, item, estimate) VALUES (?, ?, ?, ?)", (kind, scope, item, estimate)
+        )
+
+    def _apply(self, facts: Dict[str, Any], delta: int):
+        self._count("all", facts, delta)
+        for kind, items in (("skills", facts["skills"]), ("missing_skills", facts["missing_skills"])):
+            for scope in ("*", facts["classification"]):
+                for item in items:
+                    self._offer(kind, scope, item, self._sketch_add(kind, f"{scope}\x1f{item}", delta))
+
+    def submit(self, result_data: Dict[str, Any]):
+        """Queue a newly written result for the writer thread; returns at once"""
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._write_queued, name="cohort-analytics", daemon=True)
+                    self._writer.start()
+        self._queue.put(result_data)
+
+    def flush(self):
+        """Wait until every submitted result has been applied"""
+        self._queue.join()
+
+    def _write_queued(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.record(*batch)
+            except Exception as e:
+                print(f"Warning: could not update cohort analytics: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def record(self, *results: Dict[str, Any]):
+        """Add newly written results in one transaction, each first removing its student's previous contribution.
+
+        Contributions are keyed like the history store, by email, or by name when the profile has none.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for result_data in results:
+                    self._record(result_data)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _record(self, result_data: Dict[str, Any]):
+        facts = result_facts(result_data, self.bucket)
+        student = student_id_for(result_data)
+        # Read under the write lock, so concurrent re-analyses of one student each replace exactly one contribution
+        row = self._conn.execute("SELECT facts FROM contributions WHERE student = ?", (student,)).fetchone()
+        if row is not None:
+            self._apply(json.loads(row[0]), -1)
+        self._apply(facts, 1)
+        self._conn.execute("INSERT OR REPLACE INTO contributions (student, facts) VALUES (?, ?)", (student, json.dumps(facts)))
+        if facts["bucket"] is not None:
+            # Bucket rows count analyses as they happen, so re-analyses are not subtracted
+            self._count(facts["bucket"], facts, 1)
+            self._prune(facts["bucket"])
+
+    def _prune(self, bucket: str):
+        if bucket == self._latest_bucket:
+            return
+        self._latest_bucket = bucket
+        stale = self._conn.execute(
+            "SELECT DISTINCT bucket FROM counts WHERE bucket != 'all' ORDER BY bucket DESC LIMIT -1 OFFSET ?", (self.retention,)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM counts WHERE bucket = ?", stale)
+
+    def snapshot(self, buckets: int = 30, top: Optional[int] = None) -> Dict[str, Any]:
+        """The current aggregates; cost depends on the number of buckets and distinct values, not on history"""
+        top = min(top or self.top_k, self.top_k)
+        with self._lock:
+            totals = self._conn.execute("SELECT dimension, value, count FROM counts WHERE bucket = 'all' AND count > 0").fetchall()
+            recent = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT bucket FROM counts WHERE bucket != 'all' ORDER BY bucket DESC LIMIT ?", (buckets,)
+            )]
+            trend_rows = self._conn.execute(
+                f"SELECT bucket, dimension, value, count FROM counts WHERE bucket IN ({','.join('?' * len(recent))})", recent
+            ).fetchall() if recent else []
+            top_rows = self._conn.execute(
+                "SELECT kind, scope, item, estimate FROM top_items ORDER BY kind, scope, estimate DESC, item"
+            ).fetchall()
+
+        current = {dimension: {} for dimension in DIMENSIONS}
+        for dimension, value, count in totals:
+            current[dimension][value] = count
+        trends = {bucket: {dimension: {} for dimension in DIMENSIONS} for bucket in sorted(recent)}
+        for bucket, dimension, value, count in trend_rows:
+            trends[bucket][dimension][value] = count
+        tops: Dict[str, Dict[str, List[Dict[str, Any]]]] = {"skills": {}, "missing_skills": {}}
+        for kind, scope, item, estimate in top_rows:
+            ranked = tops[kind].setdefault(scope, [])
+            if len(ranked) < top:
+                ranked.append({"skill": item, "estimate": estimate})
+
+        students = sum(current["classification"].values())
+        return {
+            "students": students,
+            "classification": dict(sorted(current["classification"].items(), key=lambda item: -item[1])),
+            "country": dict(sorted(current["country"].items(), key=lambda item: -item[1])),
+            "career_stage": current["career_stage"],
+            "bucket": self.bucket,
+            "trends": [{"bucket": bucket, **counts} for bucket, counts in trends.items()],
+            "top_skills": tops["skills"],
+            "top_missing_skills": tops["missing_skills"],
+            # Count-min estimates never undercount, and overcount by at most error * skill mentions with probability 1 - delta
+            "sketch": {"width": self.width, "depth": self.depth, "error": round(math.e / self.width, 6), "delta": round(math.exp(-self.depth), 6)},
+        }
+
+    def clear(self):
+        self.flush()
+        with self._lock:
+            self._conn.executescript("DELETE FROM counts; DELETE FROM sketch; DELETE FROM top_items; DELETE FROM contributions;")
+        self._latest_bucket = None
+
+    def rebuild(self, results: Iterable[Dict[str, Any]]) -> int:
+        """Recompute everything from stored results (one pass over history)"""
+        self.clear()
+        count = 0
+        batch = []
+        for result_data in results:
+            batch.append(result_data)
+            if len(batch) >= self.batch_size:
+                self.record(*batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.record(*batch)
+            count += len(batch)
+        return count
+
+
+def create_analytics() -> CohortAnalytics:
+    """Build the aggregates store from the ANALYTICS_* environment variables"""
+    return CohortAnalytics(
+        os.getenv("ANALYTICS_DB_PATH", "analytics.db"),
+        bucket=os.getenv("ANALYTICS_BUCKET", "day"),
+        top_k=int(os.getenv("ANALYTICS_TOP_K", "20"))
+    )
+
+
+if __name__ == "__main__":
+    # Usage: python analytics.py rebuild  (uses RESULT_STORE and ANALYTICS_* like the server)
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("Usage: python analytics.py rebuild")
+        sys.exit(1)
+    from result_store import create_result_store
+    analytics = create_analytics()
+    count = analytics.rebuild(create_result_store().iter_results())
+    print(f"Rebuilt cohort analytics from {count} results into {analytics.path}")
@@ -0,0 +1,131 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+class StudentClassification(BaseModel):
+    student_id: str = Field(description="The id in square brackets before the student's profile, e.g. 's3'")
+    classification: str = Field(description="Specific career classification")
+    confidence: float = Field(ge=0, le=1, description="Confidence in the classification from 0 to 1")
+
+
+class BatchClassification(BaseModel):
+    classifications: List[StudentClassification] = Field(description="Exactly one entry per student id, in any order")
+
+
+class _Pending:
+    __slots__ = ("text", "tokens", "usage", "future")
+
+    def __init__(self, text: str, tokens: int, usage: Any, future: asyncio.Future):
+        self.text = text
+        self.tokens = tokens
+        self.usage = usage
+        self.future = future
+
+
+class ClassificationBatcher:
+    """Packs concurrent single-student classification requests into multi-student model calls.
+
+    A batch is sent when it reaches the current batch size or token budget, or when the collection
+    window expires. The batch size adapts: it halves after a response with missing or mismatched
+    entries and grows by one after a clean one. Students without a valid entry resolve to None so the
+    caller can classify them individually.
+
+    A batch serves several requests, so it runs in a fresh context rather than in that of whichever request
+    filled it; run_batch gets each member's usage accumulator so it can share the call's tokens among them.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Tuple[str, str]], List[Any]], Awaitable[List[StudentClassification]]],
+        max_batch_size: int = 8,
+        token_budget: int = 6000,
+        window: float = 0.05
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.token_budget = token_budget
+        self.window = window
+        self.batch_size = max_batch_size
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.batches = 0
+        self.batched_students = 0
+        self.requeued = 0
+        self.failed_batches = 0
+
+    async def classify(self, text: str, tokens: int, usage: Any = None) -> Optional[StudentClassification]:
+        """Queue one compact profile; resolves to its classification, or None if the batch gave no valid entry for it"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_Pending(text, tokens, usage, future))
+        if len(self._pending) >= self.batch_size or sum(item.tokens for item in self._pending) >= self.token_budget:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            # Take as many waiting students as fit the current batch size and token budget (at least one)
+            batch, tokens = [], 0
+            while self._pending and len(batch) < self.batch_size and (not batch or tokens + self._pending[0].tokens <= self.token_budget):
+                item = self._pending.pop(0)
+                batch.append(item)
+                tokens += item.tokens
+            task = contextvars.Context().run(asyncio.ensure_future, self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            if len(self._pending) < self.batch_size:
+                break
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+
+    async def _run(self, batch: List[_Pending]):
+        ids = [f"s{index + 1}" for index in range(len(batch))]
+        self.batches += 1
+        self.batched_students += len(batch)
+        try:
+            entries = await self.run_batch(list(zip(ids, (item.text for item in batch))), [item.usage for item in batch])
+        except Exception:
+            self.failed_batches += 1
+            entries = []
+
+        by_id: Dict[str, Optional[StudentClassification]] = {}
+        for entry in entries:
+            if entry.student_id in by_id and by_id[entry.student_id] is not None and by_id[entry.student_id].classification != entry.classification:
+                # Two different answers for one student: trust neither
+                by_id[entry.student_id] = None
+            elif entry.student_id not in by_id:
+                by_id[entry.student_id] = entry if entry.classification.strip() else None
+
+        missing = 0
+        for student_id, item in zip(ids, batch):
+            entry = by_id.get(student_id)
+            if entry is None:
+                missing += 1
+            if not item.future.done():
+                item.future.set_result(entry)
+        self.requeued += missing
+        unknown_ids = set(by_id) - set(ids)
+        if missing or unknown_ids:
+            self.batch_size = max(1, self.batch_size // 2)
+        else:
+            self.batch_size = min(self.max_batch_size, self.batch_size + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "current_batch_size": self.batch_size,
+            "token_budget": self.token_budget,
+            "window_seconds": self.window,
+            "batches": self.batches,
+            "batched_students": self.batched_students,
+            "avg_batch_size": round(self.batched_students / self.batches, 2) if self.batches else 0.0,
+            "requeued": self.requeued,
+            "failed_batches": self.failed_batches,
+        }
@@ -0,0 +1,211 @@
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from skill_classifier import CLUSTER_PROFILE_TYPES, LEVEL_WEIGHTS, SOURCE_WEIGHTS, SkillClassifier
+
+# Fields describing skills a student already has; the rest describe skills they want
+HELD_FIELDS = ("otherTechnicalSkills", "softwareProficiency")
+WANTED_FIELDS = ("knowledgeAreas", "skillsToAcquire")
+
+# A held skill counts as covered from this credit upwards when finding gaps
+COVERED_THRESHOLD = 0.5
+
+
+def _field(profile: Any, name: str) -> Any:
+    return profile.get(name, []) if isinstance(profile, dict) else getattr(profile, name)
+
+
+def iter_evidence(profile: Any) -> Iterator[Tuple[str, float, bool]]:
+    """Yield (phrase, weight, held) skill evidence from a profile model or raw dict"""
+    for lang in _field(profile, "programmingLanguages"):
+        name = lang["name"] if isinstance(lang, dict) else lang.name
+        level = lang.get("level", "") if isinstance(lang, dict) else lang.level
+        yield name, SOURCE_WEIGHTS["programmingLanguages"] * LEVEL_WEIGHTS.get(level.strip().lower(), 0.8), True
+    for cert in _field(profile, "certifications"):
+        yield (cert["name"] if isinstance(cert, dict) else cert.name), SOURCE_WEIGHTS["certifications"], True
+    for field in HELD_FIELDS:
+        for item in _field(profile, field):
+            yield item, SOURCE_WEIGHTS[field], True
+    for field in WANTED_FIELDS:
+        for item in _field(profile, field):
+            yield item, SOURCE_WEIGHTS[field], False
+
+
+def _student_name(profile: Any) -> str:
+    return profile.get("fullName", "") if isinstance(profile, dict) else profile.fullName
+
+
+class CohortScorer:
+    """Scores whole cohorts against the skill taxonomy with sparse matrix operations"""
+
+    def __init__(self, classifier: SkillClassifier):
+        self.classifier = classifier
+        self.cluster_names = classifier.cluster_names
+        self.n_skills = len(classifier.skills)
+        cluster_of_skill = np.array([cluster_idx for cluster_idx, _ in classifier.skills])
+        canonical = ~np.array(classifier.skill_is_alias)
+        # skill x cluster membership, and the same restricted to the taxonomy's own skill names
+        self.skill_cluster = sparse.csr_matrix(
+            (np.ones(self.n_skills), (np.arange(self.n_skills), cluster_of_skill)),
+            shape=(self.n_skills, len(self.cluster_names)),
+        )
+        self.canonical_cluster = sparse.csr_matrix(
+            (np.ones(canonical.sum()), (np.flatnonzero(canonical), cluster_of_skill[canonical])),
+            shape=(self.n_skills, len(self.cluster_names)),
+        )
+        self.canonical_sizes = np.asarray(self.canonical_cluster.sum(axis=0)).ravel()
+        self.profile_types = [CLUSTER_PROFILE_TYPES.get(name, name) for name in self.cluster_names]
+
+    def encode(self, profiles: Iterable[Any]) -> Tuple[sparse.csr_matrix, sparse.csr_matrix, List[str]]:
+        """Encode profiles into weighted-evidence and held-skill student x skill matrices"""
+        rows, cols, weights = [], [], []
+        names = []
+        # A cohort repeats the same skill phrases, so each distinct phrase is matched once per call
+        phrase_matches: Dict[str, List[Tuple[int, float]]] = {}
+        for row, profile in enumerate(profiles):
+            names.append(_student_name(profile))
+            for phrase, weight, held in iter_evidence(profile):
+                if not phrase:
+                    continue
+                matches = phrase_matches.get(phrase)
+                if matches is None:
+                    matches = phrase_matches[phrase] = list(self.classifier.match_phrase(phrase).items())
+                for skill_id, coverage in matches:
+                    rows.append(row)
+                    cols.append(skill_id)
+                    weights.append((coverage * weight, coverage if held else 0.0))
+        shape = (len(names), self.n_skills)
+        values = np.array(weights, dtype=np.float64).reshape(-1, 2)
+        row_idx = np.array(rows, dtype=np.int64)
+        col_idx = np.array(cols, dtype=np.int64)
+        # Duplicate (student, skill) entries are summed, then capped at one full match per skill
+        evidence = sparse.csr_matrix((values[:, 0], (row_idx, col_idx)), shape=shape).minimum(1.0).tocsr()
+        held = sparse.csr_matrix((values[:, 1], (row_idx, col_idx)), shape=shape).minimum(1.0).tocsr()
+        return evidence, held, names
+
+    def score(self, profiles: Iterable[Any], include_students: bool = True, top_missing: int = 5) -> Dict[str, Any]:
+        """Cluster affinity and skill-gap scores for every student, plus cohort rollups"""
+        evidence, held, names = self.encode(profiles)
+        affinity = (evidence @ self.skill_cluster).toarray()
+        coverage = (held @ self.canonical_cluster).toarray() / self.canonical_sizes
+        gaps = np.clip(1.0 - coverage, 0.0, 1.0)
+
+        has_evidence = affinity.sum(axis=1) > 0
+        top_cluster = affinity.argmax(axis=1)
+
+        covered = (held >= COVERED_THRESHOLD).astype(np.float64).tocsc()
+        cohort_clusters = {}
+        for cluster_idx, cluster_name in enumerate(self.cluster_names):
+            members = np.flatnonzero(has_evidence & (top_cluster == cluster_idx))
+            cluster_skills = self.canonical_cluster[:, cluster_idx].nonzero()[0]
+            entry = {
+                "students": int(members.size),
+                "mean_affinity": round(float(affinity[:, cluster_idx].mean()), 4) if len(names) else 0.0,
+                "mean_gap": round(float(gaps[:, cluster_idx].mean()), 4) if len(names) else 0.0,
+                "top_missing_skills": [],
+            }
+            if members.size:
+                have = np.asarray(covered[members][:, cluster_skills].sum(axis=0)).ravel()
+                missing = members.size - have
+                order = np.argsort(-missing, kind="stable")[:top_missing]
+                entry["top_missing_skills"] = [
+                    {"skill": self.classifier.skill_names[cluster_skills[i]], "students_missing": int(missing[i])}
+                    for i in order if missing[i] > 0
+                ]
+            cohort_clusters[cluster_name] = entry
+
+        result = {
+            "total_students": len(names),
+            "clusters": self.cluster_names,
+            "cohort": cohort_clusters,
+        }
+        if include_students:
+            result["students"] = [
+                {
+                    "student_name": names[i],
+                    "top_cluster": self.cluster_names[top_cluster[i]] if has_evidence[i] else None,
+                    "profile_type": self.profile_types[top_cluster[i]] if has_evidence[i] else None,
+                    "affinity": np.round(affinity[i], 4).tolist(),
+                    "gap": np.round(gaps[i], 4).tolist(),
+                }
+                for i in range(len(names))
+            ]
+        return result
+
+
+def synthetic_profiles(classifier: SkillClassifier, count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Random flat-format profiles drawn from the taxonomy's skills, for benchmarking"""
+    rng = random.Random(seed)
+    skills = classifier.skill_names
+    levels = list(LEVEL_WEIGHTS)
+    extras = ["Python", "JavaScript", "Git", "Excel", "Project Management", "Public Speaking"]
+    profiles = []
+    for i in range(count):
+        profiles.append({
+            "fullName": f"Student {i}",
+            "programmingLanguages": [{"name": rng.choice(extras[:2] + ["Solidity", "Rust"]), "level": rng.choice(levels)}],
+            "otherTechnicalSkills": rng.sample(skills, 4) + [rng.choice(extras)],
+            "softwareProficiency": [rng.choice(extras)],
+            "certifications": [],
+            "knowledgeAreas": rng.sample(skills, 1),
+            "skillsToAcquire": rng.sample(skills, 2),
+        })
+    return profiles
+
+
+def run_benchmark(scorer: CohortScorer, count: int) -> Dict[str, Any]:
+    """Time encoding and full scoring of count synthetic profiles"""
+    profiles = synthetic_profiles(scorer.classifier, count)
+    start = time.perf_counter()
+    evidence, _, _ = scorer.encode(profiles)
+    encode_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    scorer.score(profiles, include_students=False)
+    total_seconds = time.perf_counter() - start
+    return {
+        "profiles": count,
+        "encode_seconds": round(encode_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "profiles_per_second": round(count / total_seconds),
+        "nonzeros": int(evidence.nnz),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a cohort of student profiles against the skill taxonomy")
+    parser.add_argument("input", nargs="?", help='JSON file in the API format: {"students": [...]}')
+    parser.add_argument("--output", help="Write results to this file instead of stdout")
+    parser.add_argument("--summary-only", action="store_true", help="Omit per-student rows")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="Score N synthetic profiles and report timings")
+    args = parser.parse_args()
+
+    scorer = CohortScorer(SkillClassifier.from_file())
+    if args.benchmark:
+        print(json.dumps(run_benchmark(scorer, args.benchmark), indent=2))
+        return
+    if not args.input:
+        parser.error("input file is required unless --benchmark is given")
+
+    with open(args.input, "r") as f:
+        students = json.load(f)["students"]
+    start = time.perf_counter()
+    result = scorer.score(students, include_students=not args.summary_only)
+    print(f"Scored {len(students)} profiles in {time.perf_counter() - start:.3f}s", file=sys.stderr)
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import gzip
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Streamed responses (NDJSON, SSE) must reach the client chunk by chunk, so they are never compressed
+_STREAMING_TYPES = (b"application/x-ndjson", b"text/event-stream")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, preferring brotli when it is available"""
+    offered = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip()] = quality
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete (non-streamed) response bodies above a size threshold with br or gzip"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers", []))
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            response_headers = list(start_message.get("headers", []))
+            names = {name.lower(): value for name, value in response_headers}
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or b"content-encoding" in names
+                or names.get(b"content-type", b"").split(b";")[0].strip() in _STREAMING_TYPES
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding, self.gzip_level, self.brotli_quality)
+            response_headers = [(name, value) for name, value in response_headers if name.lower() != b"content-length"]
+            response_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,238 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+EXPORT_FORMATS = ("ndjson", "csv", "parquet")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+FILE_EXTENSIONS = {"ndjson": "ndjson", "csv": "csv", "parquet": "parquet"}
+
+# Separator for list values in CSV cells
+CSV_LIST_SEPARATOR = "; "
+
+# Flat columns of an exported result: (column, is_list). The profile_summary columns follow the layout
+# of main.create_profile_summary, one column per field, named section.field
+RESULT_COLUMNS: List[Tuple[str, bool]] = [
+    ("student_name", False),
+    ("classification", False),
+    ("timestamp", False),
+    ("analysis_version", False),
+    ("recommendations", True),
+]
+PROFILE_LAYOUT: Dict[str, Optional[Tuple[Tuple[str, bool], ...]]] = {
+    "personal_info": (("name", False), ("email", False), ("location", False), ("employment_status", False)),
+    "education": (
+        ("highest_education", False), ("fields_of_study", True), ("institutions", True),
+        ("graduation_year", False), ("enrollment_status", False),
+    ),
+    "technical_skills": (("programming_languages", True), ("software_proficiency", True), ("other_technical_skills", True)),
+    "soft_skills": (
+        ("communication", False), ("teamwork", False), ("problem_solving", False),
+        ("leadership", False), ("time_management", False),
+    ),
+    "languages": None,
+    "certifications": None,
+    "professional_experience": (
+        ("job_titles", True), ("employers", True), ("employment_duration", True), ("key_responsibilities", True),
+    ),
+    "volunteer_work": None,
+    "career_goals": (
+        ("short_term", False), ("long_term", False), ("preferred_industries", True),
+        ("desired_job_titles", True), ("motivation", False),
+    ),
+    "learning_preferences": (
+        ("learning_style", True), ("skills_to_acquire", True), ("knowledge_areas", True), ("learning_challenges", True),
+    ),
+    "support_needs": (
+        ("preferred_feedback", True), ("support_needed", True), ("positive_aspects", False), ("areas_for_improvement", False),
+    ),
+}
+# Sections given as None are plain lists
+COLUMNS: List[Tuple[str, bool]] = RESULT_COLUMNS + [
+    column
+    for section, fields in PROFILE_LAYOUT.items()
+    for column in ([(section, True)] if fields is None else [(f"{section}.{name}", is_list) for name, is_list in fields])
+]
+
+
+def _cell(value: Any, is_list: bool) -> Any:
+    if is_list:
+        if value is None:
+            return []
+        return [str(item) for item in value] if isinstance(value, list) else [str(value)]
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+
+
+def flatten_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """One stored result as a flat row of COLUMNS, with profile_summary spread into section.field columns"""
+    row = {name: _cell(result.get(name), is_list) for name, is_list in RESULT_COLUMNS}
+    summary = result.get("profile_summary") or {}
+    for section, fields in PROFILE_LAYOUT.items():
+        values = summary.get(section)
+        if fields is None:
+            row[section] = _cell(values, True)
+            continue
+        values = values if isinstance(values, dict) else {}
+        for name, is_list in fields:
+            row[f"{section}.{name}"] = _cell(values.get(name), is_list)
+    return row
+
+
+def _chunks(results: Iterable[Dict[str, Any]], chunk_rows: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for result in results:
+        chunk.append(result)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_ndjson(results: Iterable[Dict[str, Any]], chunk_rows: int = 1000) -> Iterator[bytes]:
+    """Results exactly as stored, one JSON object per line"""
+    for chunk in _chunks(results, chunk_rows):
+        yield "".join(json.dumps(result, default=str) + "\n" for result in chunk).encode()
+
+
+def export_csv(results: Iterable[Dict[str, Any]], chunk_rows: int = 1000) -> Iterator[bytes]:
+    """Flattened results with a header row; list cells are joined with CSV_LIST_SEPARATOR"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in COLUMNS])
+    for chunk in _chunks(results, chunk_rows):
+        for result in chunk:
+            row = flatten_result(result)
+            writer.writerow([CSV_LIST_SEPARATOR.join(row[name]) if is_list else row[name] for name, is_list in COLUMNS])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever has been written since the last drain"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_schema():
+    import pyarrow as pa
+    return pa.schema([(name, pa.list_(pa.string()) if is_list else pa.string()) for name, is_list in COLUMNS])
+
+
+def export_parquet(results: Iterable[Dict[str, Any]], chunk_rows: int = 1000) -> Iterator[bytes]:
+    """Flattened results as Parquet, one row group per chunk, streamed as each row group is written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for chunk in _chunks(results, chunk_rows):
+            rows = [flatten_result(result) for result in chunk]
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+EXPORTERS = {"ndjson": export_ndjson, "csv": export_csv, "parquet": export_parquet}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_results(results: Iterable[Dict[str, Any]], format: str = "ndjson", chunk_rows: int = 1000) -> Iterator[bytes]:
+    """Encode results as a stream of byte chunks in one of EXPORT_FORMATS"""
+    if format not in EXPORTERS:
+        raise ValueError(f"Unknown export format: {format}")
+    return EXPORTERS[format](results, chunk_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export stored analysis results (uses RESULT_STORE like the server)")
+    parser.add_argument("output", help="File to write, or - for stdout")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=None, help="Default: from the output file extension, else ndjson")
+    parser.add_argument("--since", default=None, help="Only results analyzed at or after this ISO timestamp")
+    parser.add_argument("--until", default=None, help="Only results analyzed at or before this ISO timestamp")
+    parser.add_argument("--classification", default=None)
+    parser.add_argument("--state", default=None, help="JSON file holding the position of the last exported result; the export resumes strictly after it and updates it")
+    parser.add_argument("--chunk-rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    format = args.format or next((name for name, ext in FILE_EXTENSIONS.items() if args.output.endswith(f".{ext}")), "ndjson")
+    after = None
+    if args.state and args.since is None and os.path.exists(args.state):
+        with open(args.state) as f:
+            state = json.load(f)
+        if state.get("last_timestamp") is not None:
+            # A state without last_key resumes after every result at last_timestamp
+            after = (state["last_timestamp"], state.get("last_key"))
+
+    from result_store import create_result_store
+    store = create_result_store()
+    watermark = {"count": 0, "cursor": after}
+
+    def tracked(results: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for result in results:
+            watermark["count"] += 1
+            cursor = store.cursor(result)
+            # The JSON file store yields in filename order, so keep the furthest position seen
+            if watermark["cursor"] is None or cursor > (watermark["cursor"][0], watermark["cursor"][1] or ""):
+                watermark["cursor"] = cursor
+            yield result
+
+    results = store.iter_results(classification=args.classification, since=args.since, until=args.until, after=after)
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for chunk in export_results(tracked(results), format, args.chunk_rows):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+    last_timestamp, last_key = watermark["cursor"] or (None, None)
+    if args.state:
+        with open(args.state, "w") as f:
+            json.dump({"last_timestamp": last_timestamp, "last_key": last_key}, f)
+    print(f"Exported {watermark['count']} results as {format} (last timestamp {last_timestamp})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
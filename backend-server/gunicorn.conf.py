@@ -0,0 +1,42 @@
+# Production serving: gunicorn -c gunicorn.conf.py main:app (run from backend-server/)
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count(), 8))))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Import main once in the master so workers fork with the models, agents and taxonomy already built
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "600"))
+graceful_timeout = 30
+keepalive = 5
+
+# Workers share the provider quota and combine their Prometheus metrics; both must be set before main is imported
+os.environ.setdefault("RATE_LIMITER", "sqlite")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="student-analysis-metrics-"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def when_ready(server):
+    # Build agents and the cohort scorer once in the master so every forked worker starts warm;
+    # model HTTP clients are left to each worker's own warm-up
+    import main
+    main.run_warm_up(model_clients=False)
+
+
+def post_fork(server, worker):
+    import main
+    main.reconnect_after_fork()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    if os.path.basename(metrics_dir).startswith("student-analysis-metrics-"):
+        shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -0,0 +1,484 @@
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from result_store import ResultStore, keyset_pages, result_summary, safe_student_name
+
+# Record frame: payload length, CRC32 of the payload, record kind; the payload is zlib-compressed JSON
+FRAME_HEADER = struct.Struct(">IIc")
+BLOB_RECORD = b"B"
+VERSION_RECORD = b"V"
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+
+
+def student_id_for(result_data: Dict[str, Any]) -> str:
+    """Stable id for a student's history: their email, or their name when the profile has none"""
+    personal_info = (result_data.get("profile_summary") or {}).get("personal_info") or {}
+    email = (personal_info.get("email") or "").strip().lower()
+    return email or f"name:{safe_student_name(result_data.get('student_name') or 'unknown')}"
+
+
+def parse_frame(data: bytes, offset: int) -> Optional[Tuple[bytes, Dict[str, Any], int]]:
+    """The intact frame at offset in a segment's bytes as (kind, payload, length), or None"""
+    size, crc, kind = FRAME_HEADER.unpack_from(data, offset)
+    length = FRAME_HEADER.size + size
+    if kind not in (BLOB_RECORD, VERSION_RECORD) or offset + length > len(data):
+        return None
+    payload = data[offset + FRAME_HEADER.size:offset + length]
+    if zlib.crc32(payload) != crc:
+        return None
+    try:
+        return kind, json.loads(zlib.decompress(payload)), length
+    except (zlib.error, ValueError):
+        return None
+
+
+def next_frame(data: bytes, offset: int) -> int:
+    """Offset of the next intact frame at or after offset, or the end of data"""
+    while offset + FRAME_HEADER.size <= len(data):
+        if parse_frame(data, offset) is not None:
+            return offset
+        offset += 1
+    return len(data)
+
+
+def content_hash(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+
+class HistoryStore:
+    """Append-only analysis history.
+
+    Each analysis is a new version record appended to the current segment file; segments roll over at
+    segment_bytes and are never rewritten. Profile summaries are stored once per distinct content hash,
+    so a re-analysis of an unchanged profile appends only its small version record. An SQLite index maps
+    every version and blob to its segment offset and keeps each student's latest version.
+
+    Writers serialize on the index's write lock, so several server processes can append safely.
+    """
+
+    def __init__(self, directory: str = "analysis_history", segment_bytes: int = 64 * 1024 * 1024, compression_level: int = 6, blob_cache_size: int = 256):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.compression_level = compression_level
+        self.blob_cache_size = blob_cache_size
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._blob_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._fds: Dict[int, int] = {}
+        self._segment = 1
+        self.reconnect()
+
+    def reconnect(self):
+        """Open a fresh index connection and segment handles (a forked worker must not reuse its parent's)"""
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+        self._conn = sqlite3.connect(os.path.join(self.directory, "index.db"), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS versions (
+                student_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                student_name TEXT,
+                classification TEXT,
+                timestamp TEXT,
+                profile_hash TEXT,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                PRIMARY KEY (student_id, version)
+            );
+            CREATE INDEX IF NOT EXISTS idx_versions_timestamp ON versions(student_id, timestamp);
+            CREATE TABLE IF NOT EXISTS latest (
+                student_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                safe_name TEXT,
+                student_name TEXT,
+                classification TEXT,
+                timestamp TEXT,
+                analysis_version TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_latest_name ON latest(safe_name, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_latest_classification_timestamp ON latest(classification, timestamp);
+            DROP INDEX IF EXISTS idx_latest_timestamp;
+            CREATE INDEX IF NOT EXISTS idx_latest_timestamp_student ON latest(timestamp, student_id);
+            """
+        )
+        segments = self._segments()
+        self._segment = segments[-1] if segments else 1
+
+    # Segments
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{segment:06d}{SEGMENT_SUFFIX}")
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _frame(self, kind: bytes, payload: Dict[str, Any]) -> bytes:
+        data = zlib.compress(json.dumps(payload, separators=(",", ":"), default=str).encode(), self.compression_level)
+        return FRAME_HEADER.pack(len(data), zlib.crc32(data), kind) + data
+
+    def _append(self, frames: List[bytes]) -> List[Tuple[int, int, int]]:
+        """Append frames to the active segment; must be called holding the index write lock"""
+        # Another process may have rolled over to a new segment since this one last wrote
+        while os.path.exists(self._segment_path(self._segment + 1)):
+            self._segment += 1
+        path = self._segment_path(self._segment)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        total = sum(len(frame) for frame in frames)
+        if size and size + total > self.segment_bytes:
+            self._segment += 1
+            path = self._segment_path(self._segment)
+            size = 0
+        locations = []
+        with open(path, "ab") as f:
+            try:
+                for frame in frames:
+                    f.write(frame)
+                    locations.append((self._segment, size, len(frame)))
+                    size += len(frame)
+                f.flush()
+            except BaseException:
+                # Leave no partial frame for the next append to land behind
+                f.truncate(locations[0][1] if locations else size)
+                raise
+        return locations
+
+    def _truncate(self, location: Tuple[int, int, int]):
+        """Drop frames appended by a transaction that did not commit"""
+        segment, offset, _ = location
+        with open(self._segment_path(segment), "r+b") as f:
+            f.truncate(offset)
+
+    def _read(self, segment: int, offset: int, length: int) -> Tuple[bytes, Dict[str, Any]]:
+        fd = self._fds.get(segment)
+        if fd is None:
+            opened = os.open(self._segment_path(segment), os.O_RDONLY)
+            fd = self._fds.setdefault(segment, opened)
+            if fd != opened:
+                os.close(opened)
+        frame = os.pread(fd, length, offset)
+        size, crc, kind = FRAME_HEADER.unpack_from(frame)
+        data = frame[FRAME_HEADER.size:FRAME_HEADER.size + size]
+        if len(data) != size or zlib.crc32(data) != crc:
+            raise ValueError(f"Corrupt history record in segment {segment} at offset {offset}")
+        return kind, json.loads(zlib.decompress(data))
+
+    # Writes
+
+    def append(self, result_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Append a new version of a student's analysis; returns its student_id and version"""
+        student_id = student_id_for(result_data)
+        summary = result_data.get("profile_summary")
+        profile_hash = content_hash(summary) if summary is not None else None
+        record = {key: value for key, value in result_data.items() if key != "profile_summary"}
+        locations: List[Tuple[int, int, int]] = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT version FROM latest WHERE student_id = ?", (student_id,)).fetchone()
+                version = (row[0] if row else 0) + 1
+                record.update(student_id=student_id, version=version, profile_hash=profile_hash)
+                frames = []
+                new_blob = profile_hash is not None and self._conn.execute(
+                    "SELECT 1 FROM blobs WHERE hash = ?", (profile_hash,)
+                ).fetchone() is None
+                if new_blob:
+                    frames.append(self._frame(BLOB_RECORD, {"hash": profile_hash, "profile_summary": summary}))
+                frames.append(self._frame(VERSION_RECORD, record))
+                locations = self._append(frames)
+                if new_blob:
+                    self._conn.execute("INSERT INTO blobs (hash, segment, offset, length) VALUES (?, ?, ?, ?)", (profile_hash, *locations[0]))
+                self._index_version(record, locations[-1])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                if locations:
+                    self._truncate(locations[0])
+                raise
+        return {"student_id": student_id, "version": version, "segment": locations[-1][0]}
+
+    def _index_version(self, record: Dict[str, Any], location: Tuple[int, int, int]):
+        self._conn.execute(
+            """INSERT OR REPLACE INTO versions
+               (student_id, version, student_name, classification, timestamp, profile_hash, segment, offset, length)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (record["student_id"], record["version"], record.get("student_name"), record.get("classification"),
+             record.get("timestamp"), record.get("profile_hash"), *location),
+        )
+        self._conn.execute(
+            """INSERT INTO latest (student_id, version, safe_name, student_name, classification, timestamp, analysis_version)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(student_id) DO UPDATE SET
+                   version = excluded.version, safe_name = excluded.safe_name, student_name = excluded.student_name,
+                   classification = excluded.classification, timestamp = excluded.timestamp,
+                   analysis_version = excluded.analysis_version
+               WHERE excluded.version >= latest.version""",
+            (record["student_id"], record["version"], safe_student_name(record.get("student_name") or ""),
+             record.get("student_name"), record.get("classification"), record.get("timestamp"),
+             record.get("analysis_version", "2.0.0")),
+        )
+
+    # Reads
+
+    def _blob(self, profile_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cached = self._blob_cache.get(profile_hash)
+            if cached is not None:
+                self._blob_cache.move_to_end(profile_hash)
+                return cached
+            row = self._conn.execute("SELECT segment, offset, length FROM blobs WHERE hash = ?", (profile_hash,)).fetchone()
+        if row is None:
+            return None
+        _, payload = self._read(*row)
+        with self._lock:
+            self._blob_cache[profile_hash] = payload["profile_summary"]
+            if len(self._blob_cache) > self.blob_cache_size:
+                self._blob_cache.popitem(last=False)
+        return payload["profile_summary"]
+
+    def _load(self, location: Tuple[int, int, int], include_profile: bool = True) -> Dict[str, Any]:
+        _, record = self._read(*location)
+        profile_hash = record.pop("profile_hash", None)
+        record.pop("student_id", None)
+        version = record.pop("version", None)
+        if include_profile and profile_hash is not None:
+            record["profile_summary"] = self._blob(profile_hash)
+        record["version"] = version
+        return record
+
+    def get(self, student_id: str, version: Optional[int] = None, include_profile: bool = True) -> Optional[Dict[str, Any]]:
+        """One version of a student's analysis, the latest by default"""
+        with self._lock:
+            if version is None:
+                row = self._conn.execute(
+                    """SELECT v.segment, v.offset, v.length FROM latest l
+                       JOIN versions v ON v.student_id = l.student_id AND v.version = l.version WHERE l.student_id = ?""",
+                    (student_id,),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT segment, offset, length FROM versions WHERE student_id = ? AND version = ?", (student_id, version)
+                ).fetchone()
+        return self._load(row, include_profile) if row else None
+
+    def history(self, student_id: str, since: Optional[str] = None, until: Optional[str] = None, limit: int = 50, offset: int = 0, include_profile: bool = False) -> Dict[str, Any]:
+        """A student's versions, newest first, read straight from their segment offsets"""
+        clauses, params = ["student_id = ?"], [student_id]
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        where = " AND ".join(clauses)
+        with self._lock:
+            (total,) = self._conn.execute(f"SELECT COUNT(*) FROM versions WHERE {where}", params).fetchone()
+            rows = self._conn.execute(
+                f"SELECT segment, offset, length FROM versions WHERE {where} ORDER BY version DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return {
+            "student_id": student_id,
+            "versions": [self._load(row, include_profile) for row in rows],
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+        }
+
+    def student_id_by_name(self, student_name: str) -> Optional[str]:
+        """The most recently analyzed student with this name"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT student_id FROM latest WHERE safe_name = ? ORDER BY timestamp DESC LIMIT 1", (safe_student_name(student_name),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def list_latest(self, classification=None, since=None, until=None, limit=100, offset=0) -> Dict[str, Any]:
+        clauses, params = [], []
+        if classification:
+            clauses.append("classification = ?")
+            params.append(classification)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            (total,) = self._conn.execute(f"SELECT COUNT(*) FROM latest {where}", params).fetchone()
+            rows = self._conn.execute(
+                f"""SELECT student_id, student_name, classification, timestamp, analysis_version, version FROM latest {where}
+                    ORDER BY timestamp DESC LIMIT ? OFFSET ?""",
+                params + [limit, offset],
+            ).fetchall()
+        results = [
+            {"student_name": name, "classification": label, "timestamp": timestamp, "analysis_version": analysis_version,
+             "student_id": student_id, "version": version}
+            for student_id, name, label, timestamp, analysis_version, version in rows
+        ]
+        return {"results": results, "total": total, "limit": limit, "offset": offset}
+
+    def iter_latest(self, classification=None, since=None, until=None, batch_size=500, after=None) -> Iterator[Dict[str, Any]]:
+        """Every student's latest version in (timestamp, student_id) order, batch_size index rows at a time"""
+        clauses, params = [], []
+        if classification:
+            clauses.append("l.classification = ?")
+            params.append(classification)
+        if since:
+            clauses.append("l.timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("l.timestamp <= ?")
+            params.append(until)
+
+        def fetch(condition: str, page_params: List[Any]) -> List[tuple]:
+            where = " AND ".join(clauses + [condition])
+            with self._lock:
+                return self._conn.execute(
+                    f"""SELECT l.timestamp, l.student_id, v.segment, v.offset, v.length FROM latest l
+                        JOIN versions v ON v.student_id = l.student_id AND v.version = l.version WHERE {where}
+                        ORDER BY l.timestamp, l.student_id LIMIT ?""",
+                    params + page_params + [batch_size],
+                ).fetchall()
+
+        for rows in keyset_pages(fetch, "l.timestamp", "l.student_id", batch_size, after, include_null=not (since or until)):
+            for row in rows:
+                yield self._load(row[2:])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (versions,) = self._conn.execute("SELECT COUNT(*) FROM versions").fetchone()
+            (students,) = self._conn.execute("SELECT COUNT(*) FROM latest").fetchone()
+            (blobs,) = self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()
+        segments = self._segments()
+        return {
+            "students": students,
+            "versions": versions,
+            "profile_blobs": blobs,
+            # Versions that reused an already stored profile summary
+            "deduplicated_profiles": max(0, versions - blobs),
+            "segments": len(segments),
+            "segment_bytes": sum(os.path.getsize(self._segment_path(segment)) for segment in segments),
+        }
+
+    def rebuild_index(self) -> int:
+        """Recreate the index by scanning every segment (after losing or corrupting index.db)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("blobs", "versions", "latest"):
+                    self._conn.execute(f"DELETE FROM {table}")
+                count = 0
+                for segment in self._segments():
+                    with open(self._segment_path(segment), "rb") as f:
+                        data = f.read()
+                    offset = 0
+                    while offset + FRAME_HEADER.size <= len(data):
+                        frame = parse_frame(data, offset)
+                        if frame is None:
+                            # A torn write: skip to the next intact frame, which a later append may have written
+                            skipped = offset
+                            offset = next_frame(data, offset + 1)
+                            print(f"Warning: skipped {offset - skipped} torn bytes in history segment {segment} at offset {skipped}")
+                            continue
+                        kind, payload, length = frame
+                        if kind == BLOB_RECORD:
+                            self._conn.execute(
+                                "INSERT OR IGNORE INTO blobs (hash, segment, offset, length) VALUES (?, ?, ?, ?)",
+                                (payload["hash"], segment, offset, length),
+                            )
+                        else:
+                            self._index_version(payload, (segment, offset, length))
+                            count += 1
+                        offset += length
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+
+class HistoryResultStore(ResultStore):
+    """RESULT_STORE=history: the history store's latest versions serve the regular result endpoints"""
+
+    def __init__(self, history: HistoryStore):
+        self.history = history
+
+    def save(self, result_data: Dict[str, Any]) -> str:
+        appended = self.history.append(result_data)
+        return f"{self.history.directory}#{appended['student_id']}@{appended['version']}"
+
+    def get(self, student_name: str) -> Optional[Dict[str, Any]]:
+        student_id = self.history.student_id_by_name(student_name)
+        if student_id is None:
+            return None
+        result = self.history.get(student_id)
+        if result is not None:
+            result.pop("version", None)
+        return result
+
+    def reconnect(self):
+        self.history.reconnect()
+
+    def list(self, classification=None, since=None, until=None, limit=100, offset=0) -> Dict[str, Any]:
+        page = self.history.list_latest(classification, since, until, limit, offset)
+        page["results"] = [result_summary(result) for result in page["results"]]
+        return page
+
+    def iter_results(self, classification=None, since=None, until=None, batch_size=500, after=None) -> Iterator[Dict[str, Any]]:
+        for result in self.history.iter_latest(classification, since, until, batch_size, after):
+            result.pop("version", None)
+            yield result
+
+    def cursor(self, result_data: Dict[str, Any]) -> Tuple[str, str]:
+        return result_data.get("timestamp") or "", student_id_for(result_data)
+
+
+def create_history_store() -> HistoryStore:
+    return HistoryStore(
+        os.getenv("HISTORY_DIR", "analysis_history"),
+        segment_bytes=int(os.getenv("HISTORY_SEGMENT_MB", "64")) * 1024 * 1024
+    )
+
+
+if __name__ == "__main__":
+    # Usage: python history_store.py import   - append every result in the current RESULT_STORE as a version
+    #        python history_store.py reindex  - rebuild index.db from the segment files
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command not in ("import", "reindex"):
+        print("Usage: python history_store.py import|reindex")
+        sys.exit(1)
+    history = create_history_store()
+    if command == "reindex":
+        print(f"Indexed {history.rebuild_index()} versions from {history.directory}")
+    else:
+        from result_store import create_result_store
+        count = 0
+        for result in create_result_store().iter_results():
+            history.append(result)
+            count += 1
+        print(f"Imported {count} results into {history.directory}")
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from prompt_builder import compact, serialize
+
+# Profile summary sections that can change a student's classification; edits elsewhere
+# (personal info, languages, soft skills, support needs) keep the stored one
+CLASSIFICATION_SECTIONS = (
+    "education", "technical_skills", "certifications", "professional_experience",
+    "volunteer_work", "career_goals", "learning_preferences"
+)
+
+PLANS = ("full", "recommend", "reuse")
+
+
+def section_fingerprints(profile_summary: Dict[str, Any]) -> Dict[str, str]:
+    """Hash each top-level section of a profile summary, ignoring blank values and whitespace"""
+    return {
+        section: hashlib.sha256(serialize(compact(value)).encode("utf-8")).hexdigest()[:16]
+        for section, value in profile_summary.items()
+    }
+
+
+def student_key(email: str) -> str:
+    return email.strip().lower()
+
+
+class ReanalysisPlan(NamedTuple):
+    plan: str
+    changed_sections: List[str]
+
+
+def plan_reanalysis(
+    previous: Optional[Dict[str, str]],
+    current: Dict[str, str],
+    recommendation_sections: Sequence[str],
+    classification_sections: Sequence[str] = CLASSIFICATION_SECTIONS
+) -> ReanalysisPlan:
+    """Decide what to rerun: everything, recommendations only, or nothing"""
+    if previous is None:
+        return ReanalysisPlan("full", sorted(current))
+    changed = sorted(section for section in set(previous) | set(current) if previous.get(section) != current.get(section))
+    if any(section in classification_sections for section in changed):
+        return ReanalysisPlan("full", changed)
+    if any(section in recommendation_sections for section in changed):
+        return ReanalysisPlan("recommend", changed)
+    return ReanalysisPlan("reuse", changed)
+
+
+class FingerprintStore:
+    """SQLite store of each student's last section fingerprints and analysis outputs"""
+
+    def __init__(self, path: str = "fingerprints.db"):
+        self.path = path
+        self.plans = {plan: 0 for plan in PLANS}
+        self._lock = threading.Lock()
+        self.reconnect()
+
+    def reconnect(self):
+        """Open a fresh connection (a forked worker must not reuse its parent's)"""
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS profile_fingerprints (
+                student_key TEXT PRIMARY KEY,
+                fingerprints TEXT NOT NULL,
+                classification TEXT NOT NULL,
+                confidence REAL,
+                classification_source TEXT NOT NULL,
+                recommendations TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the last stored analysis for a student, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT fingerprints, classification, confidence, classification_source, recommendations, updated_at
+                   FROM profile_fingerprints WHERE student_key = ?""",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        fingerprints, classification, confidence, source, recommendations, updated_at = row
+        return {
+            "fingerprints": json.loads(fingerprints),
+            "classification": classification,
+            "confidence": confidence,
+            "classification_source": source,
+            "recommendations": json.loads(recommendations),
+            "updated_at": updated_at,
+        }
+
+    def save(self, key: str, fingerprints: Dict[str, str], classification: str, confidence: Optional[float], source: str, recommendations: List[str]):
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO profile_fingerprints
+                   (student_key, fingerprints, classification, confidence, classification_source, recommendations, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (key, json.dumps(fingerprints, sort_keys=True), classification, confidence, source, json.dumps(recommendations), time.time()),
+            )
+
+    def record_plan(self, plan: str):
+        self.plans[plan] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (students,) = self._conn.execute("SELECT COUNT(*) FROM profile_fingerprints").fetchone()
+        planned = sum(self.plans.values())
+        return {
+            "students": students,
+            "plans": dict(self.plans),
+            "reused_classification_rate": round((self.plans["recommend"] + self.plans["reuse"]) / planned, 4) if planned else 0.0,
+            "reused_everything_rate": round(self.plans["reuse"] / planned, 4) if planned else 0.0,
+        }
@@ -0,0 +1,161 @@
+import codecs
+import json
+import re
+from typing import Any, AsyncIterable, AsyncIterator, Iterator, List
+
+_STUDENTS_ARRAY_RE = re.compile(r'"students"\s*:\s*\[')
+_SKIPPABLE = " \t\r\n,"
+_NUMBER_CHARS = "0123456789.eE+-"
+
+# Chunk size for reading upload files from disk
+READ_CHUNK_SIZE = 64 * 1024
+
+# A single element (or the document preamble) larger than this is treated as malformed input
+MAX_ELEMENT_CHARS = 16 * 1024 * 1024
+
+
+class JSONArrayStreamParser:
+    """Incrementally decodes the elements of a top-level JSON array or a {"students": [...]} document"""
+
+    def __init__(self, max_element_chars: int = MAX_ELEMENT_CHARS):
+        self.max_element_chars = max_element_chars
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "preamble"
+
+    def feed(self, text: str) -> List[Any]:
+        """Add text and return every element completed by it"""
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        if self._state == "preamble":
+            self._find_array_start()
+
+        items = []
+        while self._state == "elements":
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _SKIPPABLE:
+                self._pos += 1
+            if self._pos >= len(self._buffer):
+                break
+            if self._buffer[self._pos] == "]":
+                self._pos += 1
+                self._state = "done"
+                break
+            try:
+                item, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if len(self._buffer) - self._pos > self.max_element_chars:
+                    raise ValueError(f"Array element exceeds {self.max_element_chars} characters or is malformed")
+                break
+            # A bare number running to the end of the buffer may continue in the next chunk
+            if isinstance(item, (int, float)) and not isinstance(item, bool):
+                tail = end
+                while tail < len(self._buffer) and self._buffer[tail] in _NUMBER_CHARS:
+                    tail += 1
+                if tail == len(self._buffer):
+                    break
+            items.append(item)
+            self._pos = end
+        return items
+
+    def _find_array_start(self):
+        stripped = self._buffer.lstrip("\ufeff \t\r\n")
+        if not stripped:
+            return
+        if stripped[0] == "[":
+            self._pos = len(self._buffer) - len(stripped) + 1
+            self._state = "elements"
+        elif stripped[0] == "{":
+            match = _STUDENTS_ARRAY_RE.search(self._buffer)
+            if match:
+                self._pos = match.end()
+                self._state = "elements"
+            elif len(self._buffer) > self.max_element_chars:
+                raise ValueError('No "students" array found')
+        else:
+            raise ValueError('Expected a JSON array or an object with a "students" array')
+
+    def close(self):
+        """Check that the array was terminated"""
+        if self._state != "done":
+            raise ValueError("Unexpected end of input inside the students array")
+
+
+def _parse_ndjson_line(line: bytes, line_number: int) -> Any:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+
+
+async def aiter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """Yield array elements from a streamed JSON document as soon as each one is complete"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parser = JSONArrayStreamParser()
+    async for chunk in chunks:
+        for item in parser.feed(decoder.decode(chunk)):
+            yield item
+    for item in parser.feed(decoder.decode(b"", final=True)):
+        yield item
+    parser.close()
+
+
+async def aiter_ndjson(chunks: AsyncIterable[bytes], max_line_bytes: int = MAX_ELEMENT_CHARS) -> AsyncIterator[Any]:
+    """Yield one record per non-blank line of a streamed NDJSON document"""
+    # The unfinished line is kept as its chunks, and only each new chunk is searched for newlines
+    pending: List[bytes] = []
+    pending_bytes = 0
+    line_number = 0
+    async for chunk in chunks:
+        *lines, rest = chunk.split(b"\n")
+        if lines:
+            lines[0] = b"".join(pending + [lines[0]])
+            pending, pending_bytes = [], 0
+        for line in lines:
+            line_number += 1
+            if len(line) > max_line_bytes:
+                raise ValueError(f"Line {line_number} exceeds {max_line_bytes} bytes")
+            if line.strip():
+                yield _parse_ndjson_line(line, line_number)
+        if rest:
+            pending.append(rest)
+            pending_bytes += len(rest)
+            if pending_bytes > max_line_bytes:
+                raise ValueError(f"Line {line_number + 1} exceeds {max_line_bytes} bytes")
+    last = b"".join(pending)
+    if last.strip():
+        yield _parse_ndjson_line(last, line_number + 1)
+
+
+def iter_json_array_file(filepath: str) -> Iterator[Any]:
+    """Yield array elements from a JSON file without loading the whole document"""
+    parser = JSONArrayStreamParser()
+    with open(filepath, "r", encoding="utf-8") as f:
+        while True:
+            text = f.read(READ_CHUNK_SIZE)
+            if not text:
+                break
+            yield from parser.feed(text)
+    parser.close()
+
+
+def iter_ndjson_file(filepath: str) -> Iterator[Any]:
+    """Yield one record per non-blank line of an NDJSON file"""
+    with open(filepath, "rb") as f:
+        line_number = 0
+        while True:
+            line = f.readline(MAX_ELEMENT_CHARS + 1)
+            if not line:
+                break
+            line_number += 1
+            if len(line) > MAX_ELEMENT_CHARS and not line.endswith(b"\n"):
+                raise ValueError(f"Line {line_number} exceeds {MAX_ELEMENT_CHARS} bytes")
+            if line.strip():
+                yield _parse_ndjson_line(line, line_number)
+
+
+def iter_records_file(filepath: str) -> Iterator[Any]:
+    """Stream student records from a .ndjson/.jsonl file or a JSON array document"""
+    if filepath.endswith((".ndjson", ".jsonl")):
+        return iter_ndjson_file(filepath)
+    return iter_json_array_file(filepath)
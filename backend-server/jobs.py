@@ -0,0 +1,250 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class JobStore:
+    """SQLite persistence for analysis jobs and their per-student results"""
+
+    def __init__(self, path: str = "jobs.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.reconnect()
+
+    def reconnect(self):
+        """Open a fresh connection (a forked worker must not reuse its parent's)"""
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                total INTEGER NOT NULL,
+                use_cache INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                student TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                result TEXT,
+                completed_at REAL,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items(status);
+            """
+        )
+        # Process id of the worker analyzing a running item (added for multi-worker serving)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(job_items)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE job_items ADD COLUMN owner INTEGER")
+
+    def create_job(self, students: List[Dict[str, Any]], use_cache: bool = True) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, total, use_cache, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, len(students), int(use_cache), time.time()),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, idx, student) VALUES (?, ?, ?)",
+                ((job_id, idx, json.dumps(student)) for idx, student in enumerate(students)),
+            )
+            self._conn.execute("COMMIT")
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT total, use_cache, created_at FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            counts = dict(
+                self._conn.execute(
+                    "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+                ).fetchall()
+            )
+        total, use_cache, created_at = job
+        return {"job_id": job_id, "total": total, "use_cache": bool(use_cache), "created_at": created_at, "counts": counts}
+
+    def load_student(self, job_id: str, idx: int) -> Dict[str, Any]:
+        with self._lock:
+            (student,) = self._conn.execute(
+                "SELECT student FROM job_items WHERE job_id = ? AND idx = ?", (job_id, idx)
+            ).fetchone()
+        return json.loads(student)
+
+    def claim(self, job_id: str, idx: int) -> bool:
+        """Mark a pending item running for this process; False if another worker got it first"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE job_items SET status = 'running', owner = ? WHERE job_id = ? AND idx = ? AND status = 'pending'",
+                (os.getpid(), job_id, idx),
+            )
+        return cursor.rowcount == 1
+
+    def release_stale(self) -> int:
+        """Return items left running by processes that no longer exist to pending"""
+        with self._lock:
+            owners = [owner for (owner,) in self._conn.execute("SELECT DISTINCT owner FROM job_items WHERE status = 'running'")]
+            # This process has only just started, so anything recorded under its pid is from a previous one
+            stale = [owner for owner in owners if owner is None or owner == os.getpid() or not process_alive(owner)]
+            released = 0
+            for owner in stale:
+                released += self._conn.execute(
+                    "UPDATE job_items SET status = 'pending', owner = NULL WHERE status = 'running' AND owner IS ?", (owner,)
+                ).rowcount
+        return released
+
+    def save_result(self, job_id: str, idx: int, result: Dict[str, Any]):
+        status = "success" if result.get("status") == "success" else "error"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, result = ?, completed_at = ? WHERE job_id = ? AND idx = ?",
+                (status, json.dumps(result, default=str), time.time(), job_id, idx),
+            )
+
+    def completed_results(self, job_id: str) -> List[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, result FROM job_items WHERE job_id = ? AND result IS NOT NULL ORDER BY completed_at",
+                (job_id,),
+            ).fetchall()
+        return [(idx, json.loads(result)) for idx, result in rows]
+
+    def unfinished_items(self) -> List[Tuple[str, int, bool]]:
+        """Items still waiting to be analyzed, oldest job first"""
+        with self._lock:
+            return [
+                (job_id, idx, bool(use_cache))
+                for job_id, idx, use_cache in self._conn.execute(
+                    """SELECT i.job_id, i.idx, j.use_cache FROM job_items i JOIN jobs j ON j.job_id = i.job_id
+                       WHERE i.status = 'pending' ORDER BY j.created_at, i.idx"""
+                ).fetchall()
+            ]
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize a job's item counts into a status response"""
+    counts = job["counts"]
+    succeeded = counts.get("success", 0)
+    failed = counts.get("error", 0)
+    done = succeeded + failed
+    if done == job["total"]:
+        status = "completed"
+    elif done or counts.get("running", 0):
+        status = "running"
+    else:
+        status = "queued"
+    return {
+        "job_id": job["job_id"],
+        "status": status,
+        "total": job["total"],
+        "completed": done,
+        "succeeded": succeeded,
+        "failed": failed,
+        "pending": job["total"] - done,
+    }
+
+
+class JobManager:
+    """Background worker pool that analyzes job items and streams results to listeners"""
+
+    def __init__(
+        self,
+        store: JobStore,
+        analyze: Callable[[Dict[str, Any], bool], Awaitable[Dict[str, Any]]],
+        workers: int = 16,
+        poll_interval: float = 1.0
+    ):
+        self.store = store
+        self.analyze = analyze
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._listeners: Dict[str, List[asyncio.Queue]] = {}
+
+    async def start(self):
+        """Start the workers and re-queue anything left unfinished by a previous process"""
+        self._queue = asyncio.Queue()
+        self.store.release_stale()
+        # With several server processes each one queues every pending item; claim() lets only one run it
+        for item in self.store.unfinished_items():
+            self._queue.put_nowait(item)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, students: List[Dict[str, Any]], use_cache: bool = True) -> str:
+        job_id = self.store.create_job(students, use_cache)
+        for idx in range(len(students)):
+            self._queue.put_nowait((job_id, idx, use_cache))
+        return job_id
+
+    async def _worker(self):
+        while True:
+            job_id, idx, use_cache = await self._queue.get()
+            try:
+                if not self.store.claim(job_id, idx):
+                    continue
+                try:
+                    result = await self.analyze(self.store.load_student(job_id, idx), use_cache)
+                except Exception as e:
+                    result = {"error": str(e), "status": "error"}
+                self.store.save_result(job_id, idx, result)
+                for listener in self._listeners.get(job_id, []):
+                    listener.put_nowait((idx, result))
+            finally:
+                self._queue.task_done()
+
+    async def stream(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield each result of a job as it completes, starting with those already done"""
+        job = self.store.get_job(job_id)
+        if job is None:
+            return
+        listener: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(job_id, []).append(listener)
+        try:
+            sent = set()
+            for idx, result in self.store.completed_results(job_id):
+                sent.add(idx)
+                yield result
+            while len(sent) < job["total"]:
+                try:
+                    completed = [await asyncio.wait_for(listener.get(), timeout=self.poll_interval)]
+                except asyncio.TimeoutError:
+                    # Items may be running in another server process, whose results only reach the store
+                    completed = self.store.completed_results(job_id)
+                for idx, result in completed:
+                    if idx in sent:
+                        continue
+                    sent.add(idx)
+                    yield result
+        finally:
+            self._listeners[job_id].remove(listener)
+            if not self._listeners[job_id]:
+                del self._listeners[job_id]
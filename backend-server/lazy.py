@@ -0,0 +1,44 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """A value built on first get(); thread-safe, so the startup warm-up and a request can race for it"""
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._built = False
+        self._lock = threading.Lock()
+        self.build_seconds: Optional[float] = None
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def get(self) -> T:
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    started = time.perf_counter()
+                    self._value = self._factory()
+                    self.build_seconds = time.perf_counter() - started
+                    self._built = True
+        return self._value
+
+
+def warm_up(steps: Iterable[Callable[[], Any]]) -> Dict[str, Any]:
+    """Run warm-up steps in order, timing each; a failing step is reported and does not stop the rest"""
+    report: Dict[str, Any] = {}
+    for step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+            report[step.__name__] = {"seconds": round(time.perf_counter() - started, 4)}
+        except Exception as e:
+            print(f"Warning: warm-up step {step.__name__} failed: {e}")
+            report[step.__name__] = {"seconds": round(time.perf_counter() - started, 4), "error": str(e)}
+    return report
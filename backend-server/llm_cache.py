@@ -0,0 +1,107 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def normalize_profile_summary(profile_summary: Dict[str, Any]) -> str:
+    """Serialize a profile summary canonically so equal profiles hash equally"""
+    return json.dumps(profile_summary, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def make_cache_key(profile_summary: Dict[str, Any], system_prompt: str, model_name: str, extra: str = "") -> str:
+    """Build a content-addressed cache key for an agent call"""
+    digest = hashlib.sha256()
+    for part in (normalize_profile_summary(profile_summary), system_prompt, model_name, extra):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed cache of agent responses with TTL and LRU eviction"""
+
+    def __init__(self, path: str = "llm_cache.db", ttl_seconds: int = 7 * 24 * 3600, max_entries: int = 10000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.reconnect()
+
+    def reconnect(self):
+        """Open a fresh connection (a forked worker must not reuse its parent's)"""
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str):
+        """Store a value and evict the least recently used entries over capacity"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def clear(self):
+        """Remove every cached entry and reset counters"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
@@ -1,13 +1,42 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, validator
-from pydantic_ai import Agent
-from typing import List, Optional, Dict, Any, Union
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Union, AsyncIterator, Tuple
 import json
 import os
 import asyncio
+import time
 from datetime import datetime
-import uvicorn
+
+from llm_cache import LLMCache, make_cache_key
+from scheduler import LLMScheduler, RateLimiter, SQLiteRateLimiter, estimate_tokens, lane_var, max_queue_seconds_var, tenant_var
+from jobs import JobManager, JobStore, job_status
+from result_store import create_result_store
+from history_store import HistoryResultStore, create_history_store
+from analytics import create_analytics
+from recommendation_library import RecommendationLibrary, skill_gap
+from export import EXPORT_FORMATS, FILE_EXTENSIONS, MEDIA_TYPES, export_results, parquet_available
+from skill_classifier import DEFAULT_TAXONOMY_PATH, SkillClassifier
+from prompt_builder import PromptBuilder, batch_prompt, select_sections
+from ingestion import aiter_json_array, aiter_ndjson
+from model_router import create_model_router
+from incremental import FingerprintStore, plan_reanalysis, section_fingerprints, student_key
+from single_flight import SingleFlight, request_fingerprint
+from batch_classifier import BatchClassification, ClassificationBatcher, StudentClassification
+from compression import CompressionMiddleware
+from lazy import Lazy, warm_up
+from metrics import (
+    ANALYSES, COALESCED_ANALYSES, CONTENT_TYPE_LATEST, INCREMENTAL_PLANS, MetricsMiddleware, in_flight, observe_request_parsing,
+    record_cache_lookup, record_llm_call, record_queue_wait, render_metrics, request_id_var, span, stage, start_trace
+)
+
+if TYPE_CHECKING:
+    # pydantic_ai, SciPy and NumPy are imported on first use (or by the startup warm-up) to keep cold starts fast
+    from pydantic_ai import Agent
+    from pydantic_ai.usage import Usage
+    from batch_scoring import CohortScorer
+    from semantic_cache import SemanticCache
 
 # Data Models - Updated to match frontend structure
 class ProgrammingLanguage(BaseModel):
@@ -105,6 +134,7 @@ class ClassificationResult(BaseModel):
     student_name: str
     classification: str
     confidence: Optional[float] = None
+    source: str = "llm"
     timestamp: datetime = Field(default_factory=datetime.now)
 
 class RecommendationResult(BaseModel):
@@ -113,15 +143,66 @@ class RecommendationResult(BaseModel):
     recommendations: List[str]
     timestamp: datetime = Field(default_factory=datetime.now)
 
+class Recommendation(BaseModel):
+    recommendation: str = Field(description="Specific, actionable learning step")
+    skill: Optional[str] = Field(default=None, description="Main skill or technology it builds")
+    timeframe: Optional[str] = Field(default=None, description="Suggested timeframe, e.g. '3 months'")
+
+class StudentAnalysis(BaseModel):
+    classification: str = Field(description="Specific career classification")
+    confidence: float = Field(ge=0, le=1, description="Confidence in the classification from 0 to 1")
+    recommendations: List[Recommendation] = Field(min_length=1, max_length=6)
+
+class AnalysisUsage(BaseModel):
+    model_requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+class IncrementalPlan(BaseModel):
+    plan: str
+    changed_sections: List[str] = []
+
+class StudentAnalysisResult(BaseModel):
+    """One student's analysis; with fields= or include_profile=false only the requested keys are present"""
+    student_name: Optional[str] = None
+    status: str
+    classification: Optional[str] = None
+    confidence: Optional[float] = None
+    classification_source: Optional[str] = None
+    recommendation_source: Optional[str] = None
+    analysis_mode: Optional[str] = None
+    incremental: Optional[IncrementalPlan] = None
+    usage: Optional[AnalysisUsage] = None
+    recommendations: Optional[List[str]] = None
+    profile_summary: Optional[Dict[str, Any]] = None
+    saved_to: Optional[str] = None
+    request_id: Optional[str] = None
+    trace: Optional[List[Dict[str, Any]]] = None
+    coalesced: Optional[bool] = None
+    error: Optional[str] = None
+    index: Optional[int] = None
+
+class StoredAnalysisResult(BaseModel):
+    student_name: str
+    classification: Optional[str] = None
+    recommendations: Optional[List[str]] = None
+    profile_summary: Optional[Dict[str, Any]] = None
+    timestamp: Optional[str] = None
+    analysis_version: Optional[str] = None
+
 class AnalysisResponse(BaseModel):
     success: bool
     message: str
-    results: List[Dict[str, Any]] = []
+    results: List[StudentAnalysisResult] = []
+
+# Keys that fields= may select, and the ones every projected result keeps
+RESULT_FIELDS = set(StudentAnalysisResult.model_fields) | set(StoredAnalysisResult.model_fields)
+ALWAYS_INCLUDED_FIELDS = {"student_name", "status"}
 
 # Pydantic AI Agents - Enhanced for comprehensive analysis
-classification_agent = Agent(
-    'gemini-1.5-flash',
-    system_prompt="""You are an expert career counselor and skills analyzer. 
+MODEL_NAME = 'gemini-1.5-flash'
+
+CLASSIFICATION_SYSTEM_PROMPT = """You are an expert career counselor and skills analyzer. 
     Analyze comprehensive student profiles and classify their primary career focus based on:
     
     - Technical skills (programming languages, software proficiency, technical skills)
@@ -153,11 +234,8 @@ classification_agent = Agent(
     - etc.
     
     Be specific and precise based on the strongest indicators in their profile."""
-)
 
-recommendation_agent = Agent(
-    'gemini-1.5-flash',
-    system_prompt="""You are a personalized learning path advisor. Based on a student's 
+RECOMMENDATION_SYSTEM_PROMPT = """You are a personalized learning path advisor. Based on a student's 
     comprehensive profile and classification, provide 3-4 specific, actionable learning 
     recommendations that will accelerate their career development.
     
@@ -180,8 +258,132 @@ recommendation_agent = Agent(
     - "Build 2-3 React projects with TypeScript to demonstrate frontend proficiency"
     - "Practice data structures and algorithms on LeetCode 30 minutes daily for technical interviews"
     """
+
+ANALYSIS_SYSTEM_PROMPT = """You are an expert career counselor and personalized learning path advisor.
+    In one response, classify a student's primary career focus and recommend their next learning steps.
+    
+    Classification: weigh technical skills, experience, education, goals, certifications and desired skills
+    holistically and give one specific category (e.g. "AI/Machine Learning Engineer", "Full-Stack Web Developer",
+    "Data Scientist", "Blockchain Developer"), with your confidence from 0 to 1.
+    
+    Recommendations: give 3-4 that are specific (exact technologies, courses or skills), actionable immediately,
+    relevant to the classification, and progressive from the student's current level and learning style.
+    """
+
+BATCH_CLASSIFICATION_SYSTEM_PROMPT = """You are an expert career counselor and skills analyzer.
+    You receive several student profiles, each tagged with an id such as [s1]. Classify each student's primary
+    career focus independently, weighing technical skills, experience, education, goals, certifications and
+    desired skills holistically. Give one specific category per student (e.g. "AI/Machine Learning Engineer",
+    "Full-Stack Web Developer", "Data Scientist", "Blockchain Developer") with your confidence from 0 to 1.
+    
+    Return exactly one entry for every id you were given, using the id exactly as written.
+    """
+
+# Agents carry prompts and output types; model_router picks the backend model for each run
+model_router = create_model_router(MODEL_NAME)
+
+def build_agents() -> Dict[str, "Agent"]:
+    from pydantic_ai import Agent
+    return {
+        "classification": Agent(system_prompt=CLASSIFICATION_SYSTEM_PROMPT, name="classification"),
+        "recommendation": Agent(system_prompt=RECOMMENDATION_SYSTEM_PROMPT, name="recommendation"),
+        # Single-call mode: classification, confidence and typed recommendations in one structured response
+        "analysis": Agent(output_type=StudentAnalysis, system_prompt=ANALYSIS_SYSTEM_PROMPT, name="analysis"),
+        # Batched classification: several tagged profiles in, one typed entry per student out
+        "batch_classification": Agent(output_type=BatchClassification, system_prompt=BATCH_CLASSIFICATION_SYSTEM_PROMPT, name="batch_classification"),
+    }
+
+# Built on first use; main.classification_agent etc. still resolve through __getattr__ below
+agents = Lazy(build_agents)
+
+def __getattr__(name: str) -> Any:
+    if name in ("classification_agent", "recommendation_agent", "analysis_agent", "batch_classification_agent"):
+        return agents.get()[name[:-len("_agent")]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ANALYSIS_MODE=single_call uses the analysis agent, falling back to the two-step path on failure
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "two_step")
+ANALYSIS_MODES = ("two_step", "single_call")
+
+# Response cache - unchanged profiles skip the model round trip
+llm_cache = LLMCache(
+    path=os.getenv("LLM_CACHE_PATH", "llm_cache.db"),
+    ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+)
+
+# Recommendation reuse - students with the same classification and a similar skill gap share validated
+# recommendations; "shadow" only measures would-be hits, "on" reuses them
+RECOMMENDATION_LIBRARY_MODES = ("off", "shadow", "on")
+RECOMMENDATION_LIBRARY_MODE = os.getenv("RECOMMENDATION_LIBRARY_MODE", "off")
+if RECOMMENDATION_LIBRARY_MODE not in RECOMMENDATION_LIBRARY_MODES:
+    print(f"Warning: unknown RECOMMENDATION_LIBRARY_MODE {RECOMMENDATION_LIBRARY_MODE!r}, recommendation library disabled")
+    RECOMMENDATION_LIBRARY_MODE = "off"
+recommendation_library = RecommendationLibrary(
+    path=os.getenv("RECOMMENDATION_LIBRARY_PATH", "recommendation_library.db"),
+    threshold=float(os.getenv("RECOMMENDATION_LIBRARY_THRESHOLD", "0.8")),
+    signature=model_router.signature
+) if RECOMMENDATION_LIBRARY_MODE != "off" else None
+
+# Local taxonomy classifier - LOCAL_CLASSIFIER_MODE=skip_llm trusts it above the threshold
+skill_classifier = SkillClassifier.from_file(os.getenv("TAXONOMY_PATH", DEFAULT_TAXONOMY_PATH))
+
+def build_cohort_scorer() -> "CohortScorer":
+    from batch_scoring import CohortScorer
+    return CohortScorer(skill_classifier)
+
+cohort_scorer = Lazy(build_cohort_scorer)
+LOCAL_CLASSIFIER_MODE = os.getenv("LOCAL_CLASSIFIER_MODE", "off")
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.85"))
+
+# Compact prompt serialization with a per-request input token budget
+prompt_builder = PromptBuilder(token_budget=int(os.getenv("PROMPT_TOKEN_BUDGET", "1500")))
+
+# Profile summary sections the recommendation prompt needs
+RECOMMENDATION_SECTIONS = (
+    "technical_skills", "certifications", "professional_experience",
+    "career_goals", "learning_preferences", "support_needs"
+)
+
+# Model call scheduler - bounded concurrency, provider rate limits and retries
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "100000"))
+
+# RATE_LIMITER=sqlite shares the provider quota between server processes (set by gunicorn.conf.py)
+RATE_LIMITER = os.getenv("RATE_LIMITER", "local")
+if RATE_LIMITER == "sqlite":
+    rate_limiter = SQLiteRateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, path=os.getenv("RATE_LIMITER_PATH", "rate_limits.db"))
+else:
+    if RATE_LIMITER != "local":
+        print(f"Warning: unknown RATE_LIMITER {RATE_LIMITER!r}, using the in-process limiter")
+    rate_limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+
+# Priority lanes - /analyze-single is interactive; /analyze, /analyze/stream and jobs are bulk.
+# Bulk model calls from synchronous requests are dropped once they have waited BULK_MAX_QUEUE_SECONDS
+INTERACTIVE_LANE_WEIGHT = float(os.getenv("INTERACTIVE_LANE_WEIGHT", "10"))
+TENANT_MAX_IN_FLIGHT = int(os.getenv("TENANT_MAX_IN_FLIGHT", "0"))
+BULK_MAX_QUEUE_SECONDS = float(os.getenv("BULK_MAX_QUEUE_SECONDS", "120"))
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant-ID")
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "5")),
+    limiter=rate_limiter,
+    lane_weights={"interactive": INTERACTIVE_LANE_WEIGHT, "bulk": 1.0},
+    tenant_max_in_flight=TENANT_MAX_IN_FLIGHT,
+    on_queue_wait=record_queue_wait
 )
 
+def enter_lane(request: Request, lane: str, max_queue_seconds: Optional[float] = None):
+    """Tag the model calls made for this request with its lane, its tenant and how long they may queue"""
+    tenant = request.headers.get(TENANT_HEADER) or (request.client.host if request.client else "anonymous")
+    lane_var.set(lane)
+    tenant_var.set(tenant)
+    max_queue_seconds_var.set(max_queue_seconds or None)
+
+# Expected completion size added to each prompt's token estimate
+EXPECTED_OUTPUT_TOKENS = 400
+
 # FastAPI App
 app = FastAPI(
     title="Comprehensive Student Profile Analysis API",
@@ -196,21 +398,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
-# Utility Functions
-def ensure_results_directory():
-    """Ensure the analysis_results directory exists"""
-    os.makedirs("analysis_results", exist_ok=True)
+# Compress JSON responses of at least COMPRESSION_MIN_BYTES with br or gzip; streamed responses pass through
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")))
+
+# Request ids, optional per-request tracing (X-Trace: 1 or TRACE_REQUESTS=true) and HTTP latency metrics
+app.add_middleware(MetricsMiddleware)
+
+# Result persistence - SQLite by default, RESULT_STORE=json for the legacy per-file layout
+result_store = create_result_store()
+
+# Analysis history - every analysis appended as a version keyed by email. RESULT_STORE=history makes the
+# history the result store, so nothing is written twice; HISTORY=true also keeps it next to another store
+HISTORY_ENABLED = os.getenv("HISTORY", "false").lower() in ("1", "true", "yes")
+if isinstance(result_store, HistoryResultStore):
+    history_store = result_store.history
+else:
+    history_store = create_history_store() if HISTORY_ENABLED else None
 
+# Cohort analytics - counts and skill sketches updated on every result write, served by /analytics
+cohort_analytics = create_analytics()
+
+# Utility Functions
 def save_analysis_result(student_name: str, classification: str, recommendations: List[str], profile_summary: Dict[str, Any]):
-    """Save comprehensive analysis results to JSON file"""
-    ensure_results_directory()
-    
-    safe_name = student_name.replace(" ", "_").replace("/", "_")
-    filename = f"{safe_name}_comprehensive_analysis.json"
-    filepath = os.path.join("analysis_results", filename)
-    
+    """Save comprehensive analysis results to the result store"""
     result_data = {
         "student_name": student_name,
         "classification": classification,
@@ -220,10 +433,15 @@ def save_analysis_result(student_name: str, classification: str, recommendations
         "analysis_version": "2.0.0"
     }
     
-    with open(filepath, 'w') as f:
-        json.dump(result_data, f, indent=4)
-    
-    return filepath
+    location = result_store.save(result_data)
+    if history_store is not None and not isinstance(result_store, HistoryResultStore):
+        try:
+            history_store.append(result_data)
+        except Exception as e:
+            print(f"Warning: could not append analysis history: {e}")
+    # Applied by the analytics writer thread, off the request path
+    cohort_analytics.submit(result_data)
+    return location
 
 def create_profile_summary(student: ComprehensiveStudentProfile) -> Dict[str, Any]:
     """Create a comprehensive profile summary for AI analysis"""
@@ -319,92 +537,662 @@ def create_profile_summary(student: ComprehensiveStudentProfile) -> Dict[str, An
         }
     }
 
-async def analyze_single_student(student: ComprehensiveStudentProfile) -> Dict[str, Any]:
-    """Analyze a single comprehensive student profile"""
+def run_usage(result: Any) -> "Usage":
+    """Token usage of one agent run, even when it shares an accumulating Usage with other runs"""
+    from pydantic_ai.messages import ModelResponse
+    from pydantic_ai.usage import Usage
+    usage = Usage()
+    for message in result.new_messages():
+        if isinstance(message, ModelResponse):
+            usage.incr(message.usage)
+    return usage
+
+def split_usage(usage: "Usage", weights: List[int]) -> List["Usage"]:
+    """Share one run's usage in proportion to weights, in whole units that add up to the run's totals"""
+    from pydantic_ai.usage import Usage
+    shares = [Usage() for _ in weights]
+    total_weight = sum(weights) or 1
+    for field in ("requests", "request_tokens", "response_tokens", "total_tokens"):
+        value = getattr(usage, field) or 0
+        exact = [value * weight / total_weight for weight in weights]
+        parts = [int(part) for part in exact]
+        # Units lost to rounding down go to the largest remainders
+        for index in sorted(range(len(weights)), key=lambda i: parts[i] - exact[i])[:value - sum(parts)]:
+            parts[index] += 1
+        for share, part in zip(shares, parts):
+            setattr(share, field, part)
+    return shares
+
+async def run_agent(
+    agent: "Agent",
+    system_prompt: str,
+    prompt: str,
+    usage: Optional["Usage"] = None,
+    expected_output_tokens: int = EXPECTED_OUTPUT_TOKENS
+) -> Any:
+    """Run an agent through the scheduler (concurrency, rate limits, retries), recording call metrics"""
+    estimated_tokens = estimate_tokens(system_prompt, prompt) + expected_output_tokens
+    
+    async def call_model() -> Any:
+        started = time.perf_counter()
+        try:
+            with in_flight("llm_calls"), span("llm_call", agent=agent.name):
+                # Failover and hedged attempts are extra provider requests, so they draw from the rate limits too
+                run_result = await model_router.run(
+                    agent, prompt, acquire_extra=lambda: llm_scheduler.limiter.acquire(estimated_tokens), usage=usage
+                )
+        except Exception:
+            record_llm_call(agent.name, time.perf_counter() - started, "error")
+            raise
+        tokens = run_usage(run_result)
+        record_llm_call(agent.name, time.perf_counter() - started, "success", tokens.request_tokens or 0, tokens.response_tokens or 0)
+        return run_result
+    
+    return await llm_scheduler.run(
+        call_model,
+        estimated_tokens=estimated_tokens,
+        usage_tokens=lambda run_result: run_usage(run_result).total_tokens or 0
+    )
+
+async def run_cached_agent(
+    agent: "Agent",
+    system_prompt: str,
+    prompt: str,
+    profile_summary: Dict[str, Any],
+    use_cache: bool = True,
+    extra: str = "",
+    usage: Optional["Usage"] = None
+) -> Any:
+    """Run an agent, serving the response from the LLM cache when the inputs are unchanged"""
+    cache_key = make_cache_key(profile_summary, system_prompt, model_router.signature, extra)
+    output_type = agent.output_type if isinstance(agent.output_type, type) and issubclass(agent.output_type, BaseModel) else None
+    if use_cache:
+        cached = llm_cache.get(cache_key)
+        record_cache_lookup("llm", cached is not None)
+        if cached is not None:
+            return output_type.model_validate_json(cached) if output_type else cached
+    
+    result = await run_agent(agent, system_prompt, prompt, usage=usage)
+    if output_type:
+        llm_cache.set(cache_key, result.output.model_dump_json())
+        return result.output
+    text = result.output.strip()
+    llm_cache.set(cache_key, text)
+    return text
+
+def classify_locally(student: ComprehensiveStudentProfile) -> Optional[ClassificationResult]:
+    """Classify a student against the skill taxonomy without calling a model"""
+    local = skill_classifier.classify(student)
+    if local["classification"] is None:
+        return None
+    return ClassificationResult(
+        student_name=student.fullName,
+        classification=local["classification"],
+        confidence=local["confidence"],
+        source="local"
+    )
+
+async def classify_student(
+    student: ComprehensiveStudentProfile,
+    profile_summary: Dict[str, Any],
+    use_cache: bool = True,
+    usage: Optional["Usage"] = None
+) -> ClassificationResult:
+    """Classify a student, skipping the model for clear-cut profiles when local mode is enabled"""
+    if LOCAL_CLASSIFIER_MODE == "skip_llm":
+        local = classify_locally(student)
+        if local is not None and local.confidence >= LOCAL_CLASSIFIER_THRESHOLD:
+            return local
+    
+    # Interactive requests skip batching rather than wait out the collection window
+    if classification_batcher is not None and lane_var.get() != "interactive":
+        batched = await classify_in_batch(student, profile_summary, use_cache, usage)
+        if batched is not None:
+            return batched
+    
+    classification_prompt = prompt_builder.build(
+        "classification",
+        "Classify this student's primary career focus from the profile below (compact JSON):",
+        profile_summary,
+        footer="Use all of it (skills, experience, education, goals, certifications) and reply with the classification only.",
+        system_prompt=CLASSIFICATION_SYSTEM_PROMPT
+    )
+    
+    classification = await run_cached_agent(
+        agents.get()["classification"],
+        CLASSIFICATION_SYSTEM_PROMPT,
+        classification_prompt.text,
+        profile_summary,
+        use_cache=use_cache,
+        usage=usage
+    )
+    return ClassificationResult(student_name=student.fullName, classification=classification)
+
+async def run_classification_batch(items: List[tuple], usages: List[Optional["Usage"]]) -> List[StudentClassification]:
+    """One model call classifying several tagged profiles, its usage shared among them by profile length"""
+    # The batcher runs this in a fresh context: queue it as bulk work of its own tenant, with no request's deadline
+    lane_var.set("bulk")
+    tenant_var.set("batch")
+    result = await run_agent(
+        agents.get()["batch_classification"],
+        BATCH_CLASSIFICATION_SYSTEM_PROMPT,
+        batch_prompt(items),
+        expected_output_tokens=BATCH_OUTPUT_TOKENS_PER_STUDENT * len(items)
+    )
+    for usage, share in zip(usages, split_usage(run_usage(result), [len(text) for _, text in items])):
+        if usage is not None:
+            usage.incr(share)
+    return result.output.classifications
+
+async def classify_in_batch(
+    student: ComprehensiveStudentProfile,
+    profile_summary: Dict[str, Any],
+    use_cache: bool = True,
+    usage: Optional["Usage"] = None
+) -> Optional[ClassificationResult]:
+    """Classify through the batcher; None when the batch had no valid entry for this student"""
+    cache_key = make_cache_key(profile_summary, BATCH_CLASSIFICATION_SYSTEM_PROMPT, model_router.signature)
+    if use_cache:
+        cached = llm_cache.get(cache_key)
+        record_cache_lookup("llm", cached is not None)
+        if cached is not None:
+            entry = StudentClassification.model_validate_json(cached)
+            return ClassificationResult(student_name=student.fullName, classification=entry.classification, confidence=entry.confidence)
+    
+    # Budget-truncated compact profile, as it will appear on its line of the batched prompt
+    item = prompt_builder.build("classification_batch_item", "", profile_summary, system_prompt="")
+    with span("batch_classification"):
+        entry = await classification_batcher.classify(item.text.strip(), item.tokens, usage)
+    if entry is None:
+        return None
+    llm_cache.set(cache_key, entry.model_dump_json())
+    return ClassificationResult(student_name=student.fullName, classification=entry.classification, confidence=entry.confidence)
+
+# Batched classification - CLASSIFICATION_BATCH_SIZE > 1 packs up to that many concurrent students into one
+# model call within CLASSIFICATION_BATCH_TOKEN_BUDGET; students missing from a batch response are classified individually
+CLASSIFICATION_BATCH_SIZE = int(os.getenv("CLASSIFICATION_BATCH_SIZE", "1"))
+BATCH_OUTPUT_TOKENS_PER_STUDENT = 40
+classification_batcher = ClassificationBatcher(
+    run_classification_batch,
+    max_batch_size=CLASSIFICATION_BATCH_SIZE,
+    token_budget=int(os.getenv("CLASSIFICATION_BATCH_TOKEN_BUDGET", "6000")),
+    window=float(os.getenv("CLASSIFICATION_BATCH_WINDOW_MS", "50")) / 1000
+) if CLASSIFICATION_BATCH_SIZE > 1 else None
+
+# Concurrent recommendation calls for the same classification and unseen skill gap share one model call
+recommendation_flights = SingleFlight()
+
+async def recommend_for_student(
+    student: ComprehensiveStudentProfile,
+    profile_summary: Dict[str, Any],
+    classification: str,
+    use_cache: bool = True,
+    usage: Optional["Usage"] = None
+) -> Tuple[List[str], str]:
+    """Get personalized learning recommendations for a classified student, and their source (library, llm, library_fallback or fallback)"""
+    # An empty gap says nothing about which recommendations fit, so it is neither looked up nor stored
+    gap = (skill_gap(profile_summary) or None) if recommendation_library is not None else None
+    if gap is None or not use_cache:
+        return await generate_recommendations(student, profile_summary, classification, gap, use_cache, usage)
+    
+    with stage("recommendation_lookup"):
+        reused, _ = recommendation_library.lookup(classification, gap, student.fullName)
+    record_cache_lookup("recommendation_library", reused is not None)
+    if RECOMMENDATION_LIBRARY_MODE != "on":
+        return await generate_recommendations(student, profile_summary, classification, gap, use_cache, usage)
+    if reused is not None:
+        return reused, "library"
+    
+    # Concurrent students with the same unseen gap wait for one model call, then reuse what it stored
+    async def generate_once() -> tuple:
+        try:
+            return await generate_recommendations(student, profile_summary, classification, gap, use_cache, usage), None
+        except Exception as e:
+            return None, e
+    
+    (generated, error), shared = await recommendation_flights.do(
+        request_fingerprint({"classification": classification, "gap": sorted(gap)}), generate_once
+    )
+    if not shared:
+        if error is not None:
+            raise error
+        return generated
+    reused, _ = recommendation_library.lookup(classification, gap, student.fullName)
+    if reused is not None:
+        return reused, "library"
+    return await generate_recommendations(student, profile_summary, classification, gap, use_cache, usage)
+
+async def generate_recommendations(
+    student: ComprehensiveStudentProfile,
+    profile_summary: Dict[str, Any],
+    classification: str,
+    gap: Optional[frozenset],
+    use_cache: bool = True,
+    usage: Optional["Usage"] = None
+) -> Tuple[List[str], str]:
+    """Ask the model for recommendations, adding valid ones to the recommendation library"""
+    recommendation_prompt = prompt_builder.build(
+        "recommendation",
+        f"Student: {student.fullName}\nClassification: {classification}\nProfile (compact JSON):",
+        select_sections(profile_summary, RECOMMENDATION_SECTIONS),
+        footer=f"Provide 3-4 specific, personalized learning recommendations that will help this student progress toward their career goals as a {classification}.",
+        system_prompt=RECOMMENDATION_SYSTEM_PROMPT
+    )
+    
+    recommendations_text = await run_cached_agent(
+        agents.get()["recommendation"],
+        RECOMMENDATION_SYSTEM_PROMPT,
+        recommendation_prompt.text,
+        profile_summary,
+        use_cache=use_cache,
+        extra=classification,
+        usage=usage
+    )
+    
+    # Parse recommendations (split by lines and clean up)
+    recommendations = []
+    for line in recommendations_text.split('\n'):
+        clean_line = line.strip().lstrip('1234567890.-').strip()
+        if clean_line and not clean_line.isdigit() and len(clean_line) > 10:
+            recommendations.append(clean_line)
+    
+    if recommendations:
+        if gap is not None:
+            recommendation_library.add(classification, gap, recommendations, student.fullName)
+        return recommendations, "llm"
+    
+    # Unparseable reply: reuse the closest library entry for this classification, else generic advice
+    if gap is not None:
+        reused = recommendation_library.fallback(classification, gap, student.fullName)
+        if reused is not None:
+            return reused, "library_fallback"
+    return [
+        f"Focus on strengthening core {classification.lower()} skills",
+        "Build a portfolio of relevant projects",
+        "Network with professionals in your target field",
+        "Consider relevant certifications for career advancement"
+    ], "fallback"
+
+async def analyze_in_single_call(
+    student: ComprehensiveStudentProfile,
+    profile_summary: Dict[str, Any],
+    use_cache: bool = True,
+    usage: Optional["Usage"] = None
+) -> StudentAnalysis:
+    """Classify and recommend with one structured-output model call"""
+    analysis_prompt = prompt_builder.build(
+        "analysis",
+        "Classify this student's primary career focus and recommend their next learning steps. Profile (compact JSON):",
+        profile_summary,
+        system_prompt=ANALYSIS_SYSTEM_PROMPT
+    )
+    return await run_cached_agent(
+        agents.get()["analysis"],
+        ANALYSIS_SYSTEM_PROMPT,
+        analysis_prompt.text,
+        profile_summary,
+        use_cache=use_cache,
+        usage=usage
+    )
+
+# Per-mode latency and token totals, for comparing the single-call and two-step paths
+analysis_mode_stats = {
+    mode: {"analyses": 0, "cached_analyses": 0, "seconds": 0.0, "model_requests": 0, "input_tokens": 0, "output_tokens": 0}
+    for mode in ANALYSIS_MODES
+}
+
+def record_analysis_usage(mode: str, seconds: float, usage: "Usage"):
+    stats = analysis_mode_stats[mode]
+    if not (usage.requests or usage.request_tokens or usage.response_tokens):
+        # Answered from the LLM cache: counted apart so the averages describe model-backed analyses only
+        stats["cached_analyses"] += 1
+        return
+    stats["analyses"] += 1
+    stats["seconds"] += seconds
+    stats["model_requests"] += usage.requests
+    stats["input_tokens"] += usage.request_tokens or 0
+    stats["output_tokens"] += usage.response_tokens or 0
+
+# Incremental re-analysis - per-section fingerprints of each student's last profile summary
+fingerprint_store = FingerprintStore(os.getenv("FINGERPRINTS_DB_PATH", "fingerprints.db"))
+INCREMENTAL_ANALYSIS = os.getenv("INCREMENTAL_ANALYSIS", "false").lower() in ("1", "true", "yes")
+
+# Near-duplicate classification reuse - "shadow" only measures would-be hits, "on" reuses them
+SEMANTIC_CACHE_MODES = ("off", "shadow", "on")
+SEMANTIC_CACHE_MODE = os.getenv("SEMANTIC_CACHE_MODE", "off")
+if SEMANTIC_CACHE_MODE not in SEMANTIC_CACHE_MODES:
+    print(f"Warning: unknown SEMANTIC_CACHE_MODE {SEMANTIC_CACHE_MODE!r}, semantic cache disabled")
+    SEMANTIC_CACHE_MODE = "off"
+
+def build_semantic_cache() -> "SemanticCache":
+    from semantic_cache import SemanticCache
+    return SemanticCache(
+        path=os.getenv("SEMANTIC_CACHE_PATH", "semantic_cache.npz"),
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+        max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000")),
+        signature=model_router.signature,
+        audit_rate=float(os.getenv("SEMANTIC_CACHE_AUDIT_RATE", "0.05"))
+    )
+
+semantic_cache = Lazy(build_semantic_cache)
+
+# Concurrent identical analyses share one run (and one result write)
+analysis_flights = SingleFlight()
+
+def analysis_key(student: ComprehensiveStudentProfile, use_cache: bool, mode: Optional[str], incremental: Optional[bool]) -> str:
+    return request_fingerprint(
+        student.model_dump(),
+        use_cache,
+        mode or ANALYSIS_MODE,
+        INCREMENTAL_ANALYSIS if incremental is None else incremental
+    )
+
+async def analyze_single_student(
+    student: ComprehensiveStudentProfile,
+    use_cache: bool = True,
+    mode: Optional[str] = None,
+    incremental: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Analyze a single comprehensive student profile, joining an identical analysis already in flight"""
+    result, shared = await analysis_flights.do(
+        analysis_key(student, use_cache, mode, incremental),
+        lambda: analyze_student_once(student, use_cache, mode, incremental)
+    )
+    if shared:
+        COALESCED_ANALYSES.labels(source="in_flight").inc()
+        return {**result, "coalesced": True}
+    return dict(result)
+
+async def analyze_student_once(
+    student: ComprehensiveStudentProfile,
+    use_cache: bool = True,
+    mode: Optional[str] = None,
+    incremental: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Run one analysis, reporting failures as an error result"""
+    mode = mode or ANALYSIS_MODE
+    incremental = INCREMENTAL_ANALYSIS if incremental is None else incremental
+    trace = start_trace()
     try:
+        with in_flight("analyses"), stage("analysis", mode=mode):
+            return await run_analysis(student, use_cache, mode, incremental, trace)
+    except Exception as e:
+        ANALYSES.labels(status="error", mode=mode).inc()
+        result = {
+            "student_name": student.fullName,
+            "error": str(e),
+            "status": "error",
+            "request_id": request_id_var.get(),
+            "profile_summary": create_profile_summary(student) if student else None
+        }
+        if trace is not None:
+            result["trace"] = trace.spans
+        return result
+
+async def run_analysis(student: ComprehensiveStudentProfile, use_cache: bool, mode: str, incremental: bool, trace: Any) -> Dict[str, Any]:
+    """Run the analysis pipeline stages for one student"""
+    with stage("profile_summary"):
         # Create comprehensive profile summary
         profile_summary = create_profile_summary(student)
+    from pydantic_ai.usage import Usage
+    usage = Usage()
+    started = time.perf_counter()
+    
+    # Compare against the last analysis of this student and rerun only what the changed sections affect
+    key = student_key(student.email)
+    fingerprints = section_fingerprints(profile_summary)
+    # use_cache=false asks for fresh model output, so nothing is reused from the last analysis
+    previous = fingerprint_store.get(key) if incremental and use_cache else None
+    plan = plan_reanalysis(previous["fingerprints"] if previous else None, fingerprints, RECOMMENDATION_SECTIONS)
+    if incremental:
+        fingerprint_store.record_plan(plan.plan)
+        INCREMENTAL_PLANS.labels(plan=plan.plan).inc()
+    
+    # Classification reused from this student's last analysis or from a near-duplicate profile
+    reused_classification = None
+    if plan.plan != "full":
+        reused_classification = ClassificationResult(
+            student_name=student.fullName,
+            classification=previous["classification"],
+            confidence=previous["confidence"],
+            source="incremental"
+        )
+    
+    semantic_tf = neighbour = None
+    if reused_classification is None and SEMANTIC_CACHE_MODE != "off":
+        with stage("semantic_lookup"):
+            semantic_tf = semantic_cache.get().embed(profile_summary)
+            neighbour, reuse = semantic_cache.get().lookup(semantic_tf, SEMANTIC_CACHE_MODE)
+        record_cache_lookup("semantic", reuse)
+        if reuse:
+            reused_classification = ClassificationResult(
+                student_name=student.fullName,
+                classification=neighbour["classification"],
+                confidence=neighbour["confidence"],
+                source="semantic_cache"
+            )
+    
+    analysis = None
+    if reused_classification is not None:
+        classification_result = reused_classification
+        if plan.plan == "reuse":
+            recommendations, recommendation_source = previous["recommendations"], "previous"
+        else:
+            with stage("recommendation"):
+                recommendations, recommendation_source = await recommend_for_student(
+                    student, profile_summary, classification_result.classification, use_cache=use_cache, usage=usage
+                )
+    elif mode == "single_call":
+        try:
+            with stage("single_call"):
+                analysis = await analyze_in_single_call(student, profile_summary, use_cache=use_cache, usage=usage)
+        except Exception as e:
+            print(f"Single-call analysis failed for {student.fullName}, using two-step path: {e}")
+            mode = "two_step"
         
-        # Get classification
-        classification_prompt = f"""
-        Analyze this comprehensive student profile and classify their primary career focus:
-        
-        STUDENT PROFILE:
-        {json.dumps(profile_summary, indent=2)}
-        
-        Based on all the information provided (technical skills, experience, education, goals, certifications, etc.), 
-        determine the most appropriate career classification for this student.
-        """
-        
-        classification_result = await classification_agent.run(classification_prompt)
-        classification = classification_result.data.strip()
-        
-        # Get personalized recommendations
-        recommendation_prompt = f"""
-        STUDENT PROFILE SUMMARY:
-        Name: {student.fullName}
-        Classification: {classification}
-        
-        CURRENT SKILLS:
-        Technical Skills: {profile_summary['technical_skills']}
-        Certifications: {profile_summary['certifications']}
-        Experience: {profile_summary['professional_experience']}
-        
-        GOALS & PREFERENCES:
-        Career Goals: {profile_summary['career_goals']}
-        Learning Preferences: {profile_summary['learning_preferences']}
-        Skills to Acquire: {profile_summary['learning_preferences']['skills_to_acquire']}
-        
-        SUPPORT NEEDS:
-        {profile_summary['support_needs']}
-        
-        Provide 3-4 specific, personalized learning recommendations that will help this student 
-        progress toward their career goals as a {classification}.
-        """
-        
-        recommendation_result = await recommendation_agent.run(recommendation_prompt)
-        recommendations_text = recommendation_result.data.strip()
-        
-        # Parse recommendations (split by lines and clean up)
-        recommendations = []
-        for line in recommendations_text.split('\n'):
-            clean_line = line.strip().lstrip('1234567890.-').strip()
-            if clean_line and not clean_line.isdigit() and len(clean_line) > 10:
-                recommendations.append(clean_line)
-        
-        # Ensure we have at least some recommendations
-        if not recommendations:
-            recommendations = [
-                f"Focus on strengthening core {classification.lower()} skills",
-                "Build a portfolio of relevant projects",
-                "Network with professionals in your target field",
-                "Consider relevant certifications for career advancement"
-            ]
-        
-        # Save results with full profile summary
+    if analysis is not None:
+        classification_result = ClassificationResult(
+            student_name=student.fullName,
+            classification=analysis.classification.strip(),
+            confidence=analysis.confidence
+        )
+        recommendations, recommendation_source = [rec.recommendation for rec in analysis.recommendations], "llm"
+        gap = skill_gap(profile_summary) if recommendation_library is not None else None
+        if gap:
+            recommendation_library.add(classification_result.classification, gap, recommendations, student.fullName)
+    elif reused_classification is None:
+        with stage("classification"):
+            classification_result = await classify_student(student, profile_summary, use_cache=use_cache, usage=usage)
+        with stage("recommendation"):
+            recommendations, recommendation_source = await recommend_for_student(
+                student, profile_summary, classification_result.classification, use_cache=use_cache, usage=usage
+            )
+    if semantic_tf is not None and reused_classification is None and classification_result.source == "llm":
+        semantic_cache.get().add(semantic_tf, classification_result.classification, classification_result.confidence, neighbour)
+    classification = classification_result.classification
+    if reused_classification is None:
+        record_analysis_usage(mode, time.perf_counter() - started, usage)
+    
+    # Save results with full profile summary
+    with stage("save_result"):
         filepath = save_analysis_result(
             student.fullName,
             classification,
             recommendations,
             profile_summary
         )
+        fingerprint_store.save(
+            key, fingerprints, classification, classification_result.confidence, classification_result.source, recommendations
+        )
+    ANALYSES.labels(status="success", mode=mode).inc()
+    
+    result = {
+        "student_name": student.fullName,
+        "classification": classification,
+        "confidence": classification_result.confidence,
+        "classification_source": classification_result.source,
+        "analysis_mode": mode,
+        "incremental": {"plan": plan.plan, "changed_sections": plan.changed_sections} if incremental else None,
+        "usage": {
+            "model_requests": usage.requests,
+            "input_tokens": usage.request_tokens or 0,
+            "output_tokens": usage.response_tokens or 0
+        },
+        "recommendations": recommendations,
+        "recommendation_source": recommendation_source,
+        "profile_summary": profile_summary,
+        "saved_to": filepath,
+        "request_id": request_id_var.get(),
+        "status": "success"
+    }
+    if trace is not None:
+        result["trace"] = trace.spans
+    return result
+
+async def analyze_record_stream(
+    records: AsyncIterator[Any],
+    use_cache: bool = True,
+    mode: Optional[str] = None,
+    incremental: Optional[bool] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Validate and analyze streamed student records as they arrive, yielding results in completion order"""
+    window = llm_scheduler.max_concurrency * 2
+    pending = set()
+    
+    async def analyze_record(index: int, record: Any) -> Dict[str, Any]:
+        try:
+            with stage("validation"):
+                student = ComprehensiveStudentProfile(**record)
+        except Exception as e:
+            return {"index": index, "status": "error", "error": f"Invalid student profile: {str(e)}"}
+        result = await analyze_single_student(student, use_cache=use_cache, mode=mode, incremental=incremental)
+        result["index"] = index
+        return result
+    
+    try:
+        index = 0
+        try:
+            async for record in records:
+                pending.add(asyncio.create_task(analyze_record(index, record)))
+                index += 1
+                # Stop reading input while the window is full so memory stays bounded
+                if len(pending) >= window:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    done = {task for task in pending if task.done()}
+                    pending -= done
+                for task in done:
+                    yield task.result()
+        except ValueError as e:
+            yield {"index": index, "status": "error", "error": f"Malformed input: {str(e)}"}
         
-        return {
-            "student_name": student.fullName,
-            "classification": classification,
-            "recommendations": recommendations,
-            "profile_summary": profile_summary,
-            "saved_to": filepath,
-            "status": "success"
-        }
-        
-    except Exception as e:
-        return {
-            "student_name": student.fullName,
-            "error": str(e),
-            "status": "error",
-            "profile_summary": create_profile_summary(student) if student else None
-        }
+        for task in asyncio.as_completed(pending):
+            yield await task
+        pending = set()
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def analyze_job_item(student_data: Dict[str, Any], use_cache: bool) -> Dict[str, Any]:
+    """Analyze one persisted job item"""
+    # Jobs are bulk work that nobody waits on synchronously, so their calls are never dropped
+    lane_var.set("bulk")
+    tenant_var.set("jobs")
+    with stage("validation"):
+        student = ComprehensiveStudentProfile(**student_data)
+    return await analyze_single_student(student, use_cache=use_cache)
+
+# Background analysis jobs - persisted so a restart resumes unfinished students
+job_manager = JobManager(
+    JobStore(os.getenv("JOBS_DB_PATH", "jobs.db")),
+    analyze_job_item,
+    workers=int(os.getenv("JOB_WORKERS", "16"))
+)
+
+# Background warm-up after startup builds what the first request would otherwise pay for (WARM_UP=false to skip)
+WARM_UP = os.getenv("WARM_UP", "true").lower() in ("1", "true", "yes")
+warm_up_report: Optional[Dict[str, Any]] = None
+
+def warm_agents():
+    agents.get()
+
+def warm_model_clients():
+    for backend in model_router.backends:
+        backend.model
+
+def warm_cohort_scorer():
+    cohort_scorer.get()
+
+def warm_semantic_cache():
+    if SEMANTIC_CACHE_MODE != "off":
+        semantic_cache.get()
+
+def run_warm_up(model_clients: bool = True) -> Dict[str, Any]:
+    """Import deferred dependencies and build agents, model clients, the cohort scorer and the semantic cache"""
+    global warm_up_report
+    steps = [warm_agents, warm_cohort_scorer, warm_semantic_cache]
+    if model_clients:
+        steps.append(warm_model_clients)
+    warm_up_report = warm_up(steps)
+    return warm_up_report
+
+def reconnect_after_fork():
+    """Give a forked server worker its own SQLite connections instead of the preloading parent's"""
+    for store in (llm_cache, recommendation_library, result_store, history_store, fingerprint_store, job_manager.store, rate_limiter, cohort_analytics):
+        reconnect = getattr(store, "reconnect", None)
+        if reconnect is not None:
+            reconnect()
+
+@app.on_event("startup")
+async def start_job_workers():
+    await job_manager.start()
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Not awaited: the server accepts requests (and answers /health) while this runs in a thread
+    if WARM_UP:
+        asyncio.get_running_loop().run_in_executor(None, run_warm_up)
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_manager.stop()
+    await asyncio.get_running_loop().run_in_executor(None, cohort_analytics.flush)
+    if semantic_cache.built:
+        semantic_cache.get().save()
+
+def validate_analysis_mode(mode: Optional[str]):
+    if mode is not None and mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(ANALYSIS_MODES)}")
+
+def parse_fields(fields: Optional[str]) -> Optional[set]:
+    """Parse a comma-separated fields= projection, rejecting unknown keys"""
+    if fields is None:
+        return None
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected - RESULT_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return selected | ALWAYS_INCLUDED_FIELDS
+
+def project_result(result: Dict[str, Any], fields: Optional[set], include_profile: bool = True) -> Dict[str, Any]:
+    """Keep only the selected keys of a result, dropping profile_summary unless it is wanted"""
+    if fields is not None:
+        result = {key: value for key, value in result.items() if key in fields}
+    if not include_profile and "profile_summary" in result:
+        result = {key: value for key, value in result.items() if key != "profile_summary"}
+    return result
+
+class UploadStreamingResponse(StreamingResponse):
+    """StreamingResponse for handlers that keep reading the request body while they respond.
+    
+    Under ASGI < 2.4 Starlette's StreamingResponse calls receive() itself to watch for disconnects,
+    which would swallow request body chunks the handler has not read yet.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
 
 # API Routes
 @app.get("/")
@@ -413,107 +1201,273 @@ async def root():
         "message": "Comprehensive Student Profile Analysis API",
         "version": "2.0.0",
         "endpoints": {
-            "analyze": "/analyze - Analyze comprehensive student profiles",
-            "analyze-single": "/analyze-single - Analyze single student profile", 
+            "analyze": "/analyze - Analyze comprehensive student profiles (projection: fields, include_profile)",
+            "analyze-single": "/analyze-single - Analyze single student profile (projection: fields, include_profile)",
+            "analyze-stream": "/analyze/stream - Stream an NDJSON or JSON upload and receive NDJSON results as they complete",
+            "classify-local": "/classify-local - Classify against the skill taxonomy without the model",
+            "cohort-scores": "/cohort/scores - Cluster affinity and skill-gap scores for a whole cohort",
+            "export": "/export - Stream all results (or those since a timestamp) as NDJSON, CSV or Parquet",
+            "analytics": "/analytics - Classification, country and career stage counts, trends and top skills",
             "health": "/health - Health check",
-            "results": "/results/{student_name} - Get saved results",
-            "results-list": "/results - List all available results"
+            "results": "/results/{student_name} - Get saved results (projection: fields, include_profile)",
+            "history": "/results/{student_id}/history - Every version of a student's analysis (student_id: email)",
+            "history-stats": "/history/stats - Analysis history size and profile deduplication",
+            "results-list": "/results - List results (filters: classification, since, until, limit, offset)",
+            "cache": "/cache/stats - LLM response cache statistics",
+            "scheduler": "/scheduler/stats - Model call scheduler statistics",
+            "models": "/models/stats - Model backend latency and circuit breaker state",
+            "analysis-modes": "/analysis/modes - Latency and token comparison of single-call and two-step analysis",
+            "prompts": "/prompts/stats - Prompt token estimates and budget truncation counts",
+            "classification-batches": "/classification/batches - Batched classification sizes and re-queued students",
+            "startup": "/startup/stats - Background warm-up timings and deferred component state",
+            "semantic-cache": "/semantic-cache/stats - Near-duplicate cache hit rate and accuracy by similarity threshold",
+            "recommendation-library": "/recommendation-library/stats - Reused recommendations by classification and skill gap",
+            "coalescing": "/coalescing/stats - Concurrent identical analyses that shared one run",
+            "incremental": "/incremental/stats - Incremental re-analysis decisions (full, recommend-only, reuse)",
+            "jobs": "/jobs - Submit a background analysis job; /jobs/{job_id} and /jobs/{job_id}/stream for progress and results",
+            "metrics": "/metrics - Prometheus metrics for pipeline stages, model calls, caches and in-flight work"
         }
     }
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now()}
+    return {"status": "healthy", "timestamp": datetime.now(), "warmed_up": warm_up_report is not None}
 
 @app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_students(students_data: StudentsData, background_tasks: BackgroundTasks):
+async def analyze_students(
+    students_data: StudentsData,
+    background_tasks: BackgroundTasks,
+    request: Request,
+    use_cache: bool = True,
+    mode: Optional[str] = None,
+    incremental: Optional[bool] = None,
+    fields: Optional[str] = None,
+    include_profile: bool = True
+):
     """Analyze multiple comprehensive student profiles"""
+    observe_request_parsing()
     if not students_data.students:
         raise HTTPException(status_code=400, detail="No student data provided")
+    validate_analysis_mode(mode)
+    selected_fields = parse_fields(fields)
+    enter_lane(request, "bulk", BULK_MAX_QUEUE_SECONDS)
     
     try:
-        # Process all students concurrently
-        tasks = [analyze_single_student(student) for student in students_data.students]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Keep a bounded window of students in flight; model calls are throttled by llm_scheduler,
+        # so the classify and recommend stages of different students overlap
+        student_slots = asyncio.Semaphore(llm_scheduler.max_concurrency * 2)
+        
+        async def analyze_in_window(student: ComprehensiveStudentProfile) -> Dict[str, Any]:
+            async with student_slots:
+                return await analyze_single_student(student, use_cache=use_cache, mode=mode, incremental=incremental)
+        
+        # Collapse duplicate profiles in the batch before scheduling; each copy gets the shared result
+        keys = [analysis_key(student, use_cache, mode, incremental) for student in students_data.students]
+        unique_students = {}
+        for key, student in zip(keys, students_data.students):
+            unique_students.setdefault(key, student)
+        tasks = [analyze_in_window(student) for student in unique_students.values()]
+        results = dict(zip(unique_students, await asyncio.gather(*tasks, return_exceptions=True)))
         
         # Handle any exceptions in results
         processed_results = []
-        for result in results:
+        seen = set()
+        for key in keys:
+            result = results[key]
             if isinstance(result, Exception):
                 processed_results.append({
                     "error": str(result),
                     "status": "error"
                 })
+            elif key in seen:
+                COALESCED_ANALYSES.labels(source="batch").inc()
+                processed_results.append({**result, "coalesced": True})
             else:
                 processed_results.append(result)
+            seen.add(key)
         
         success_count = sum(1 for r in processed_results if r.get("status") == "success")
         
-        return AnalysisResponse(
-            success=success_count > 0,
-            message=f"Processed {len(processed_results)} students. {success_count} successful, {len(processed_results) - success_count} failed.",
-            results=processed_results
-        )
+        # Serialized straight to JSON with orjson; AnalysisResponse documents the shape
+        return ORJSONResponse({
+            "success": success_count > 0,
+            "message": f"Processed {len(processed_results)} students. {success_count} successful, {len(processed_results) - success_count} failed.",
+            "results": [project_result(result, selected_fields, include_profile) for result in processed_results]
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
-@app.post("/analyze-single", response_model=Dict[str, Any])
-async def analyze_single_student_endpoint(student: ComprehensiveStudentProfile):
+@app.post("/analyze/stream")
+async def analyze_students_stream(request: Request, use_cache: bool = True, mode: Optional[str] = None, incremental: Optional[bool] = None):
+    """Analyze an NDJSON or JSON upload while it is still arriving, streaming NDJSON results back"""
+    validate_analysis_mode(mode)
+    enter_lane(request, "bulk", BULK_MAX_QUEUE_SECONDS)
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        records = aiter_ndjson(request.stream())
+    else:
+        records = aiter_json_array(request.stream())
+    
+    async def results():
+        async for result in analyze_record_stream(records, use_cache=use_cache, mode=mode, incremental=incremental):
+            yield json.dumps(result, default=str) + "\n"
+    
+    return UploadStreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.post("/jobs")
+async def submit_job(students_data: StudentsData, use_cache: bool = True):
+    """Submit students for background analysis and return a job id immediately"""
+    observe_request_parsing()
+    if not students_data.students:
+        raise HTTPException(status_code=400, detail="No student data provided")
+    
+    job_id = job_manager.submit([student.model_dump() for student in students_data.students], use_cache=use_cache)
+    return job_status(job_manager.store.get_job(job_id))
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get progress counts for an analysis job"""
+    job = job_manager.store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job_results(job_id: str, format: str = "ndjson"):
+    """Stream each student's result as it completes (NDJSON, or SSE with format=sse)"""
+    if job_manager.store.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    
+    async def events():
+        async for result in job_manager.stream(job_id):
+            line = json.dumps(result, default=str)
+            yield f"data: {line}\n\n" if format == "sse" else line + "\n"
+    
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+@app.post("/analyze-single", response_model=StudentAnalysisResult)
+async def analyze_single_student_endpoint(
+    student: ComprehensiveStudentProfile,
+    request: Request,
+    use_cache: bool = True,
+    mode: Optional[str] = None,
+    incremental: Optional[bool] = None,
+    fields: Optional[str] = None,
+    include_profile: bool = True
+):
     """Analyze a single comprehensive student profile"""
+    observe_request_parsing()
+    validate_analysis_mode(mode)
+    selected_fields = parse_fields(fields)
+    enter_lane(request, "interactive")
     try:
-        result = await analyze_single_student(student)
+        result = await analyze_single_student(student, use_cache=use_cache, mode=mode, incremental=incremental)
         if result.get("status") == "error":
             raise HTTPException(status_code=500, detail=result.get("error"))
-        return result
+        return ORJSONResponse(project_result(result, selected_fields, include_profile))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
-@app.get("/results/{student_name}")
-async def get_student_results(student_name: str):
+@app.post("/classify-local", response_model=ClassificationResult)
+async def classify_local(student: ComprehensiveStudentProfile):
+    """Classify a profile against the skill taxonomy without calling the model"""
+    result = classify_locally(student)
+    if result is None:
+        raise HTTPException(status_code=422, detail="Profile has no skills that match the taxonomy")
+    return result
+
+# A plain def, so the CPU-bound scoring runs in the threadpool instead of stalling the event loop
+@app.post("/cohort/scores")
+def score_cohort(students_data: StudentsData, include_students: bool = True):
+    """Score every student against every skill cluster and report cohort affinity and skill gaps"""
+    if not students_data.students:
+        raise HTTPException(status_code=400, detail="No student data provided")
+    return cohort_scorer.get().score(students_data.students, include_students=include_students)
+
+@app.get("/results/{student_name}", response_model=StoredAnalysisResult)
+async def get_student_results(student_name: str, fields: Optional[str] = None, include_profile: bool = True):
     """Get saved analysis results for a student"""
-    safe_name = student_name.replace(" ", "_").replace("/", "_")
-    filename = f"{safe_name}_comprehensive_analysis.json"
-    filepath = os.path.join("analysis_results", filename)
-    
-    if not os.path.exists(filepath):
-        raise HTTPException(status_code=404, detail="Results not found for this student")
-    
+    selected_fields = parse_fields(fields)
     try:
-        with open(filepath, 'r') as f:
-            results = json.load(f)
-        return results
+        results = result_store.get(student_name)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading results: {str(e)}")
+    
+    if results is None:
+        raise HTTPException(status_code=404, detail="Results not found for this student")
+    return ORJSONResponse(project_result(results, selected_fields, include_profile))
+
+@app.get("/results/{student_id}/history")
+async def get_student_history(
+    student_id: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    include_profile: bool = False,
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    """Every stored version of a student's analysis, newest first; student_id is their email (or their name)"""
+    if history_store is None:
+        raise HTTPException(status_code=404, detail="Analysis history is disabled")
+    resolved = student_id.strip().lower() if "@" in student_id else history_store.student_id_by_name(student_id) or student_id
+    history = history_store.history(resolved, since=since, until=until, limit=limit, offset=offset, include_profile=include_profile)
+    if not history["total"] and not history_store.get(resolved, include_profile=False):
+        raise HTTPException(status_code=404, detail="No analysis history for this student")
+    return ORJSONResponse(history)
+
+@app.get("/history/stats")
+async def history_stats():
+    """Analysis history size and profile deduplication"""
+    if history_store is None:
+        return {"enabled": False}
+    return {"enabled": True, **history_store.stats()}
 
 @app.get("/results")
-async def list_all_results():
-    """List all available analysis results"""
-    ensure_results_directory()
-    
+async def list_all_results(
+    classification: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    """List saved analysis results, newest first, filtered by classification and timestamp range"""
     try:
-        files = [f for f in os.listdir("analysis_results") if f.endswith("_comprehensive_analysis.json")]
-        results = []
-        
-        for filename in files:
-            filepath = os.path.join("analysis_results", filename)
-            try:
-                with open(filepath, 'r') as f:
-                    data = json.load(f)
-                    results.append({
-                        "filename": filename,
-                        "student_name": data.get("student_name"),
-                        "classification": data.get("classification"),
-                        "timestamp": data.get("timestamp"),
-                        "analysis_version": data.get("analysis_version", "2.0.0")
-                    })
-            except Exception:
-                continue
-        
-        return {"results": results, "total": len(results)}
+        return result_store.list(classification=classification, since=since, until=until, limit=limit, offset=offset)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing results: {str(e)}")
 
+# A plain def: the snapshot may wait on the analytics lock while the writer thread holds it
+@app.get("/analytics")
+def get_analytics(buckets: int = Query(30, ge=1, le=365), top: int = Query(10, ge=1, le=100)):
+    """Precomputed cohort aggregates: current distribution, per-bucket trend and top (missing) skills"""
+    return ORJSONResponse(cohort_analytics.snapshot(buckets=buckets, top=top))
+
+@app.get("/export")
+async def export_all_results(
+    format: str = "ndjson",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    classification: Optional[str] = None,
+    chunk_rows: int = Query(1000, ge=1, le=10000)
+):
+    """Stream stored results in chunks; CSV and Parquet flatten profile_summary into columns"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed")
+    
+    results = result_store.iter_results(classification=classification, since=since, until=until)
+    # A sync iterator, so Starlette reads the store in a worker thread rather than on the event loop
+    return StreamingResponse(
+        export_results(results, format, chunk_rows),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="analysis_results.{FILE_EXTENSIONS[format]}"'}
+    )
+
 @app.post("/validate-profile")
 async def validate_profile(student: ComprehensiveStudentProfile):
     """Validate a student profile without running analysis"""
@@ -530,6 +1484,109 @@ async def validate_profile(student: ComprehensiveStudentProfile):
             "message": f"Profile validation failed: {str(e)}"
         }
 
+@app.get("/analysis/modes")
+async def analysis_mode_comparison():
+    """Compare average latency and token usage of the single-call and two-step analysis modes"""
+    comparison = {}
+    for mode, stats in analysis_mode_stats.items():
+        count = stats["analyses"]
+        comparison[mode] = {
+            **stats,
+            "avg_seconds": round(stats["seconds"] / count, 4) if count else None,
+            "avg_input_tokens": round(stats["input_tokens"] / count, 1) if count else None,
+            "avg_output_tokens": round(stats["output_tokens"] / count, 1) if count else None
+        }
+    return {"default_mode": ANALYSIS_MODE, "modes": comparison}
+
+@app.get("/semantic-cache/stats")
+async def semantic_cache_stats():
+    """Semantic cache hit rate and label agreement of near-duplicate neighbours per similarity threshold"""
+    # Building the index preallocates it in full, so a disabled cache is not built just to report on it
+    if SEMANTIC_CACHE_MODE == "off" and not semantic_cache.built:
+        return {"mode": SEMANTIC_CACHE_MODE}
+    return {"mode": SEMANTIC_CACHE_MODE, **semantic_cache.get().stats()}
+
+@app.delete("/semantic-cache")
+async def clear_semantic_cache():
+    """Drop every indexed profile from the semantic cache"""
+    if SEMANTIC_CACHE_MODE != "off" or semantic_cache.built:
+        semantic_cache.get().clear()
+    return {"cleared": True}
+
+@app.get("/coalescing/stats")
+async def coalescing_stats():
+    """Analyses run versus requests that joined an identical analysis already in flight"""
+    return analysis_flights.stats()
+
+@app.get("/incremental/stats")
+async def incremental_stats():
+    """How often incremental re-analysis reran everything, only recommendations, or nothing"""
+    return fingerprint_store.stats()
+
+@app.get("/startup/stats")
+async def startup_stats():
+    """Warm-up step timings and which deferred components have been built"""
+    lazy = {"agents": agents, "cohort_scorer": cohort_scorer, "semantic_cache": semantic_cache}
+    return {
+        "warm_up": warm_up_report,
+        "built": {
+            name: {"built": value.built, "build_seconds": round(value.build_seconds, 4) if value.build_seconds is not None else None}
+            for name, value in lazy.items()
+        },
+    }
+
+@app.get("/recommendation-library/stats")
+async def recommendation_library_stats():
+    """Stored recommendation sets, reuse hit rate and lookup time"""
+    if recommendation_library is None:
+        return {"mode": RECOMMENDATION_LIBRARY_MODE}
+    return {"mode": RECOMMENDATION_LIBRARY_MODE, **recommendation_library.stats(), "coalescing": recommendation_flights.stats()}
+
+@app.delete("/recommendation-library")
+async def clear_recommendation_library():
+    """Drop every stored recommendation set"""
+    if recommendation_library is not None:
+        recommendation_library.clear()
+    return {"cleared": True}
+
+@app.get("/classification/batches")
+async def classification_batch_stats():
+    """Batched classification sizes, adaptive batch size and students re-queued individually"""
+    if classification_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **classification_batcher.stats()}
+
+@app.get("/prompts/stats")
+async def prompt_stats():
+    """Estimated input tokens per prompt kind and how often the token budget forced truncation"""
+    return prompt_builder.report()
+
+@app.get("/models/stats")
+async def model_stats():
+    """Per-backend latency, error and circuit breaker state, plus hedging counts"""
+    return model_router.stats()
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    """Get model call scheduler statistics"""
+    return llm_scheduler.stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Get LLM response cache hit/miss statistics"""
+    return llm_cache.stats()
+
+@app.delete("/cache")
+async def clear_cache():
+    """Clear all cached LLM responses"""
+    llm_cache.clear()
+    return {"cleared": True}
+
 # Configuration and startup
 if __name__ == "__main__":
     # Make sure to set your Gemini API key as an environment variable
@@ -539,6 +1596,7 @@ if __name__ == "__main__":
         print("Warning: GEMINI_API_KEY environment variable not set!")
         print("Please set it with: export GEMINI_API_KEY='your-api-key-here'")
     
+    import uvicorn
     uvicorn.run(
         "main:app",  # Assuming this file is named main.py
         host="0.0.0.0",
@@ -0,0 +1,186 @@
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "analysis_stage_duration_seconds", "Time spent in each analysis pipeline stage", ["stage"], buckets=LATENCY_BUCKETS
+)
+STAGE_ERRORS = Counter("analysis_stage_errors_total", "Exceptions raised per pipeline stage", ["stage"])
+ANALYSES = Counter("analyses_total", "Completed student analyses", ["status", "mode"])
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_duration_seconds", "Model call latency per agent", ["agent"], buckets=LATENCY_BUCKETS
+)
+LLM_CALLS = Counter("llm_calls_total", "Model calls per agent and outcome", ["agent", "outcome"])
+LLM_TOKENS = Counter("llm_tokens_total", "Model tokens per agent", ["agent", "direction"])
+LLM_QUEUE_SECONDS = Histogram(
+    "llm_queue_wait_seconds", "Time model calls waited for dispatch per priority lane", ["lane"], buckets=LATENCY_BUCKETS
+)
+LLM_QUEUE_DROPPED = Counter("llm_queue_dropped_total", "Model calls dropped after waiting past their lane's deadline", ["lane"])
+COALESCED_ANALYSES = Counter("coalesced_analyses_total", "Duplicate analyses answered by a shared run", ["source"])
+INCREMENTAL_PLANS = Counter("incremental_reanalysis_total", "Incremental re-analysis decisions", ["plan"])
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+IN_FLIGHT = Gauge("in_flight", "Work currently in progress", ["kind"], multiprocess_mode="livesum")
+
+# TRACE_REQUESTS=true traces every request; otherwise send an "X-Trace: 1" header per request
+TRACE_ALL_REQUESTS = os.getenv("TRACE_REQUESTS", "false").lower() in ("1", "true", "yes")
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+request_started_var: ContextVar[Optional[float]] = ContextVar("request_started", default=None)
+tracing_var: ContextVar[bool] = ContextVar("tracing", default=False)
+trace_var: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+
+class Trace:
+    """Timed spans recorded for one unit of work within a request"""
+
+    def __init__(self, request_id: Optional[str]):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, name: str, started: float, seconds: float, error: bool, attributes: Dict[str, Any]):
+        span = {
+            "name": name,
+            "start_ms": round((started - self.started) * 1000, 3),
+            "duration_ms": round(seconds * 1000, 3),
+        }
+        if error:
+            span["error"] = True
+        span.update(attributes)
+        self.spans.append(span)
+
+
+def start_trace() -> Optional[Trace]:
+    """Begin a trace in the current context when the request asked for tracing"""
+    if not tracing_var.get():
+        return None
+    trace = Trace(request_id_var.get())
+    trace_var.set(trace)
+    return trace
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """Record a span in the current trace, if there is one"""
+    trace = trace_var.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        trace.add(name, started, time.perf_counter() - started, error, attributes)
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[None]:
+    """Time a pipeline stage into the stage histogram, error counter and current trace"""
+    started = time.perf_counter()
+    try:
+        with span(name, **attributes):
+            yield
+    except Exception:
+        STAGE_ERRORS.labels(stage=name).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage=name).observe(time.perf_counter() - started)
+
+
+def observe_request_parsing():
+    """Record time from request arrival to handler entry (body read plus Pydantic validation)"""
+    started = request_started_var.get()
+    if started is not None:
+        STAGE_SECONDS.labels(stage="request_validation").observe(time.perf_counter() - started)
+
+
+@contextmanager
+def in_flight(kind: str) -> Iterator[None]:
+    gauge = IN_FLIGHT.labels(kind=kind)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def record_llm_call(agent: str, seconds: float, outcome: str, input_tokens: int = 0, output_tokens: int = 0):
+    LLM_CALLS.labels(agent=agent, outcome=outcome).inc()
+    if outcome == "success":
+        LLM_CALL_SECONDS.labels(agent=agent).observe(seconds)
+        LLM_TOKENS.labels(agent=agent, direction="input").inc(input_tokens)
+        LLM_TOKENS.labels(agent=agent, direction="output").inc(output_tokens)
+
+
+def record_queue_wait(lane: str, seconds: float, dropped: bool):
+    if dropped:
+        LLM_QUEUE_DROPPED.labels(lane=lane).inc()
+    else:
+        LLM_QUEUE_SECONDS.labels(lane=lane).observe(seconds)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def render_metrics() -> bytes:
+    """Metrics of this process, or of every worker when PROMETHEUS_MULTIPROC_DIR is set (multi-worker mode)"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+class MetricsMiddleware:
+    """ASGI middleware: request ids, per-request tracing flag, HTTP latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1") or uuid.uuid4().hex
+        tracing = TRACE_ALL_REQUESTS or headers.get(b"x-trace", b"").lower() in (b"1", b"true")
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        started = time.perf_counter()
+        request_token = request_id_var.set(request_id)
+        started_token = request_started_var.set(started)
+        tracing_token = tracing_var.set(tracing)
+        try:
+            with in_flight("http_requests"):
+                await self.app(scope, receive, send_with_request_id)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(method=scope["method"], route=route, status=str(status)).observe(
+                time.perf_counter() - started
+            )
+            request_id_var.reset(request_token)
+            request_started_var.reset(started_token)
+            tracing_var.reset(tracing_token)
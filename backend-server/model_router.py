@@ -0,0 +1,319 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+from prompt_builder import STUDENT_ID_RE
+
+if TYPE_CHECKING:
+    # Imported where used, so building the router does not pull in pydantic_ai at startup
+    from pydantic_ai import Agent
+    from pydantic_ai.messages import ModelMessage, ModelResponse
+    from pydantic_ai.models import Model
+    from pydantic_ai.models.function import AgentInfo
+
+
+class RouterUnavailableError(Exception):
+    """Raised when every backend's circuit breaker is open"""
+
+
+def is_output_error(error: BaseException) -> bool:
+    """The backend answered, but not in the shape the agent asked for; says nothing about its health"""
+    from pydantic_ai.exceptions import UnexpectedModelBehavior
+    return isinstance(error, UnexpectedModelBehavior)
+
+
+class LatencyTracker:
+    """Rolling window of call latencies, failed and abandoned calls included"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single trial call through once the reset timeout passes"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.trial_in_flight)
+
+    def admit(self) -> bool:
+        """Claim a call: always while closed, and only the one trial call while half-open"""
+        if not self.allow():
+            return False
+        if self.state == "half_open":
+            self.trial_in_flight = True
+        return True
+
+    def abandon(self):
+        """The admitted call ended without telling whether the backend is healthy"""
+        self.trial_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.state == "half_open":
+            self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+
+
+class Backend:
+    """One model target with its own latency history and circuit breaker"""
+
+    def __init__(self, name: str, model_name: str, model_factory: Callable[[], "Model"], failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.model_name = model_name
+        self._model_factory = model_factory
+        self._model: Optional["Model"] = None
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.calls = 0
+        self.errors = 0
+
+    @property
+    def model(self) -> "Model":
+        # Built on first use so unused backends never need credentials
+        if self._model is None:
+            self._model = self._model_factory()
+        return self._model
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.latency.percentile(0.5), self.latency.percentile(0.95)
+        return {
+            "model": self.model_name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "circuit": self.breaker.state,
+            "p50_seconds": round(p50, 4) if p50 is not None else None,
+            "p95_seconds": round(p95, 4) if p95 is not None else None,
+        }
+
+
+class ModelRouter:
+    """Routes agent runs across backends in priority order, with failover and optional hedged requests"""
+
+    def __init__(self, backends: List[Backend], hedge: bool = False, hedge_min_samples: int = 20, hedge_min_delay: float = 0.5):
+        if not backends:
+            raise ValueError("ModelRouter needs at least one backend")
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+
+    @property
+    def signature(self) -> str:
+        """Identifies the backend set, so cached responses are not shared across configurations"""
+        return ",".join(f"{backend.name}:{backend.model_name}" for backend in self.backends)
+
+    def available_backends(self) -> List[Backend]:
+        available = [backend for backend in self.backends if backend.breaker.allow()]
+        if not available:
+            raise RouterUnavailableError("All model backends are unavailable (circuit breakers open)")
+        return available
+
+    async def _run_on(self, backend: Backend, permit: Callable[[], Awaitable[None]], agent: "Agent", prompt: str, **kwargs) -> Any:
+        if not backend.breaker.admit():
+            raise RouterUnavailableError(f"Model backend {backend.name} is unavailable (circuit breaker)")
+        try:
+            await permit()
+        except BaseException:
+            backend.breaker.abandon()
+            raise
+        backend.calls += 1
+        started = time.monotonic()
+        try:
+            result = await agent.run(prompt, model=backend.model, **kwargs)
+        except asyncio.CancelledError:
+            # A cancelled hedge loser took at least this long; leaving it out would bias the p95 trigger low
+            backend.latency.record(time.monotonic() - started)
+            backend.breaker.abandon()
+            raise
+        except Exception as e:
+            backend.errors += 1
+            backend.latency.record(time.monotonic() - started)
+            if is_output_error(e):
+                backend.breaker.abandon()
+            else:
+                backend.breaker.record_failure()
+            raise
+        backend.latency.record(time.monotonic() - started)
+        backend.breaker.record_success()
+        return result
+
+    def _hedge_delay(self, backend: Backend) -> Optional[float]:
+        if not self.hedge or len(backend.latency.samples) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, backend.latency.percentile(0.95))
+
+    async def run(self, agent: "Agent", prompt: str, acquire_extra: Optional[Callable[[], Awaitable[None]]] = None, **kwargs) -> Any:
+        """Run the agent on the first healthy backend, failing over (and hedging) to the next ones.
+
+        The caller has been admitted for one provider request. Every further one, a failover or a hedged
+        duplicate, first awaits acquire_extra so it is rate limited like any other call.
+        """
+        candidates = self.available_backends()
+        admitted = True
+
+        async def permit():
+            nonlocal admitted
+            if admitted:
+                admitted = False
+            elif acquire_extra is not None:
+                await acquire_extra()
+
+        last_error: Optional[BaseException] = None
+        index = 0
+        while index < len(candidates):
+            primary = candidates[index]
+            secondary = candidates[index + 1] if index + 1 < len(candidates) else None
+            delay = self._hedge_delay(primary) if secondary is not None else None
+            try:
+                if delay is None:
+                    return await self._run_on(primary, permit, agent, prompt, **kwargs)
+                return await self._run_hedged(primary, secondary, delay, permit, agent, prompt, **kwargs)
+            except Exception as e:
+                last_error = e
+                # A hedged attempt has already used the secondary backend too
+                index += 2 if delay is not None else 1
+        raise last_error
+
+    async def _run_hedged(self, primary: Backend, secondary: Backend, delay: float, permit: Callable[[], Awaitable[None]], agent: "Agent", prompt: str, **kwargs) -> Any:
+        first = asyncio.create_task(self._run_on(primary, permit, agent, prompt, **kwargs))
+        second = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                if first.exception() is None:
+                    return first.result()
+                return await self._run_on(secondary, permit, agent, prompt, **kwargs)
+
+            # Primary is slower than its p95: send a duplicate to the secondary and take whichever finishes first
+            self.hedged_requests += 1
+            second = asyncio.create_task(self._run_on(secondary, permit, agent, prompt, **kwargs))
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+            raise first.exception() or second.exception()
+        finally:
+            for task in (first, second):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backends": {backend.name: backend.stats() for backend in self.backends},
+            "hedging": self.hedge,
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+STUB_CLASSIFICATION = "Full-Stack Web Developer"
+
+STUB_RECOMMENDATIONS = """1. Build two portfolio projects that use the skills listed in your profile
+2. Complete one industry certification in your target field within three months
+3. Practice data structures and algorithms for 30 minutes daily"""
+
+def _stub_response(messages: List["ModelMessage"], info: "AgentInfo") -> "ModelResponse":
+    """Deterministic offline stand-in for a real model"""
+    from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, UserPromptPart
+    from pydantic_ai.models.test import TestModel
+    prompt = ""
+    for part in messages[-1].parts:
+        if isinstance(part, UserPromptPart) and isinstance(part.content, str):
+            prompt = part.content
+    if info.output_tools and not info.allow_text_output:
+        tool = info.output_tools[0]
+        if "classifications" in tool.parameters_json_schema.get("properties", {}):
+            # Batched classification: one entry per tagged student
+            entries = [{"student_id": student_id, "classification": STUB_CLASSIFICATION, "confidence": 0.8}
+                       for student_id in STUDENT_ID_RE.findall(prompt)]
+            return ModelResponse(parts=[ToolCallPart(tool.name, {"classifications": entries})])
+        return ModelResponse(parts=[ToolCallPart(tool.name, TestModel().gen_tool_args(tool))])
+    text = STUB_RECOMMENDATIONS if "recommend" in prompt.lower() else STUB_CLASSIFICATION
+    return ModelResponse(parts=[TextPart(text)])
+
+
+def build_backend(name: str, gemini_model: str) -> Backend:
+    """Create a named backend: gemini, local (OpenAI-compatible, e.g. LM Studio) or stub"""
+    threshold = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    reset_timeout = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+    if name == "gemini":
+        def gemini() -> "Model":
+            from pydantic_ai.models import infer_model
+            base_url = os.getenv("GEMINI_BASE_URL")
+            if not base_url:
+                return infer_model(gemini_model)
+            # Compatible endpoint, e.g. the benchmark mock server
+            import httpx
+            from pydantic_ai.models.gemini import GeminiModel
+            from pydantic_ai.providers.google_gla import GoogleGLAProvider
+            provider = GoogleGLAProvider(http_client=httpx.AsyncClient(timeout=600))
+            provider.client.base_url = base_url.rstrip("/") + "/v1beta/models/"
+            return GeminiModel(gemini_model, provider=provider)
+        return Backend(name, gemini_model, gemini, threshold, reset_timeout)
+    if name == "local":
+        local_model_name = os.getenv("LOCAL_LLM_MODEL", "gemma-3-1b-it")
+
+        def local_model() -> "Model":
+            from pydantic_ai.models.openai import OpenAIModel
+            from pydantic_ai.providers.openai import OpenAIProvider
+            provider = OpenAIProvider(
+                base_url=os.getenv("LOCAL_LLM_URL", "http://localhost:1234/v1"),
+                api_key=os.getenv("LOCAL_LLM_API_KEY", "lm-studio")
+            )
+            return OpenAIModel(local_model_name, provider=provider)
+        return Backend(name, local_model_name, local_model, threshold, reset_timeout)
+    if name == "stub":
+        def stub_model() -> "Model":
+            from pydantic_ai.models.function import FunctionModel
+            return FunctionModel(_stub_response)
+        return Backend(name, "stub", stub_model, threshold, reset_timeout)
+    raise ValueError(f"Unknown model backend: {name}")
+
+
+def create_model_router(gemini_model: str) -> ModelRouter:
+    """Build the router from MODEL_BACKENDS (priority order) and HEDGE_REQUESTS"""
+    names = [name.strip() for name in os.getenv("MODEL_BACKENDS", "gemini").split(",") if name.strip()]
+    return ModelRouter(
+        [build_backend(name, gemini_model) for name in names],
+        hedge=os.getenv("HEDGE_REQUESTS", "false").lower() in ("1", "true", "yes"),
+        hedge_min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+        hedge_min_delay=float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.5"))
+    )
@@ -0,0 +1,127 @@
+import copy
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from scheduler import estimate_tokens
+
+# Profile summary fields dropped, lowest priority first, when a prompt exceeds its token budget
+TRUNCATION_ORDER = (
+    "volunteer_work",
+    "professional_experience.key_responsibilities",
+    "support_needs",
+    "languages",
+    "personal_info",
+    "education.institutions",
+    "professional_experience.employment_duration",
+    "learning_preferences.learning_challenges",
+    "learning_preferences.learning_style",
+    "career_goals.motivation",
+    "soft_skills",
+)
+
+_EMPTY = (None, "", [], {})
+
+# Tags each profile in a batched prompt, e.g. "[s3] {...}"
+STUDENT_ID_RE = re.compile(r"^\[(s\d+)\]", re.MULTILINE)
+
+
+def compact(value: Any) -> Any:
+    """Recursively drop nulls, blank strings and empty containers"""
+    if isinstance(value, dict):
+        compacted = {key: compact(item) for key, item in value.items()}
+        return {key: item for key, item in compacted.items() if item not in _EMPTY}
+    if isinstance(value, list):
+        return [item for item in (compact(item) for item in value) if item not in _EMPTY]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def serialize(value: Any) -> str:
+    """Canonical compact JSON: no indentation, stable key order"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _drop_path(data: Dict[str, Any], path: str) -> bool:
+    keys = path.split(".")
+    node = data
+    for key in keys[:-1]:
+        node = node.get(key)
+        if not isinstance(node, dict):
+            return False
+    if keys[-1] not in node:
+        return False
+    del node[keys[-1]]
+    return True
+
+
+class BuiltPrompt(NamedTuple):
+    text: str
+    tokens: int
+    dropped: List[str]
+
+
+class PromptBuilder:
+    """Builds compact prompts from profile summaries within a per-request token budget"""
+
+    def __init__(self, token_budget: int = 1500, truncation_order: Sequence[str] = TRUNCATION_ORDER):
+        self.token_budget = token_budget
+        self.truncation_order = truncation_order
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def build(self, kind: str, header: str, data: Dict[str, Any], footer: str = "", system_prompt: str = "") -> BuiltPrompt:
+        """Render header + compact data + footer, dropping low-priority fields until within budget"""
+        data = compact(data)
+        dropped: List[str] = []
+        text = self._render(header, data, footer)
+        tokens = estimate_tokens(system_prompt, text)
+        if tokens > self.token_budget:
+            data = copy.deepcopy(data)
+            for path in self.truncation_order:
+                if not _drop_path(data, path):
+                    continue
+                dropped.append(path)
+                data = compact(data)
+                text = self._render(header, data, footer)
+                tokens = estimate_tokens(system_prompt, text)
+                if tokens <= self.token_budget:
+                    break
+        self._record(kind, tokens, dropped)
+        return BuiltPrompt(text, tokens, dropped)
+
+    @staticmethod
+    def _render(header: str, data: Dict[str, Any], footer: str) -> str:
+        parts = [header.strip(), serialize(data)]
+        if footer:
+            parts.append(footer.strip())
+        return "\n".join(parts)
+
+    def _record(self, kind: str, tokens: int, dropped: List[str]):
+        stats = self.stats.setdefault(kind, {"calls": 0, "estimated_tokens": 0, "truncated_calls": 0, "over_budget_calls": 0})
+        stats["calls"] += 1
+        stats["estimated_tokens"] += tokens
+        if dropped:
+            stats["truncated_calls"] += 1
+        if tokens > self.token_budget:
+            stats["over_budget_calls"] += 1
+
+    def report(self) -> Dict[str, Any]:
+        kinds = {}
+        for kind, stats in self.stats.items():
+            kinds[kind] = {**stats, "avg_estimated_tokens": round(stats["estimated_tokens"] / stats["calls"], 1)}
+        return {"token_budget": self.token_budget, "prompts": kinds}
+
+
+def select_sections(profile_summary: Dict[str, Any], sections: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Pick the named top-level sections of a profile summary (all of them when sections is None)"""
+    if sections is None:
+        return profile_summary
+    return {key: profile_summary[key] for key in sections if key in profile_summary}
+
+
+def batch_prompt(items: List[Tuple[str, str]]) -> str:
+    """One tagged compact profile per line, as matched by STUDENT_ID_RE"""
+    lines = [f"Classify each of these {len(items)} students independently. Profiles are compact JSON, one per line:"]
+    lines += [f"[{student_id}] {text}" for student_id, text in items]
+    return "\n".join(lines)
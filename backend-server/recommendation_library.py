@@ -0,0 +1,211 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from analytics import normalize_skill
+
+# Placeholders for the student's names in stored recommendations, filled in for each student they are reused for
+NAME_PLACEHOLDER = "<<name>>"
+FIRST_NAME_PLACEHOLDER = "<<first_name>>"
+
+# Recommendation lists outside this size are not stored
+MIN_RECOMMENDATIONS = 2
+MAX_RECOMMENDATIONS = 8
+
+
+def skill_gap(profile_summary: Dict[str, Any]) -> FrozenSet[str]:
+    """Normalized skills the student wants to acquire but does not list among their technical skills"""
+    technical = profile_summary.get("technical_skills") or {}
+    current = {
+        normalize_skill(skill)
+        for key in ("programming_languages", "other_technical_skills")
+        for skill in technical.get(key) or []
+    }
+    wanted = {normalize_skill(skill) for skill in (profile_summary.get("learning_preferences") or {}).get("skills_to_acquire") or []}
+    return frozenset(wanted - current - {""})
+
+
+def normalize_classification(classification: str) -> str:
+    return " ".join(classification.lower().split())
+
+
+def _name_patterns(student_name: str) -> List[Tuple[re.Pattern, str]]:
+    """Full name first, so a first name inside it is not replaced separately"""
+    names = [(student_name.strip(), NAME_PLACEHOLDER)]
+    first_name = student_name.split()[0] if student_name.split() else ""
+    if first_name and first_name != student_name.strip():
+        names.append((first_name, FIRST_NAME_PLACEHOLDER))
+    return [(re.compile(rf"\b{re.escape(name)}\b"), placeholder) for name, placeholder in names if name]
+
+
+def to_template(recommendations: List[str], student_name: str) -> List[str]:
+    templates = []
+    for recommendation in recommendations:
+        for pattern, placeholder in _name_patterns(student_name):
+            recommendation = pattern.sub(placeholder, recommendation)
+        templates.append(recommendation)
+    return templates
+
+
+def personalize(templates: List[str], student_name: str) -> List[str]:
+    first_name = student_name.split()[0] if student_name.split() else student_name
+    return [template.replace(NAME_PLACEHOLDER, student_name).replace(FIRST_NAME_PLACEHOLDER, first_name) for template in templates]
+
+
+def valid_recommendations(recommendations: List[str]) -> bool:
+    return MIN_RECOMMENDATIONS <= len(recommendations) <= MAX_RECOMMENDATIONS and all(len(item.strip()) > 10 for item in recommendations)
+
+
+class RecommendationLibrary:
+    """Validated model recommendations indexed by (classification, skill gap), reused for students with a similar gap.
+
+    Entries live in SQLite so every server process shares them; each process keeps an in-memory inverted
+    index (skill -> entries, per classification) and picks up other processes' entries every
+    refresh_seconds. A lookup scores only the entries sharing a gap skill with the query, by Jaccard
+    similarity of the two gap sets, so it stays well under a millisecond for large libraries.
+    """
+
+    def __init__(self, path: str = "recommendation_library.db", threshold: float = 0.8, signature: str = "", refresh_seconds: float = 5.0):
+        self.path = path
+        self.threshold = threshold
+        self.signature = signature
+        self.refresh_seconds = refresh_seconds
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.lookup_seconds = 0.0
+        self._lock = threading.Lock()
+        self._reset()
+        self.reconnect()
+
+    def _reset(self):
+        # classification -> gap -> entry, and classification -> skill -> gaps containing it
+        self._entries: Dict[str, Dict[FrozenSet[str], Dict[str, Any]]] = defaultdict(dict)
+        self._postings: Dict[str, Dict[str, Set[FrozenSet[str]]]] = defaultdict(lambda: defaultdict(set))
+        self._last_id = 0
+        self._refreshed_at = 0.0
+
+    def reconnect(self):
+        """Open a fresh connection (a forked worker must not reuse its parent's)"""
+        with self._lock:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS recommendations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    signature TEXT NOT NULL,
+                    classification TEXT NOT NULL,
+                    gap TEXT NOT NULL,
+                    recommendations TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    UNIQUE (signature, classification, gap)
+                )"""
+            )
+            self._reset()
+            self._refresh()
+
+    def _refresh(self):
+        """Index entries written since the last refresh, by this or another process"""
+        rows = self._conn.execute(
+            "SELECT id, classification, gap, recommendations FROM recommendations WHERE signature = ? AND id > ? ORDER BY id",
+            (self.signature, self._last_id),
+        ).fetchall()
+        for entry_id, classification, gap, recommendations in rows:
+            self._index(classification, frozenset(json.loads(gap)), json.loads(recommendations))
+            self._last_id = entry_id
+        self._refreshed_at = time.monotonic()
+
+    def _index(self, classification: str, gap: FrozenSet[str], templates: List[str]):
+        self._entries[classification][gap] = {"gap": gap, "recommendations": templates}
+        for skill in gap:
+            self._postings[classification][skill].add(gap)
+
+    def _best(self, classification: str, gap: FrozenSet[str]) -> Tuple[Optional[Dict[str, Any]], float]:
+        entries = self._entries.get(classification)
+        if not entries:
+            return None, 0.0
+        if gap in entries:
+            return entries[gap], 1.0
+        overlaps: Dict[FrozenSet[str], int] = defaultdict(int)
+        postings = self._postings[classification]
+        for skill in gap:
+            for candidate in postings.get(skill, ()):
+                overlaps[candidate] += 1
+        best, similarity = None, 0.0
+        for candidate, overlap in overlaps.items():
+            score = overlap / (len(gap) + len(candidate) - overlap)
+            if score > similarity:
+                best, similarity = entries[candidate], score
+        return best, similarity
+
+    def lookup(self, classification: str, gap: FrozenSet[str], student_name: str) -> Tuple[Optional[List[str]], float]:
+        """Personalized recommendations of the most similar stored gap, or None below threshold"""
+        started = time.perf_counter()
+        classification = normalize_classification(classification)
+        with self._lock:
+            if time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+                self._refresh()
+            entry, similarity = self._best(classification, gap)
+            hit = entry is not None and similarity >= self.threshold
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.lookup_seconds += time.perf_counter() - started
+        if not hit:
+            return None, similarity
+        return personalize(entry["recommendations"], student_name), similarity
+
+    def fallback(self, classification: str, gap: FrozenSet[str], student_name: str) -> Optional[List[str]]:
+        """Closest stored recommendations for the classification at any similarity, when the model's reply was unusable"""
+        classification = normalize_classification(classification)
+        with self._lock:
+            entry, _ = self._best(classification, gap)
+            if entry is None and self._entries.get(classification):
+                entry = next(reversed(self._entries[classification].values()))
+            if entry is None:
+                return None
+            self.fallbacks += 1
+        return personalize(entry["recommendations"], student_name)
+
+    def add(self, classification: str, gap: FrozenSet[str], recommendations: List[str], student_name: str) -> bool:
+        """Store validated model recommendations for this gap, replacing any older entry for it"""
+        # Without a gap there is nothing to match other students on
+        if not gap or not valid_recommendations(recommendations):
+            return False
+        classification = normalize_classification(classification)
+        templates = to_template(recommendations, student_name)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO recommendations (signature, classification, gap, recommendations, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.signature, classification, json.dumps(sorted(gap)), json.dumps(templates), time.time()),
+            )
+            self._index(classification, gap, templates)
+            self._last_id = max(self._last_id, cursor.lastrowid or 0)
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM recommendations")
+            self._reset()
+            self.hits = self.misses = self.fallbacks = 0
+            self.lookup_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": sum(len(entries) for entries in self._entries.values()),
+                "classifications": len(self._entries),
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "fallbacks": self.fallbacks,
+                "avg_lookup_us": round(self.lookup_seconds / lookups * 1e6, 1) if lookups else 0.0,
+            }
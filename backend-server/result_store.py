@@ -0,0 +1,367 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+def safe_student_name(student_name: str) -> str:
+    """Normalize a student name the same way result filenames always have"""
+    return student_name.replace(" ", "_").replace("/", "_")
+
+
+def keyset_pages(
+    fetch: Callable[[str, List[Any]], List[tuple]],
+    timestamp_column: str,
+    key_column: str,
+    batch_size: int,
+    after: Optional[Tuple[str, Optional[str]]] = None,
+    include_null: bool = True,
+) -> Iterator[List[tuple]]:
+    """Pages of rows in (timestamp, key) order, NULL timestamps first, strictly after the cursor after.
+
+    fetch(condition, params) runs one page query with condition added to its WHERE clause, ordered by
+    timestamp then key and limited to batch_size, returning rows that start with (timestamp, key). Every
+    condition is a range on the raw columns, so with an index on (timestamp, key) each page is an index
+    seek and a full export stays linear. A cursor of ("", key) is a row without a timestamp; (timestamp,
+    None) resumes after every row at that timestamp.
+    """
+    timestamp, key = after or ("", None)
+    if include_null and not timestamp:
+        # NULL never compares greater than anything, so rows without a timestamp page on the key alone
+        while True:
+            condition, params = f"{timestamp_column} IS NULL", []
+            if key is not None:
+                condition += f" AND {key_column} > ?"
+                params.append(key)
+            rows = fetch(condition, params)
+            if rows:
+                yield rows
+            if len(rows) < batch_size:
+                break
+            key = rows[-1][1]
+    if not timestamp:
+        condition, params = f"{timestamp_column} IS NOT NULL", []
+    elif key is None:
+        condition, params = f"{timestamp_column} > ?", [timestamp]
+    else:
+        condition, params = f"({timestamp_column}, {key_column}) > (?, ?)", [timestamp, key]
+    while True:
+        rows = fetch(condition, params)
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        condition, params = f"({timestamp_column}, {key_column}) > (?, ?)", list(rows[-1][:2])
+
+
+class ResultStore(ABC):
+    """Interface for analysis result persistence backends"""
+
+    @abstractmethod
+    def save(self, result_data: Dict[str, Any]) -> str:
+        """Persist one analysis result and return where it was stored"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, student_name: str) -> Optional[Dict[str, Any]]:
+        """Return the stored result for a student, or None"""
+        raise NotImplementedError
+
+    def reconnect(self):
+        """Reopen any handles inherited from a parent process"""
+
+    @abstractmethod
+    def list(
+        self,
+        classification: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """Return a page of result summaries, newest first, with the total match count"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_results(
+        self,
+        classification: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        batch_size: int = 500,
+        after: Optional[Tuple[str, Optional[str]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield full stored results, reading batch_size at a time so memory stays bounded.
+
+        after is the cursor() of a result from an earlier export; only results past it are yielded.
+        """
+        raise NotImplementedError
+
+    def cursor(self, result_data: Dict[str, Any]) -> Tuple[str, str]:
+        """Where a result sits in iter_results order: its timestamp ("" when missing) and the store's key"""
+        return result_data.get("timestamp") or "", safe_student_name(result_data.get("student_name") or "")
+
+
+class JSONFileResultStore(ResultStore):
+    """Legacy backend: one indented JSON file per student in a directory"""
+
+    def __init__(self, directory: str = "analysis_results"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, student_name: str) -> str:
+        return os.path.join(self.directory, f"{safe_student_name(student_name)}_comprehensive_analysis.json")
+
+    def save(self, result_data: Dict[str, Any]) -> str:
+        filepath = self._path(result_data["student_name"])
+        # Write then rename, so readers and concurrent writers never see a partial file
+        tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(result_data, f, indent=4)
+        os.replace(tmp_path, filepath)
+        return filepath
+
+    def get(self, student_name: str) -> Optional[Dict[str, Any]]:
+        filepath = self._path(student_name)
+        if not os.path.exists(filepath):
+            return None
+        with open(filepath, "r") as f:
+            return json.load(f)
+
+    def list(self, classification=None, since=None, until=None, limit=100, offset=0) -> Dict[str, Any]:
+        results = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith("_comprehensive_analysis.json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), "r") as f:
+                    data = json.load(f)
+            except Exception:
+                continue
+            summary = result_summary(data)
+            if classification and summary["classification"] != classification:
+                continue
+            if since and (summary["timestamp"] or "") < since:
+                continue
+            if until and (summary["timestamp"] or "") > until:
+                continue
+            results.append(summary)
+        results.sort(key=lambda r: r["timestamp"] or "", reverse=True)
+        return {"results": results[offset:offset + limit], "total": len(results), "limit": limit, "offset": offset}
+
+    def iter_results(self, classification=None, since=None, until=None, batch_size=500, after=None) -> Iterator[Dict[str, Any]]:
+        # One file at a time in filename order; sorting by timestamp would mean reading every file first
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith("_comprehensive_analysis.json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), "r") as f:
+                    data = json.load(f)
+            except Exception:
+                continue
+            timestamp = data.get("timestamp") or ""
+            if classification and data.get("classification") != classification:
+                continue
+            if since and timestamp < since:
+                continue
+            if until and timestamp > until:
+                continue
+            if after is not None and not self._past(self.cursor(data), after):
+                continue
+            yield data
+
+    @staticmethod
+    def _past(cursor: Tuple[str, str], after: Tuple[str, Optional[str]]) -> bool:
+        if after[1] is None:
+            return cursor[0] > after[0]
+        return cursor > after
+
+
+class SQLiteResultStore(ResultStore):
+    """Embedded SQLite (WAL) backend with indexed name, classification and timestamp columns"""
+
+    def __init__(self, path: str = "analysis_results/results.db"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.reconnect()
+
+    def reconnect(self):
+        """Open a fresh connection (a forked worker must not reuse its parent's)"""
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                safe_name TEXT PRIMARY KEY,
+                student_name TEXT NOT NULL,
+                classification TEXT,
+                timestamp TEXT,
+                analysis_version TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_results_student_name ON results(student_name);
+            CREATE INDEX IF NOT EXISTS idx_results_classification_timestamp ON results(classification, timestamp);
+            DROP INDEX IF EXISTS idx_results_timestamp;
+            CREATE INDEX IF NOT EXISTS idx_results_timestamp_name ON results(timestamp, safe_name);
+            """
+        )
+
+    def _upsert(self, result_data: Dict[str, Any]):
+        safe_name = safe_student_name(result_data["student_name"])
+        self._conn.execute(
+            """INSERT INTO results (safe_name, student_name, classification, timestamp, analysis_version, data)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(safe_name) DO UPDATE SET
+                   student_name = excluded.student_name,
+                   classification = excluded.classification,
+                   timestamp = excluded.timestamp,
+                   analysis_version = excluded.analysis_version,
+                   data = excluded.data""",
+            (
+                safe_name,
+                result_data["student_name"],
+                result_data.get("classification"),
+                result_data.get("timestamp"),
+                result_data.get("analysis_version", "2.0.0"),
+                json.dumps(result_data),
+            ),
+        )
+        return safe_name
+
+    def save(self, result_data: Dict[str, Any]) -> str:
+        with self._lock:
+            safe_name = self._upsert(result_data)
+        return f"{self.path}#{safe_name}"
+
+    def save_many(self, results: List[Dict[str, Any]]) -> int:
+        """Persist several results in one transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for result_data in results:
+                self._upsert(result_data)
+            self._conn.execute("COMMIT")
+        return len(results)
+
+    def get(self, student_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM results WHERE safe_name = ?", (safe_student_name(student_name),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(self, classification=None, since=None, until=None, limit=100, offset=0) -> Dict[str, Any]:
+        clauses, params = [], []
+        if classification:
+            clauses.append("classification = ?")
+            params.append(classification)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            (total,) = self._conn.execute(f"SELECT COUNT(*) FROM results {where}", params).fetchone()
+            rows = self._conn.execute(
+                f"""SELECT student_name, classification, timestamp, analysis_version FROM results {where}
+                    ORDER BY timestamp DESC LIMIT ? OFFSET ?""",
+                params + [limit, offset],
+            ).fetchall()
+        results = [
+            {"student_name": name, "classification": label, "timestamp": timestamp, "analysis_version": version}
+            for name, label, timestamp, version in rows
+        ]
+        return {"results": results, "total": total, "limit": limit, "offset": offset}
+
+    def iter_results(self, classification=None, since=None, until=None, batch_size=500, after=None) -> Iterator[Dict[str, Any]]:
+        # Keyset pagination on the (timestamp, safe_name) index, oldest first; the lock is held per batch only
+        clauses, params = [], []
+        if classification:
+            clauses.append("classification = ?")
+            params.append(classification)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+
+        def fetch(condition: str, page_params: List[Any]) -> List[tuple]:
+            where = " AND ".join(clauses + [condition])
+            with self._lock:
+                return self._conn.execute(
+                    f"SELECT timestamp, safe_name, data FROM results WHERE {where} ORDER BY timestamp, safe_name LIMIT ?",
+                    params + page_params + [batch_size],
+                ).fetchall()
+
+        # since and until already leave out results without a timestamp
+        for rows in keyset_pages(fetch, "timestamp", "safe_name", batch_size, after, include_null=not (since or until)):
+            for _, _, data in rows:
+                yield json.loads(data)
+
+
+def result_summary(data: Dict[str, Any]) -> Dict[str, Any]:
+    """The listing fields of a stored result"""
+    return {
+        "student_name": data.get("student_name"),
+        "classification": data.get("classification"),
+        "timestamp": data.get("timestamp"),
+        "analysis_version": data.get("analysis_version", "2.0.0"),
+    }
+
+
+def create_result_store() -> ResultStore:
+    """Build the result store selected by the RESULT_STORE environment variable"""
+    backend = os.getenv("RESULT_STORE", "sqlite")
+    if backend == "json":
+        return JSONFileResultStore(os.getenv("RESULTS_DIR", "analysis_results"))
+    if backend == "sqlite":
+        return SQLiteResultStore(os.getenv("RESULTS_DB_PATH", "analysis_results/results.db"))
+    if backend == "history":
+        from history_store import HistoryResultStore, create_history_store
+        return HistoryResultStore(create_history_store())
+    raise ValueError(f"Unknown RESULT_STORE backend: {backend}")
+
+
+def migrate_json_results(directory: str, store: SQLiteResultStore, batch_size: int = 500) -> int:
+    """One-shot import of legacy per-student JSON files into an SQLite store"""
+    migrated = 0
+    batch = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, filename), "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Skipping {filename}: {e}")
+            continue
+        if not isinstance(data, dict) or not data.get("student_name"):
+            print(f"Skipping {filename}: not an analysis result")
+            continue
+        batch.append(data)
+        if len(batch) >= batch_size:
+            migrated += store.save_many(batch)
+            batch = []
+    if batch:
+        migrated += store.save_many(batch)
+    return migrated
+
+
+if __name__ == "__main__":
+    # Usage: python result_store.py migrate [results_dir] [db_path]
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: python result_store.py migrate [results_dir] [db_path]")
+        sys.exit(1)
+    source_dir = sys.argv[2] if len(sys.argv) > 2 else "analysis_results"
+    db_path = sys.argv[3] if len(sys.argv) > 3 else "analysis_results/results.db"
+    count = migrate_json_results(source_dir, SQLiteResultStore(db_path))
+    print(f"Migrated {count} results from {source_dir} into {db_path}")
@@ -0,0 +1,436 @@
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Priority lanes for model calls and their default weights: with both lanes backlogged,
+# interactive calls get 10 of every 11 dispatches
+DEFAULT_LANE_WEIGHTS = {"interactive": 10.0, "bulk": 1.0}
+
+# Set per request: which lane and tenant its model calls belong to, and how long they may wait for dispatch
+lane_var: ContextVar[str] = ContextVar("lane", default="bulk")
+tenant_var: ContextVar[str] = ContextVar("tenant", default="default")
+max_queue_seconds_var: ContextVar[Optional[float]] = ContextVar("max_queue_seconds", default=None)
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        """Wait until amount tokens are available, then take them (FIFO order)"""
+        amount = min(amount, self.capacity)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # An asyncio.Lock belongs to one event loop, so each new loop gets its own
+            self._loop = loop
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def debit(self, amount: float):
+        """Take extra tokens after the fact; the balance may go negative"""
+        self._refill()
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one provider"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, estimated_tokens: int):
+        await self.acquire_request()
+        await self.acquire_tokens(estimated_tokens)
+
+    async def acquire_request(self):
+        await self.requests.acquire(1)
+
+    async def acquire_tokens(self, estimated_tokens: int):
+        await self.tokens.acquire(estimated_tokens)
+
+    async def reconcile(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Charge the difference when a call used more tokens than estimated"""
+        if actual_tokens and actual_tokens > estimated_tokens:
+            self.tokens.debit(actual_tokens - estimated_tokens)
+
+    def available(self) -> Dict[str, float]:
+        self.requests._refill()
+        self.tokens._refill()
+        return {"requests": self.requests.tokens, "tokens": self.tokens.tokens}
+
+
+class SQLiteRateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets kept in SQLite, shared by every process on the host"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, path: str = "rate_limits.db", poll_interval: float = 0.5):
+        self.path = path
+        self.buckets = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self.reconnect()
+
+    def reconnect(self):
+        """Open a fresh connection (a forked worker must not reuse its parent's)"""
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS rate_buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            )"""
+        )
+
+    def _update(self, name: str, amount: float, allow_debt: bool = False) -> float:
+        """Refill a bucket and take amount from it; returns 0, or the seconds to wait when it is short"""
+        per_minute = self.buckets[name]
+        rate = per_minute / 60.0
+        amount = min(amount, per_minute)
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front so concurrent processes serialize here
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute("SELECT tokens, updated FROM rate_buckets WHERE name = ?", (name,)).fetchone()
+                tokens = per_minute if row is None else min(per_minute, row[0] + (now - row[1]) * rate)
+                wait = 0.0
+                if tokens >= amount or allow_debt:
+                    tokens -= amount
+                else:
+                    wait = (amount - tokens) / rate
+                self._conn.execute("INSERT OR REPLACE INTO rate_buckets (name, tokens, updated) VALUES (?, ?, ?)", (name, tokens, now))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def _take(self, name: str, amount: float):
+        while True:
+            # BEGIN IMMEDIATE can wait out other processes' write locks, so keep it off the event loop
+            wait = await asyncio.get_running_loop().run_in_executor(None, self._update, name, amount)
+            if not wait:
+                return
+            # Other processes draw from the same bucket, so re-check rather than sleeping the full deficit
+            await asyncio.sleep(min(wait, self.poll_interval) * random.uniform(0.5, 1.0))
+
+    async def acquire(self, estimated_tokens: int):
+        await self.acquire_request()
+        await self.acquire_tokens(estimated_tokens)
+
+    async def acquire_request(self):
+        await self._take("requests", 1)
+
+    async def acquire_tokens(self, estimated_tokens: int):
+        await self._take("tokens", estimated_tokens)
+
+    async def reconcile(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        if actual_tokens and actual_tokens > estimated_tokens:
+            await asyncio.get_running_loop().run_in_executor(None, self._update, "tokens", actual_tokens - estimated_tokens, True)
+
+    def available(self) -> Dict[str, float]:
+        now = time.time()
+        with self._lock:
+            rows = dict((name, (tokens, updated)) for name, tokens, updated in self._conn.execute("SELECT name, tokens, updated FROM rate_buckets"))
+        available = {}
+        for name, per_minute in self.buckets.items():
+            tokens, updated = rows.get(name, (per_minute, now))
+            available[name] = min(per_minute, tokens + (now - updated) * per_minute / 60.0)
+        return available
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for rate limiting, server errors and transient connection failures"""
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError))
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token estimate (about four characters per token)"""
+    return sum(len(text) for text in texts) // 4 + 1
+
+
+class QueueDeadlineExceeded(Exception):
+    """A model call waited longer than its lane allows and was dropped without being sent"""
+
+
+class Ticket:
+    """One model call waiting for dispatch"""
+    __slots__ = ("lane", "tenant", "tokens", "enqueued", "future")
+
+    def __init__(self, lane: str, tenant: str, tokens: int, future: asyncio.Future):
+        self.lane = lane
+        self.tenant = tenant
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        self.future = future
+
+
+class FairQueue:
+    """Waiting model calls in priority lanes, picked by weighted fair queuing with a per-tenant in-flight cap.
+
+    Each lane has a virtual time that advances by 1/weight per dispatch, and the backlogged lane with the
+    lowest virtual time goes next, so lanes share dispatches in proportion to their weights. Within a lane,
+    calls go in arrival order, skipping tenants that already have tenant_cap calls in flight (0 = no cap).
+    """
+
+    def __init__(self, weights: Dict[str, float], tenant_cap: int = 0):
+        self.weights = weights
+        self.tenant_cap = tenant_cap
+        self.reset()
+
+    def reset(self):
+        self.lanes: Dict[str, Deque[Ticket]] = {lane: deque() for lane in self.weights}
+        self.virtual = {lane: 0.0 for lane in self.weights}
+        self.clock = 0.0
+        self.in_flight: Dict[str, int] = defaultdict(int)
+
+    def push(self, ticket: Ticket):
+        queue = self.lanes[ticket.lane]
+        if not queue:
+            # A lane that was idle rejoins at the current virtual time instead of spending credit banked while empty
+            self.virtual[ticket.lane] = max(self.virtual[ticket.lane], self.clock)
+        queue.append(ticket)
+
+    def remove(self, ticket: Ticket) -> bool:
+        """Take a ticket out before dispatch; False if it was already dispatched"""
+        try:
+            self.lanes[ticket.lane].remove(ticket)
+            return True
+        except ValueError:
+            return False
+
+    def _eligible(self, queue: Deque[Ticket]) -> Optional[Ticket]:
+        for ticket in queue:
+            if not self.tenant_cap or self.in_flight[ticket.tenant] < self.tenant_cap:
+                return ticket
+        return None
+
+    def pop(self) -> Optional[Ticket]:
+        """The next ticket to dispatch, or None when nothing waiting is eligible"""
+        best = None
+        for lane, queue in self.lanes.items():
+            ticket = self._eligible(queue)
+            if ticket is not None and (best is None or self.virtual[lane] < self.virtual[best.lane]):
+                best = ticket
+        if best is None:
+            return None
+        self.lanes[best.lane].remove(best)
+        self.clock = self.virtual[best.lane]
+        self.virtual[best.lane] += 1.0 / self.weights[best.lane]
+        self.in_flight[best.tenant] += 1
+        return best
+
+    def finish(self, ticket: Ticket):
+        self.in_flight[ticket.tenant] -= 1
+        if not self.in_flight[ticket.tenant]:
+            del self.in_flight[ticket.tenant]
+
+
+class LLMScheduler:
+    """Bounds concurrent model calls, enforces provider rate limits and retries transient failures.
+
+    Calls wait in a FairQueue by lane and tenant. A single dispatcher task waits for a free concurrency slot
+    and a request from the rate limiter, and only then picks who goes next, so an interactive call that
+    arrives while bulk work saturates the quota is sent with the next available request.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_minute: float = 60,
+        tokens_per_minute: float = 100000,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        limiter: Optional[Any] = None,
+        lane_weights: Optional[Dict[str, float]] = None,
+        tenant_max_in_flight: int = 0,
+        on_queue_wait: Optional[Callable[[str, float, bool], None]] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.limiter = limiter or RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.queue = FairQueue(lane_weights or DEFAULT_LANE_WEIGHTS, tenant_max_in_flight)
+        self.on_queue_wait = on_queue_wait
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.retries = 0
+        self.failures = 0
+        self.dispatched: Dict[str, int] = defaultdict(int)
+        self.dropped: Dict[str, int] = defaultdict(int)
+        self.waits: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=1000))
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _ensure_dispatcher(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # asyncio primitives belong to one event loop, so a new loop starts from a clean queue
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._work = asyncio.Event()
+            self.queue.reset()
+            self._dispatcher = None
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        prepaid = False
+        while True:
+            try:
+                await self._work.wait()
+                await self._semaphore.acquire()
+                if not prepaid:
+                    await self.limiter.acquire_request()
+                    prepaid = True
+                # Pick only now that a slot and a request are ready, so the latest arrivals compete
+                ticket = self.queue.pop()
+                if ticket is None:
+                    # Queue drained, or every waiting tenant is at its cap: wait for an arrival or a completion
+                    self._semaphore.release()
+                    self._work.clear()
+                    continue
+                prepaid = False
+                await self.limiter.acquire_tokens(ticket.tokens)
+                if ticket.future.done():
+                    # The caller gave up while its tokens were being acquired
+                    self._release(ticket)
+                    continue
+                ticket.future.set_result(None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warning: model call dispatcher error: {e}")
+                await asyncio.sleep(1.0)
+
+    def _release(self, ticket: Ticket):
+        self._semaphore.release()
+        self.queue.finish(ticket)
+        self._work.set()
+
+    def _withdraw(self, ticket: Ticket):
+        if ticket.future.done() and not ticket.future.cancelled():
+            self._release(ticket)
+        elif not self.queue.remove(ticket):
+            # Dispatched but not yet granted; the dispatcher releases it when it sees the cancellation
+            ticket.future.cancel()
+
+    async def _admit(self, estimated_tokens: int) -> Ticket:
+        """Wait in the caller's lane until the dispatcher grants a slot and the rate limit allows the call"""
+        self._ensure_dispatcher()
+        lane = lane_var.get()
+        if lane not in self.queue.lanes:
+            lane = "bulk"
+        ticket = Ticket(lane, tenant_var.get(), estimated_tokens, self._loop.create_future())
+        self.queue.push(ticket)
+        self._work.set()
+        max_wait = max_queue_seconds_var.get()
+        try:
+            done, _ = await asyncio.wait({ticket.future}, timeout=max_wait)
+        except asyncio.CancelledError:
+            self._withdraw(ticket)
+            raise
+        waited = time.monotonic() - ticket.enqueued
+        if not done:
+            self._withdraw(ticket)
+            self.dropped[lane] += 1
+            if self.on_queue_wait is not None:
+                self.on_queue_wait(lane, waited, True)
+            raise QueueDeadlineExceeded(f"Dropped after waiting {waited:.0f}s for a model call in the {lane} lane")
+        self.dispatched[lane] += 1
+        self.waits[lane].append(waited)
+        if self.on_queue_wait is not None:
+            self.on_queue_wait(lane, waited, False)
+        return ticket
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        estimated_tokens: int = 1,
+        usage_tokens: Optional[Callable[[Any], Optional[int]]] = None,
+    ) -> Any:
+        """Run call() once admitted by the priority queue and rate limiter, retrying on 429/5xx"""
+        attempt = 0
+        while True:
+            ticket = await self._admit(estimated_tokens)
+            try:
+                self.in_flight += 1
+                try:
+                    result = await call()
+                finally:
+                    self.in_flight -= 1
+                    self._release(ticket)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self.backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            if usage_tokens is not None:
+                await self.limiter.reconcile(estimated_tokens, usage_tokens(result))
+            self.completed += 1
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        available = self.limiter.available()
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "retries": self.retries,
+            "failures": self.failures,
+            "available_requests": round(available["requests"], 2),
+            "available_tokens": round(available["tokens"], 2),
+            "tenant_max_in_flight": self.queue.tenant_cap,
+            "lanes": {lane: self.lane_stats(lane) for lane in self.queue.lanes},
+        }
+
+    def lane_stats(self, lane: str) -> Dict[str, Any]:
+        waits = sorted(self.waits[lane])
+        return {
+            "weight": self.queue.weights[lane],
+            "queued": len(self.queue.lanes[lane]),
+            "dispatched": self.dispatched[lane],
+            "dropped": self.dropped[lane],
+            "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else None,
+            "wait_p95_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else None,
+        }
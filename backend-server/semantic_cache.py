@@ -0,0 +1,244 @@
+import json
+import os
+import random
+import re
+import threading
+import zlib
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from incremental import CLASSIFICATION_SECTIONS
+from prompt_builder import compact
+
+# Similarity thresholds evaluated by the accuracy report
+REPORT_THRESHOLDS = (0.80, 0.85, 0.88, 0.90, 0.92, 0.94, 0.96, 0.98, 0.99)
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#.]+")
+
+
+def profile_text(profile_summary: Dict[str, Any], sections: Sequence[str] = CLASSIFICATION_SECTIONS) -> List[str]:
+    """The classification-relevant values of a profile summary as a list of strings"""
+    values: List[str] = []
+
+    def collect(node: Any):
+        if isinstance(node, dict):
+            for key in sorted(node):
+                collect(node[key])
+        elif isinstance(node, list):
+            for item in node:
+                collect(item)
+        elif node is not None:
+            values.append(str(node))
+
+    collect(compact({section: profile_summary.get(section) for section in sections}))
+    return values
+
+
+class HashedTfidfEmbedder:
+    """Signed feature hashing of unigrams and bigrams into a fixed-size log-TF vector"""
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def term_frequencies(self, values: List[str]) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for value in values:
+            tokens = [token.strip(".") for token in _TOKEN_RE.findall(value.lower())]
+            tokens = [token for token in tokens if token]
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                digest = zlib.crc32(feature.encode("utf-8"))
+                vector[digest % self.dim] += 1.0 if digest & 0x80000000 else -1.0
+        # Sublinear term frequency, keeping the hash sign
+        return np.sign(vector) * np.log1p(np.abs(vector))
+
+
+class SemanticCache:
+    """Brute-force NumPy nearest-neighbour index of classified profiles, persisted to an .npz file"""
+
+    def __init__(
+        self,
+        path: str = "semantic_cache.npz",
+        threshold: float = 0.95,
+        max_entries: int = 10000,
+        dim: int = 1024,
+        signature: str = "",
+        audit_rate: float = 0.05,
+        save_every: int = 100
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.signature = signature
+        self.audit_rate = audit_rate
+        self.save_every = save_every
+        self.embedder = HashedTfidfEmbedder(dim)
+        self.hits = 0
+        self.misses = 0
+        self.audits = 0
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=5000)
+        self._unsaved = 0
+        self._reset()
+        self.load()
+
+    def _reset(self):
+        self._tf = np.zeros((self.max_entries, self.embedder.dim), dtype=np.float32)
+        self._df = np.zeros(self.embedder.dim, dtype=np.float32)
+        self._matrix = np.zeros((self.max_entries, self.embedder.dim), dtype=np.float32)
+        self._labels: List[Optional[Dict[str, Any]]] = [None] * self.max_entries
+        self._count = 0
+        self._next = 0
+        self._idf: Optional[np.ndarray] = None
+        self._inserts_since_fit = 0
+
+    @staticmethod
+    def _normalize(rows: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(rows, axis=-1, keepdims=True)
+        return rows / np.maximum(norms, 1e-12)
+
+    def _index(self):
+        """IDF-weighted, L2-normalized rows; IDF is refit once inserts have shifted it noticeably"""
+        if self._idf is None:
+            self._idf = (np.log((1 + self._count) / (1 + self._df)) + 1).astype(np.float32)
+            self._matrix[:self._count] = self._normalize(self._tf[:self._count] * self._idf)
+            self._inserts_since_fit = 0
+        return self._matrix[:self._count], self._idf
+
+    def embed(self, profile_summary: Dict[str, Any]) -> np.ndarray:
+        return self.embedder.term_frequencies(profile_text(profile_summary))
+
+    def nearest(self, tf: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Most similar stored profile as {similarity, classification, confidence}, or None when empty"""
+        with self._lock:
+            if self._count == 0:
+                return None
+            matrix, idf = self._index()
+            query = tf * idf
+            norm = np.linalg.norm(query)
+            if norm == 0:
+                return None
+            similarities = matrix @ (query / norm)
+            best = int(np.argmax(similarities))
+            return {"similarity": float(similarities[best]), **self._labels[best]}
+
+    def lookup(self, tf: np.ndarray, mode: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Find the nearest neighbour and decide whether its classification can be reused"""
+        neighbour = self.nearest(tf)
+        if mode != "on" or neighbour is None or neighbour["similarity"] < self.threshold:
+            self.misses += 1
+            return neighbour, False
+        # Verify a fraction of hits with the model so accuracy above the threshold stays measurable; each
+        # audit stands for 1/audit_rate hits in the threshold report, since every miss is verified
+        if self._rng.random() < self.audit_rate:
+            self.audits += 1
+            neighbour["sample_weight"] = 1.0 / self.audit_rate
+            return neighbour, False
+        self.hits += 1
+        return neighbour, True
+
+    def add(self, tf: np.ndarray, classification: str, confidence: Optional[float], neighbour: Optional[Dict[str, Any]] = None):
+        """Index a model-classified profile and record how its nearest neighbour would have fared"""
+        if neighbour is not None:
+            self._samples.append((neighbour["similarity"], neighbour["classification"] == classification, neighbour.get("sample_weight", 1.0)))
+        with self._lock:
+            slot = self._next
+            if self._count == self.max_entries:
+                # Overwrite the oldest entry
+                self._df -= self._tf[slot] != 0
+            else:
+                self._count += 1
+            self._tf[slot] = tf
+            self._df += tf != 0
+            self._labels[slot] = {"classification": classification, "confidence": confidence}
+            self._next = (slot + 1) % self.max_entries
+            self._inserts_since_fit += 1
+            if self._idf is not None and self._inserts_since_fit <= max(50, self._count // 10):
+                self._matrix[slot] = self._normalize(tf * self._idf)
+            else:
+                self._idf = None
+            self._unsaved += 1
+            should_save = self._unsaved >= self.save_every
+        if should_save:
+            self.save()
+
+    def save(self):
+        """Write the index atomically"""
+        with self._lock:
+            if not self._unsaved:
+                return
+            order = [(self._next + i) % self._count for i in range(self._count)] if self._count == self.max_entries else list(range(self._count))
+            tmp_path = f"{self.path}.tmp.npz"
+            np.savez_compressed(
+                tmp_path,
+                tf=self._tf[order],
+                labels=np.array(json.dumps([self._labels[i] for i in order])),
+                signature=np.array(self.signature),
+                dim=np.array(self.embedder.dim),
+            )
+            os.replace(tmp_path, self.path)
+            self._unsaved = 0
+
+    def load(self):
+        """Restore a saved index unless it was built for another model configuration or embedding size"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as saved:
+                if str(saved["signature"]) != self.signature or int(saved["dim"]) != self.embedder.dim:
+                    print(f"Warning: ignoring semantic cache at {self.path} built for a different model or embedding size")
+                    return
+                tf = saved["tf"][-self.max_entries:]
+                labels = json.loads(str(saved["labels"]))[-self.max_entries:]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: could not load semantic cache from {self.path}: {e}")
+            return
+        with self._lock:
+            self._reset()
+            self._count = len(tf)
+            self._tf[:self._count] = tf
+            self._df = (tf != 0).sum(axis=0).astype(np.float32)
+            self._labels[:self._count] = labels
+            self._next = self._count % self.max_entries
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            self._samples.clear()
+            self.hits = self.misses = self.audits = 0
+            self._unsaved = 0
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def threshold_report(self, thresholds: Sequence[float] = REPORT_THRESHOLDS) -> List[Dict[str, Any]]:
+        """Would-be hit rate and label agreement for each threshold, from model-verified neighbours weighted by how
+        likely they were to be verified"""
+        samples = list(self._samples)
+        total = sum(weight for _, _, weight in samples)
+        report = []
+        for threshold in thresholds:
+            above = [(agrees, weight) for similarity, agrees, weight in samples if similarity >= threshold]
+            above_weight = sum(weight for _, weight in above)
+            report.append({
+                "threshold": threshold,
+                "hit_rate": round(above_weight / total, 4) if samples else None,
+                "accuracy": round(sum(weight for agrees, weight in above if agrees) / above_weight, 4) if above else None,
+                "samples": len(above),
+            })
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.audits
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "audits": self.audits,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "verified_samples": len(self._samples),
+            "threshold_report": self.threshold_report(),
+        }
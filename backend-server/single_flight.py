@@ -0,0 +1,39 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+def request_fingerprint(payload: Dict[str, Any], *options: Any) -> str:
+    """Stable hash of a request body plus the options that change its result"""
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+    for option in options:
+        digest.update(b"\x00")
+        digest.update(repr(option).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers with the same key share its result"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return (result, shared), where shared is True when another caller's run produced it"""
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.executed += 1
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shielded so one caller disconnecting does not cancel the run the others are waiting on
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls), "executed": self.executed, "coalesced": self.coalesced}
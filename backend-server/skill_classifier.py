@@ -0,0 +1,196 @@
+import json
+import os
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "classification.json")
+
+# Skill cluster -> profile type from classificationSystem.userProfile.profileTypes
+CLUSTER_PROFILE_TYPES = {
+    "Smart Contract Development": "Blockchain Developer",
+    "Blockchain Infrastructure": "Blockchain Infrastructure Engineer",
+    "Web3 Development": "Blockchain Developer",
+    "DeFi Development": "DeFi Specialist",
+    "Cryptography": "Cryptography Specialist",
+    "Machine Learning Fundamentals": "AI Engineer",
+    "Deep Learning": "AI Engineer",
+    "AI Engineering": "AI Engineer",
+    "Applied AI": "AI Engineer",
+    "Ethical AI": "AI Engineer",
+    "Decentralized AI": "Blockchain-AI Hybrid Specialist",
+    "Web3 Data Science": "Blockchain-AI Hybrid Specialist",
+    "Privacy Tech": "Blockchain-AI Hybrid Specialist",
+}
+
+# Tools and terms students list that the taxonomy's skill names don't spell out
+CLUSTER_ALIASES = {
+    "Smart Contract Development": ["Smart Contract Development", "Ethereum Development", "Hardhat", "Truffle", "Foundry", "Ganache", "OpenZeppelin"],
+    "Blockchain Infrastructure": ["Distributed Systems", "P2P Networking", "Hyperledger", "Substrate"],
+    "Web3 Development": ["Web3", "Ethers", "MetaMask", "Blockchain Development"],
+    "DeFi Development": ["DeFi", "Uniswap", "Aave"],
+    "Cryptography": ["Cryptography", "zk-SNARKs"],
+    "Machine Learning Fundamentals": ["Machine Learning", "scikit-learn", "Data Science"],
+    "Deep Learning": ["Deep Learning", "TensorFlow", "PyTorch", "Keras"],
+    "AI Engineering": ["MLOps", "Kubeflow", "MLflow"],
+    "Applied AI": ["NLP", "OpenCV", "LLMs", "Generative AI"],
+}
+
+FAMILY_PREFIXES = {"blockchainSkillClusters": "blockchain", "aiSkillClusters": "ai", "hybridSkillClusters": "hybrid"}
+
+HYBRID_LABEL = "Blockchain-AI Hybrid Specialist"
+
+# Profile fields that carry skill evidence, with how strongly each one counts; knowledgeAreas and
+# skillsToAcquire describe what a student wants to learn, so they count far less than skills they have
+SOURCE_WEIGHTS = {
+    "programmingLanguages": 1.0,
+    "otherTechnicalSkills": 1.0,
+    "softwareProficiency": 0.6,
+    "certifications": 0.8,
+    "knowledgeAreas": 0.3,
+    "skillsToAcquire": 0.2,
+}
+
+LEVEL_WEIGHTS = {"basic": 0.6, "beginner": 0.6, "intermediate": 0.8, "advanced": 1.0, "expert": 1.0}
+
+# A phrase only credits a skill when it shares at least this fraction of the skill's tokens
+MIN_TOKEN_COVERAGE = 0.5
+
+# Total evidence needed before confidence is no longer discounted for thin profiles
+FULL_EVIDENCE = 3.0
+
+STOPWORDS = {"and", "of", "the", "for", "in", "with", "based", "a", "to"}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    return tuple(token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS)
+
+
+class SkillClassifier:
+    """Deterministic profile classifier compiled from the skill-cluster taxonomy"""
+
+    def __init__(self, clusters: List[Dict[str, Any]], profile_types: List[str]):
+        self.clusters = clusters
+        self.profile_types = profile_types
+        self.cluster_names = [cluster["name"] for cluster in clusters]
+        self.cluster_families = [cluster["family"] for cluster in clusters]
+        # skill id -> (cluster index, token count); token -> skill ids containing it
+        self.skills: List[Tuple[int, int]] = []
+        self.skill_names: List[str] = []
+        self.skill_is_alias: List[bool] = []
+        self.token_index: Dict[str, List[int]] = defaultdict(list)
+        for cluster_idx, cluster in enumerate(clusters):
+            entries = [(skill, False) for skill in cluster["skills"]] + [(alias, True) for alias in cluster.get("aliases", [])]
+            for skill, is_alias in entries:
+                tokens = set(tokenize(skill))
+                if not tokens:
+                    continue
+                skill_id = len(self.skills)
+                self.skills.append((cluster_idx, len(tokens)))
+                self.skill_names.append(skill)
+                self.skill_is_alias.append(is_alias)
+                for token in tokens:
+                    self.token_index[token].append(skill_id)
+        self.token_index = dict(self.token_index)
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_TAXONOMY_PATH) -> "SkillClassifier":
+        with open(path, "r") as f:
+            system = json.load(f)["classificationSystem"]
+        clusters = []
+        for key, family in FAMILY_PREFIXES.items():
+            for cluster in system["skillAnalysis"].get(key, []):
+                clusters.append({
+                    "name": cluster["name"],
+                    "family": family,
+                    "skills": list(cluster["skills"]),
+                    "aliases": CLUSTER_ALIASES.get(cluster["name"], []),
+                })
+        return cls(clusters, system["userProfile"]["profileTypes"])
+
+    def profile_phrases(self, profile: Any) -> List[Tuple[str, float]]:
+        """Extract (phrase, weight) skill evidence from a ComprehensiveStudentProfile"""
+        phrases = []
+        for lang in profile.programmingLanguages:
+            phrases.append((lang.name, SOURCE_WEIGHTS["programmingLanguages"] * LEVEL_WEIGHTS.get(lang.level.strip().lower(), 0.8)))
+        for field in ("otherTechnicalSkills", "softwareProficiency", "knowledgeAreas", "skillsToAcquire"):
+            phrases.extend((item, SOURCE_WEIGHTS[field]) for item in getattr(profile, field))
+        phrases.extend((cert.name, SOURCE_WEIGHTS["certifications"]) for cert in profile.certifications)
+        return [(phrase, weight) for phrase, weight in phrases if phrase and phrase.strip()]
+
+    def match_phrase(self, phrase: str) -> Dict[int, float]:
+        """Token coverage of every taxonomy skill the phrase matches"""
+        overlap: Dict[int, int] = defaultdict(int)
+        for token in set(tokenize(phrase)):
+            for skill_id in self.token_index.get(token, ()):
+                overlap[skill_id] += 1
+        matches = {}
+        for skill_id, shared in overlap.items():
+            skill_tokens = self.skills[skill_id][1]
+            coverage = shared / skill_tokens
+            # A single shared word like "learning" is not evidence for a multi-word skill
+            if coverage >= MIN_TOKEN_COVERAGE and (shared >= 2 or shared == skill_tokens):
+                matches[skill_id] = coverage
+        return matches
+
+    def match_skills(self, phrases: List[Tuple[str, float]]) -> Dict[int, float]:
+        """Credit each taxonomy skill with its best-matching phrase (token coverage x source weight)"""
+        credits: Dict[int, float] = {}
+        for phrase, weight in phrases:
+            for skill_id, coverage in self.match_phrase(phrase).items():
+                credit = coverage * weight
+                if credit > credits.get(skill_id, 0.0):
+                    credits[skill_id] = credit
+        return credits
+
+    def taxonomy_share(self, phrases: List[Tuple[str, float]]) -> float:
+        """Weighted share of the profile's skill phrases that match any taxonomy skill"""
+        total = sum(weight for _, weight in phrases)
+        if total == 0:
+            return 0.0
+        return sum(weight for phrase, weight in phrases if self.match_phrase(phrase)) / total
+
+    def score(self, profile: Any, phrases: Optional[List[Tuple[str, float]]] = None) -> Dict[str, float]:
+        """Affinity score of the profile for every skill cluster"""
+        scores = [0.0] * len(self.clusters)
+        phrases = self.profile_phrases(profile) if phrases is None else phrases
+        for skill_id, credit in self.match_skills(phrases).items():
+            scores[self.skills[skill_id][0]] += credit
+        return dict(zip(self.cluster_names, scores))
+
+    def classify(self, profile: Any) -> Dict[str, Any]:
+        """Return the best profile type, a 0-1 confidence and the supporting cluster scores"""
+        phrases = self.profile_phrases(profile)
+        cluster_scores = self.score(profile, phrases)
+        type_scores: Dict[str, float] = defaultdict(float)
+        family_scores: Dict[str, float] = defaultdict(float)
+        for name, family, value in zip(self.cluster_names, self.cluster_families, cluster_scores.values()):
+            type_scores[CLUSTER_PROFILE_TYPES.get(name, name)] += value
+            family_scores[family] += value
+
+        total = sum(type_scores.values())
+        if total == 0:
+            return {"classification": None, "confidence": 0.0, "cluster_scores": cluster_scores}
+
+        # Strong evidence on both sides of the taxonomy points to the hybrid profile type; how sure that is
+        # depends on how balanced the two sides are, not on their combined share (which is always all of it)
+        evidence = min(1.0, total / FULL_EVIDENCE)
+        blockchain, ai = family_scores["blockchain"], family_scores["ai"]
+        if min(blockchain, ai) >= 0.6 * max(blockchain, ai):
+            label, confidence = HYBRID_LABEL, (min(blockchain, ai) / max(blockchain, ai)) * evidence
+        else:
+            label, best = max(type_scores.items(), key=lambda item: item[1])
+            confidence = (best / total) * evidence
+        # Skills outside the taxonomy are evidence for some other career the taxonomy cannot name;
+        # programming languages are general-purpose, so they are left out of that share
+        languages = {lang.name for lang in profile.programmingLanguages}
+        share = self.taxonomy_share([(phrase, weight) for phrase, weight in phrases if phrase not in languages])
+        confidence *= share
+        return {
+            "classification": label,
+            "confidence": round(confidence, 4),
+            "taxonomy_share": round(share, 4),
+            "cluster_scores": cluster_scores,
+        }
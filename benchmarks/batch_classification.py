@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+from typing import Any, Dict
+
+import httpx
+
+from run_benchmarks import backend_server, git_commit, mock_llm_server, run_http_scenario
+
+
+def run(args) -> Dict[str, Any]:
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "config": vars(args),
+        "batch_sizes": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="benchmark_batching_")
+    with mock_llm_server(args, workdir) as mock:
+        for size in args.batch_sizes:
+            print(f"Running {args.scenario} with classification batch size {size}...", file=sys.stderr)
+            run_dir = os.path.join(workdir, f"batch_{size}")
+            os.makedirs(run_dir)
+            args.classification_batch_size = size
+            model_calls_before = httpx.get(f"{mock.url}/stats").json()["requests"]
+            server = backend_server(args, run_dir, mock)
+            with server:
+                result = asyncio.run(run_http_scenario(args.scenario, server, args))
+                result["batching"] = httpx.get(f"{server.url}/classification/batches").json()
+            result["model_calls"] = httpx.get(f"{mock.url}/stats").json()["requests"] - model_calls_before
+            result["model_calls_per_student"] = round(result["model_calls"] / args.students, 3)
+            result["students_per_minute"] = round(result["students_per_second"] * 60, 1)
+            report["batch_sizes"][str(size)] = result
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Students per minute under a fixed provider request quota, by classification batch size")
+    parser.add_argument("--batch-sizes", default="1,4,8", help="Comma-separated CLASSIFICATION_BATCH_SIZE values to compare")
+    parser.add_argument("--requests-per-minute", type=float, default=60, help="Server LLM_REQUESTS_PER_MINUTE, the quota being stretched")
+    parser.add_argument("--scenario", default="analyze", choices=["analyze", "analyze_single"])
+    parser.add_argument("--students", type=int, default=200, help="Profiles sent per batch size; keep well above the quota so its initial one-minute burst does not dominate")
+    parser.add_argument("--batch-size", type=int, default=20, help="Profiles per /analyze request")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent client requests")
+    parser.add_argument("--llm-concurrency", type=int, default=16, help="Server LLM_MAX_CONCURRENCY")
+    parser.add_argument("--backend", default="local", choices=["local", "gemini"])
+    parser.add_argument("--use-cache", action="store_true")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_batching_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+    args.batch_sizes = [int(size) for size in args.batch_sizes.split(",") if size.strip()]
+    # Batching applies to the separate classification call of the two-step flow
+    args.mode = "two_step"
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({size: {key: result[key] for key in ("students_per_minute", "model_calls_per_student", "errors")}
+                      for size, result in report["batch_sizes"].items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+import httpx
+
+from run_benchmarks import BACKEND_DIR, api_profiles, backend_server, git_commit, mock_llm_server
+
+sys.path.insert(0, BACKEND_DIR)
+from result_store import SQLiteResultStore  # noqa: E402
+
+
+def seed_results(server_url: str, run_dir: str, count: int, seed: int) -> int:
+    """Analyze one profile through the server, then store count copies of its result under different names"""
+    profile = api_profiles(1, seed)[0]
+    httpx.post(f"{server_url}/analyze-single", json=profile, timeout=None).raise_for_status()
+    template = httpx.get(f"{server_url}/results/{profile['fullName']}", timeout=None).json()
+    store = SQLiteResultStore(os.path.join(run_dir, "analysis_results", "results.db"))
+    started = datetime.now() - timedelta(days=1)
+    batch = []
+    for index in range(count):
+        name = f"Export Student {index:06d}"
+        summary = {**template["profile_summary"], "personal_info": {**template["profile_summary"]["personal_info"], "name": name}}
+        batch.append({**template, "student_name": name, "profile_summary": summary,
+                      "timestamp": (started + timedelta(seconds=index)).isoformat()})
+        if len(batch) >= 1000:
+            store.save_many(batch)
+            batch = []
+    if batch:
+        store.save_many(batch)
+    return store.list(limit=1)["total"]
+
+
+async def fetch_loop(server_url: str, concurrency: int) -> Dict[str, Any]:
+    """The old way: page through GET /results, then GET /results/{student_name} for each student"""
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=server_url, timeout=None) as client:
+        names, offset = [], 0
+        while True:
+            page = (await client.get("/results", params={"limit": 1000, "offset": offset})).json()
+            names += [item["student_name"] for item in page["results"]]
+            offset += 1000
+            if offset >= page["total"]:
+                break
+        queue = iter(names)
+        fetched = 0
+
+        async def worker():
+            nonlocal fetched
+            for name in queue:
+                response = await client.get(f"/results/{name}")
+                fetched += response.status_code == 200
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    return {"results": fetched, "seconds": round(seconds, 3), "results_per_second": round(fetched / seconds, 1)}
+
+
+def export_stream(server_url: str, format: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    size = 0
+    with httpx.stream("GET", f"{server_url}/export", params={"format": format}, timeout=None) as response:
+        response.raise_for_status()
+        for chunk in response.iter_bytes():
+            size += len(chunk)
+    seconds = time.perf_counter() - started
+    return {"bytes": size, "seconds": round(seconds, 3)}
+
+
+def run(args) -> Dict[str, Any]:
+    report = {"timestamp": datetime.now().isoformat(), "git_commit": git_commit(), "config": vars(args)}
+    workdir = tempfile.mkdtemp(prefix="benchmark_export_")
+    with mock_llm_server(args, workdir) as mock:
+        server = backend_server(args, workdir, mock)
+        with server:
+            print(f"Seeding {args.results} results...", file=sys.stderr)
+            stored = seed_results(server.url, workdir, args.results, args.seed)
+            report["stored_results"] = stored
+            print("Fetching one result at a time...", file=sys.stderr)
+            report["per_student_fetch"] = asyncio.run(fetch_loop(server.url, args.concurrency))
+            report["export"] = {}
+            for format in args.formats:
+                print(f"Exporting {format}...", file=sys.stderr)
+                result = export_stream(server.url, format)
+                result["results_per_second"] = round(stored / result["seconds"], 1)
+                result["speedup"] = round(report["per_student_fetch"]["seconds"] / result["seconds"], 1)
+                report["export"][format] = result
+        report["peak_rss_mb"] = server.peak_rss_mb
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk /export against the per-student GET /results/{student_name} loop")
+    parser.add_argument("--results", type=int, default=5000, help="Stored results to seed")
+    parser.add_argument("--formats", default="ndjson,csv,parquet", help="Comma-separated export formats to time")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent requests in the per-student loop")
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--backend", default="local", choices=["local", "gemini"])
+    parser.add_argument("--mode", default="two_step", choices=["two_step", "single_call"])
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_export_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+    args.formats = [format for format in args.formats.split(",") if format.strip()]
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({key: report[key] for key in ("stored_results", "per_student_fetch", "export", "peak_rss_mb")}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List
+
+import httpx
+
+from run_benchmarks import BACKEND_DIR, api_profiles, backend_server, git_commit, mock_llm_server
+
+sys.path.insert(0, BACKEND_DIR)
+from history_store import HistoryStore  # noqa: E402
+from result_store import safe_student_name  # noqa: E402
+
+
+def analyzed_template(args, workdir: str) -> Dict[str, Any]:
+    """One real stored result, from analyzing a generated profile through the server"""
+    with mock_llm_server(args, workdir) as mock:
+        with backend_server(args, workdir, mock) as server:
+            profile = api_profiles(1, args.seed)[0]
+            httpx.post(f"{server.url}/analyze-single", json=profile, timeout=None).raise_for_status()
+            return httpx.get(f"{server.url}/results/{profile['fullName']}", timeout=None).json()
+
+
+def analyses(template: Dict[str, Any], students: int, versions: int, change_rate: float, seed: int) -> Iterator[Dict[str, Any]]:
+    """versions rounds of re-analysis over the same students; each round changes a change_rate share of profiles"""
+    rng = random.Random(seed)
+    started = datetime.now() - timedelta(days=versions)
+    summaries = []
+    for index in range(students):
+        name = f"History Student {index:05d}"
+        personal_info = {**template["profile_summary"]["personal_info"], "name": name, "email": f"student.{index:05d}@example.edu"}
+        summaries.append({**template["profile_summary"], "personal_info": personal_info})
+    for round_number in range(versions):
+        for index, summary in enumerate(summaries):
+            if round_number and rng.random() < change_rate:
+                goals = {**summary["career_goals"], "short_term": f"Goal revision {round_number}"}
+                summary = summaries[index] = {**summary, "career_goals": goals}
+            yield {
+                **template,
+                "student_name": summary["personal_info"]["name"],
+                "profile_summary": summary,
+                "timestamp": (started + timedelta(days=round_number, seconds=index)).isoformat(),
+            }
+
+
+def json_file_per_version(directory: str) -> Callable[[Dict[str, Any]], int]:
+    """A new indented JSON file for every analysis, like the legacy store but never overwritten"""
+    def save(result: Dict[str, Any]) -> int:
+        data = json.dumps(result, indent=2, default=str).encode()
+        path = os.path.join(directory, f"{safe_student_name(result['student_name'])}_{result['timestamp'].replace(':', '-')}.json")
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+    return save
+
+
+def json_overwrite(directory: str) -> Callable[[Dict[str, Any]], int]:
+    """The legacy JSON store: one file per student, rewritten in place, so history is lost"""
+    def save(result: Dict[str, Any]) -> int:
+        data = json.dumps(result, indent=2, default=str).encode()
+        with open(os.path.join(directory, f"{safe_student_name(result['student_name'])}_analysis.json"), "wb") as f:
+            f.write(data)
+        return len(data)
+    return save
+
+
+def directory_bytes(directory: str) -> int:
+    # The index's -wal and -shm files are bounded by SQLite's autocheckpoint and do not grow with history
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory)
+               for name in names if not name.endswith(("-wal", "-shm")))
+
+
+def measure(name: str, workdir: str, make_saver: Callable[[str], Callable[[Dict[str, Any]], int]],
+            results: List[Dict[str, Any]], keeps_history: bool) -> Dict[str, Any]:
+    directory = os.path.join(workdir, name)
+    os.makedirs(directory)
+    save = make_saver(directory)
+    started = time.perf_counter()
+    written = sum(save(result) for result in results)
+    seconds = time.perf_counter() - started
+    return {
+        "keeps_history": keeps_history,
+        "disk_bytes": directory_bytes(directory),
+        "payload_bytes_written": written,
+        "seconds": round(seconds, 3),
+        "saves_per_second": round(len(results) / seconds, 1),
+    }
+
+
+def history_store_saver(segment_bytes: int) -> Callable[[str], Callable[[Dict[str, Any]], int]]:
+    def make(directory: str) -> Callable[[Dict[str, Any]], int]:
+        store = HistoryStore(directory, segment_bytes=segment_bytes)
+
+        def save(result: Dict[str, Any]) -> int:
+            # Segments are append-only, so the bytes written are the growth of the log
+            before = store.stats()["segment_bytes"]
+            store.append(result)
+            return store.stats()["segment_bytes"] - before
+        return save
+    return make
+
+
+def run(args) -> Dict[str, Any]:
+    report = {"timestamp": datetime.now().isoformat(), "git_commit": git_commit(), "config": vars(args)}
+    workdir = tempfile.mkdtemp(prefix="benchmark_history_")
+    try:
+        template = analyzed_template(args, workdir)
+        results = list(analyses(template, args.students, args.versions, args.change_rate, args.seed))
+        report["analyses"] = len(results)
+        report["layouts"] = {}
+        for name, make_saver, keeps_history in (
+            ("json_file_per_version", json_file_per_version, True),
+            ("json_overwrite", json_overwrite, False),
+            ("history_store", history_store_saver(args.segment_mb * 1024 * 1024), True),
+        ):
+            print(f"Writing {len(results)} analyses as {name}...", file=sys.stderr)
+            report["layouts"][name] = measure(name, workdir, make_saver, results, keeps_history)
+        baseline = report["layouts"]["json_file_per_version"]["disk_bytes"]
+        for layout in report["layouts"].values():
+            layout["disk_ratio"] = round(layout["disk_bytes"] / baseline, 3)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disk use of the history store against per-version and overwritten JSON files")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--versions", type=int, default=10, help="Analyses per student")
+    parser.add_argument("--change-rate", type=float, default=0.1, help="Share of profiles that change between re-analyses")
+    parser.add_argument("--segment-mb", type=int, default=64)
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--backend", default="local", choices=["local", "gemini"])
+    parser.add_argument("--mode", default="two_step", choices=["two_step", "single_call"])
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_history_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({key: report[key] for key in ("analyses", "layouts")}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+MOCK_CLASSIFICATION = "AI/ML Engineer"
+
+# Student tags in a batched classification prompt, e.g. "[s3] {...}"
+STUDENT_ID_RE = re.compile(r"^\[(s\d+)\]", re.MULTILINE)
+
+MOCK_RECOMMENDATIONS = """1. Build an end-to-end machine learning project and deploy it behind an API
+2. Complete a cloud certification such as AWS Machine Learning Specialty within three months
+3. Contribute to an open-source ML library to practice code review and collaboration
+4. Study MLOps tooling (experiment tracking, model registries, CI for models)"""
+
+
+class MockSettings:
+    """Latency, failure and generation speed of the mock model"""
+
+    def __init__(self, latency_ms: float = 200.0, jitter_ms: float = 50.0, error_rate: float = 0.0,
+                 error_status: int = 503, tokens_per_second: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.tokens_per_second = tokens_per_second
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def respond_after(self, output_tokens: int) -> bool:
+        """Sleep for the simulated model time; returns False when this call should fail"""
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            if self.tokens_per_second > 0:
+                delay += output_tokens / self.tokens_per_second
+            await asyncio.sleep(delay)
+        finally:
+            self.in_flight -= 1
+        if self.rng.random() < self.error_rate:
+            self.errors += 1
+            return False
+        return True
+
+
+def count_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def reply_text(prompt: str) -> str:
+    return MOCK_RECOMMENDATIONS if "recommend" in prompt.lower() else MOCK_CLASSIFICATION
+
+
+def fake_arguments(schema: Dict[str, Any], defs: Optional[Dict[str, Any]] = None) -> Any:
+    """Smallest valid-looking value for a JSON schema, used to answer tool (structured output) calls"""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return fake_arguments(defs[schema["$ref"].split("/")[-1]], defs)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            return fake_arguments(schema[key][0], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "object")
+    if kind == "object":
+        return {name: fake_arguments(prop, defs) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [fake_arguments(schema.get("items", {}), defs) for _ in range(max(1, schema.get("minItems", 1)))]
+    if kind in ("number", "integer"):
+        low, high = schema.get("minimum", 0), schema.get("maximum", 1)
+        value = low + (high - low) * 0.8
+        return int(value) if kind == "integer" else value
+    if kind == "boolean":
+        return True
+    if kind == "string" and schema.get("title", "").lower() == "classification":
+        return MOCK_CLASSIFICATION
+    return "Build a portfolio project that applies this skill end to end"
+
+
+def tool_arguments(schema: Dict[str, Any], prompt: str) -> Any:
+    """Tool call arguments for a prompt; batched classification gets one entry per student tagged in the prompt"""
+    arguments = fake_arguments(schema)
+    if isinstance(arguments, dict) and isinstance(arguments.get("classifications"), list) and arguments["classifications"]:
+        entry = arguments["classifications"][0]
+        arguments["classifications"] = [{**entry, "student_id": student_id} for student_id in STUDENT_ID_RE.findall(prompt)]
+    return arguments
+
+
+def create_app(settings: MockSettings) -> FastAPI:
+    app = FastAPI(title="Mock LLM server")
+
+    def error_response(api: str) -> JSONResponse:
+        detail = {"message": "Simulated upstream failure", "code": settings.error_status}
+        body = {"error": detail} if api == "openai" else {"error": {**detail, "status": "UNAVAILABLE"}}
+        return JSONResponse(body, status_code=settings.error_status)
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat_completions(request: Request):
+        """OpenAI-compatible chat completions (also what LM Studio serves)"""
+        body = await request.json()
+        messages: List[Dict[str, Any]] = body.get("messages", [])
+        prompt_text = "\n".join(str(message.get("content") or "") for message in messages)
+        last_user = next((str(m.get("content") or "") for m in reversed(messages) if m.get("role") == "user"), "")
+        tools = body.get("tools") or []
+
+        if tools:
+            function = tools[0]["function"]
+            arguments = json.dumps(tool_arguments(function.get("parameters", {}), last_user))
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{"id": f"call_{settings.requests}", "type": "function",
+                                "function": {"name": function["name"], "arguments": arguments}}]
+            }
+            output_tokens = count_tokens(arguments)
+            finish_reason = "tool_calls"
+        else:
+            text = reply_text(last_user)
+            message = {"role": "assistant", "content": text}
+            output_tokens = count_tokens(text)
+            finish_reason = "stop"
+
+        if not await settings.respond_after(output_tokens):
+            return error_response("openai")
+        input_tokens = count_tokens(prompt_text)
+        return {
+            "id": f"chatcmpl-mock-{settings.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                      "total_tokens": input_tokens + output_tokens}
+        }
+
+    @app.post("/v1beta/models/{model_action}")
+    async def gemini_generate_content(model_action: str, request: Request):
+        """Gemini generateContent ("{model}:generateContent")"""
+        body = await request.json()
+        texts = [part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", [])]
+        system_texts = [part.get("text", "") for part in body.get("systemInstruction", {}).get("parts", [])]
+        tools = body.get("tools", [])
+        declarations = [fn for tool in (tools if isinstance(tools, list) else [tools]) for fn in tool.get("functionDeclarations", [])]
+        tool_config = body.get("toolConfig", {})
+        tool_mode = (tool_config.get("function_calling_config") or tool_config.get("functionCallingConfig") or {}).get("mode")
+
+        if declarations and tool_mode == "ANY":
+            function = declarations[0]
+            args = tool_arguments(function.get("parameters", {}), texts[-1] if texts else "")
+            parts = [{"functionCall": {"name": function["name"], "args": args}}]
+            output_tokens = count_tokens(json.dumps(args))
+        else:
+            text = reply_text(texts[-1] if texts else "")
+            parts = [{"text": text}]
+            output_tokens = count_tokens(text)
+
+        if not await settings.respond_after(output_tokens):
+            return error_response("gemini")
+        input_tokens = count_tokens("\n".join(system_texts + texts))
+        return {
+            "candidates": [{"content": {"role": "model", "parts": parts}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": input_tokens, "candidatesTokenCount": output_tokens,
+                              "totalTokenCount": input_tokens + output_tokens},
+            "modelVersion": model_action.split(":")[0]
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": settings.requests, "errors": settings.errors, "max_in_flight": settings.max_in_flight}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Gemini-compatible model server for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Base response latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls that fail (0-1)")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of failed calls (e.g. 429, 503)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Output generation rate; 0 returns instantly after the latency")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = MockSettings(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.tokens_per_second, args.seed)
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import httpx
+
+from run_benchmarks import api_profiles, backend_server, git_commit, latency_summary, mock_llm_server
+
+
+async def saturate(client: httpx.AsyncClient, profiles: List[Dict[str, Any]], args) -> Dict[str, int]:
+    """Keep bulk /analyze requests going until cancelled"""
+    counts = {"succeeded": 0, "failed": 0}
+    batches = [profiles[i:i + args.batch_size] for i in range(0, len(profiles), args.batch_size)]
+
+    async def sender(offset: int):
+        index = offset
+        while True:
+            response = await client.post("/analyze", params={"use_cache": False},
+                                         json={"students": batches[index % len(batches)]}, headers={"X-Tenant-ID": "bulk-importer"})
+            for result in response.json().get("results", []) if response.status_code == 200 else []:
+                counts["succeeded" if result.get("status") == "success" else "failed"] += 1
+            index += args.bulk_requests
+
+    tasks = [asyncio.create_task(sender(offset)) for offset in range(args.bulk_requests)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return counts
+
+
+async def probe(server_url: str, args, with_bulk: bool) -> Dict[str, Any]:
+    """Interactive /analyze-single latency, optionally while bulk batches saturate the model quota"""
+    bulk_profiles = api_profiles(args.bulk_students, args.seed)
+    interactive_profiles = api_profiles(args.interactive_requests, args.seed + 1)
+    bulk_counts: Dict[str, int] = {"succeeded": 0, "failed": 0}
+    async with httpx.AsyncClient(base_url=server_url, timeout=None) as client:
+        # One untimed request so the first probe does not pay for building the agents
+        await client.post("/analyze-single", json=interactive_profiles[0])
+        bulk = None
+        if with_bulk:
+            bulk = asyncio.create_task(saturate(client, bulk_profiles, args))
+            await asyncio.sleep(args.bulk_head_start)
+        latencies, errors = [], 0
+        for profile in interactive_profiles:
+            started = time.perf_counter()
+            response = await client.post("/analyze-single", params={"use_cache": False, "fields": "classification"},
+                                         json=profile, headers={"X-Tenant-ID": "counselor"})
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code != 200
+            await asyncio.sleep(args.interactive_interval)
+        scheduler = (await client.get("/scheduler/stats")).json()
+        if bulk is not None:
+            bulk.cancel()
+            try:
+                await bulk
+            except asyncio.CancelledError:
+                pass
+    return {
+        "interactive_requests": len(latencies),
+        "interactive_errors": errors,
+        "interactive_latency": latency_summary(latencies),
+        "lanes": scheduler.get("lanes"),
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "config": vars(args),
+        "runs": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="benchmark_priority_")
+    runs = [("idle", args.interactive_weights[0], False)] + [(f"bulk_weight_{weight:g}", weight, True) for weight in args.interactive_weights]
+    with mock_llm_server(args, workdir) as mock:
+        for name, weight, with_bulk in runs:
+            print(f"Running {name}...", file=sys.stderr)
+            run_dir = os.path.join(workdir, name)
+            os.makedirs(run_dir)
+            server = backend_server(args, run_dir, mock, extra_env={"INTERACTIVE_LANE_WEIGHT": str(weight)})
+            with server:
+                report["runs"][name] = asyncio.run(probe(server.url, args, with_bulk))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interactive /analyze-single latency while bulk /analyze batches saturate the model quota")
+    parser.add_argument("--interactive-weights", default="10,1", help="Comma-separated INTERACTIVE_LANE_WEIGHT values to run under bulk load")
+    parser.add_argument("--requests-per-minute", type=float, default=120, help="Server LLM_REQUESTS_PER_MINUTE; bulk load exhausts it")
+    parser.add_argument("--interactive-requests", type=int, default=20, help="Sequential /analyze-single probes per run")
+    parser.add_argument("--interactive-interval", type=float, default=0.5, help="Seconds between probes")
+    parser.add_argument("--bulk-students", type=int, default=400, help="Distinct profiles cycled through by the bulk senders")
+    parser.add_argument("--bulk-requests", type=int, default=2, help="Concurrent bulk /analyze requests")
+    parser.add_argument("--bulk-head-start", type=float, default=5.0, help="Seconds of bulk load (enough to drain the quota's burst) before probing")
+    parser.add_argument("--batch-size", type=int, default=50, help="Profiles per bulk /analyze request")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Server LLM_MAX_CONCURRENCY")
+    parser.add_argument("--backend", default="local", choices=["local", "gemini"])
+    parser.add_argument("--mode", default="two_step", choices=["two_step", "single_call"])
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_priority_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+    args.interactive_weights = [float(weight) for weight in args.interactive_weights.split(",") if weight.strip()]
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({name: {"p50_ms": run["interactive_latency"]["p50_ms"], "p95_ms": run["interactive_latency"]["p95_ms"],
+                             "bulk_dropped": (run["lanes"] or {}).get("bulk", {}).get("dropped")}
+                      for name, run in report["runs"].items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
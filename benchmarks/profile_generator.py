@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import random
+from typing import Any, Dict, Iterator, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_PATH = os.path.join(REPO_ROOT, "data", "studentProfile.json")
+TAXONOMY_PATH = os.path.join(REPO_ROOT, "data", "classification.json")
+
+FIRST_NAMES = ["Amina", "Brian", "Chen", "Daniela", "Elijah", "Fatima", "George", "Hana", "Ivan", "Joy",
+               "Kwame", "Lina", "Mateo", "Nia", "Omar", "Priya", "Quinn", "Rosa", "Sam", "Tariq"]
+LAST_NAMES = ["Achieng", "Barasa", "Chen", "Diaz", "Eze", "Fischer", "Gupta", "Hassan", "Ito", "Juma",
+              "Kamau", "Lopez", "Mwangi", "Nakamura", "Otieno", "Patel", "Rossi", "Silva", "Tanaka", "Wanjiru"]
+LEVELS = ["Basic", "Intermediate", "Advanced", "Expert"]
+
+
+def load_templates(path: str = TEMPLATE_PATH) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["students"]
+
+
+def load_skill_pool(path: str = TAXONOMY_PATH) -> List[str]:
+    """Every skill named in the taxonomy's skill clusters, to vary generated profiles"""
+    with open(path, "r", encoding="utf-8") as f:
+        skill_analysis = json.load(f)["classificationSystem"]["skillAnalysis"]
+    return sorted({skill for clusters in skill_analysis.values() if isinstance(clusters, list)
+                   for cluster in clusters if isinstance(cluster, dict) for skill in cluster.get("skills", [])})
+
+
+def generate_profiles(count: int, seed: int = 0, templates: List[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield count varied copies of the sample profiles (the nested data/studentProfile.json format)"""
+    rng = random.Random(seed)
+    # Re-parsing serialized templates is much cheaper than deepcopy at 100k profiles
+    encoded = [json.dumps(template) for template in templates or load_templates()]
+    skill_pool = load_skill_pool()
+    for i in range(count):
+        profile = json.loads(encoded[i % len(encoded)])
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        personal = profile["personalInformation"]
+        personal["fullName"] = f"{first} {last} {i}"
+        personal["contactInformation"]["email"] = f"{first}.{last}.{i}@example.edu".lower()
+
+        skills = profile["skillsAndCompetencies"]["technicalSkills"]
+        for language in skills["programmingLanguages"]:
+            language["level"] = rng.choice(LEVELS)
+        skills["otherTechnicalSkills"] = rng.sample(skills["otherTechnicalSkills"], k=max(1, len(skills["otherTechnicalSkills"]) - 1)) + rng.sample(skill_pool, 3)
+        goals = profile["learningPreferencesAndGoals"]["learningGoals"]
+        goals["specificSkillsToAcquire"] = rng.sample(skill_pool, 3)
+        yield profile
+
+
+def to_api_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a nested sample profile into the API's ComprehensiveStudentProfile format"""
+    personal = profile.get("personalInformation", {})
+    academic = profile.get("academicBackground", {})
+    competencies = profile.get("skillsAndCompetencies", {})
+    technical = competencies.get("technicalSkills", {})
+    soft = competencies.get("softSkills", {})
+    spoken = competencies.get("languagesSpoken", {})
+    experience = profile.get("professionalExperience", {})
+    career = profile.get("careerGoalsAndAspirations", {})
+    learning = profile.get("learningPreferencesAndGoals", {})
+    learning_goals = learning.get("learningGoals", {})
+    feedback = profile.get("feedbackAndSupport", {})
+    previous = feedback.get("previousExperienceWithPersonalizedLearning", {})
+    return {
+        "fullName": personal.get("fullName"),
+        "dateOfBirth": personal.get("dateOfBirth"),
+        "gender": personal.get("gender"),
+        "email": personal.get("contactInformation", {}).get("email"),
+        "countryOfResidence": personal.get("countryOfResidence"),
+        "preferredLanguages": personal.get("preferredLanguages", []),
+        "highestEducation": academic.get("highestLevelOfEducation"),
+        "fieldsOfStudy": academic.get("fieldsOfStudy", []),
+        "institutions": academic.get("nameOfInstitutions", []),
+        "graduationYear": academic.get("graduationYear"),
+        "achievements": academic.get("academicAchievementsAndHonors", []),
+        "enrollmentStatus": academic.get("currentEnrollmentStatus"),
+        "programmingLanguages": technical.get("programmingLanguages", []),
+        "softwareProficiency": technical.get("softwareProficiency", []),
+        "otherTechnicalSkills": technical.get("otherTechnicalSkills", []),
+        "communication": soft.get("communication"),
+        "teamwork": soft.get("teamwork"),
+        "problemSolving": soft.get("problemSolving"),
+        "leadership": soft.get("leadership"),
+        "timeManagement": soft.get("timeManagement"),
+        "nativeLanguage": spoken.get("nativeLanguage"),
+        "otherLanguages": spoken.get("otherLanguages", []),
+        "certifications": competencies.get("certificationsAndLicenses", []),
+        "employmentStatus": experience.get("currentEmploymentStatus"),
+        "jobTitles": experience.get("jobTitlesAndRoles", []),
+        "employers": experience.get("nameOfEmployers", []),
+        "employmentDuration": experience.get("durationOfEmployment", []),
+        "responsibilities": experience.get("keyResponsibilitiesAndAchievements", []),
+        "volunteerWork": experience.get("internshipsAndVolunteerWork", []),
+        "shortTermGoals": career.get("shortTermCareerGoals"),
+        "longTermGoals": career.get("longTermCareerGoals"),
+        "preferredIndustries": career.get("preferredIndustryField", []),
+        "desiredJobTitles": career.get("desiredJobTitleRole", []),
+        "motivation": career.get("motivationForCareerChoice"),
+        "keyFactors": career.get("keyFactorsInfluencingCareerDecisions", []),
+        "learningStyle": learning.get("preferredLearningStyle", []),
+        "skillsToAcquire": learning_goals.get("specificSkillsToAcquire", []),
+        "knowledgeAreas": learning_goals.get("knowledgeAreasToExplore", []),
+        "learningChallenges": learning.get("challengesFacedInLearning", []),
+        "preferredFeedback": feedback.get("preferredTypeOfFeedback", []),
+        "supportNeeded": feedback.get("supportNeededToAchieveGoals", []),
+        "positiveAspects": previous.get("positiveAspects"),
+        "areasForImprovement": previous.get("areasForImprovement"),
+    }
+
+
+def write_profiles(path: str, count: int, seed: int = 0, api_format: bool = False):
+    """Stream count generated profiles to a .ndjson/.jsonl file or a {"students": [...]} JSON file"""
+    profiles = generate_profiles(count, seed)
+    if api_format:
+        profiles = (to_api_profile(profile) for profile in profiles)
+    ndjson = path.endswith((".ndjson", ".jsonl"))
+    with open(path, "w", encoding="utf-8") as f:
+        if not ndjson:
+            f.write('{"students": [\n')
+        for i, profile in enumerate(profiles):
+            if i and not ndjson:
+                f.write(",\n")
+            f.write(json.dumps(profile))
+            if ndjson:
+                f.write("\n")
+        if not ndjson:
+            f.write("\n]}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic student profiles by varying data/studentProfile.json")
+    parser.add_argument("output", help="Output file: .json ({\"students\": [...]}) or .ndjson/.jsonl")
+    parser.add_argument("--count", type=int, default=1000, help="Number of profiles (up to 100k and beyond)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--api-format", action="store_true", help="Write the flat API format instead of the nested CLI format")
+    args = parser.parse_args()
+    write_profiles(args.output, args.count, args.seed, args.api_format)
+    print(f"Wrote {args.count} profiles to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List
+
+import httpx
+
+from profile_generator import load_skill_pool
+from run_benchmarks import api_profiles, backend_server, git_commit, mock_llm_server
+
+
+def cohort(students: int, distinct_gaps: int, gap_size: int, seed: int) -> List[Dict[str, Any]]:
+    """Generated profiles whose skillsToAcquire are drawn from distinct_gaps shared skill sets, as in a real cohort"""
+    rng = random.Random(seed)
+    pool = load_skill_pool()
+    gaps = [rng.sample(pool, gap_size) for _ in range(distinct_gaps)]
+    profiles = api_profiles(students, seed)
+    for profile in profiles:
+        profile["skillsToAcquire"] = rng.choice(gaps)
+    return profiles
+
+
+async def analyze_cohort(server_url: str, profiles: List[Dict[str, Any]], batch_size: int, concurrency: int) -> Dict[str, Any]:
+    batches = [profiles[i:i + batch_size] for i in range(0, len(profiles), batch_size)]
+    sources = Counter()
+    queue = iter(batches)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=server_url, timeout=None) as client:
+        async def worker():
+            for batch in queue:
+                response = await client.post("/analyze", params={"use_cache": True}, json={"students": batch})
+                for result in response.json().get("results", []):
+                    sources[result.get("recommendation_source") or result.get("status")] += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    return {
+        "seconds": round(seconds, 3),
+        "students_per_second": round(len(profiles) / seconds, 2),
+        "recommendation_sources": dict(sources),
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    report = {"timestamp": datetime.now().isoformat(), "git_commit": git_commit(), "config": vars(args), "modes": {}}
+    workdir = tempfile.mkdtemp(prefix="benchmark_recommendations_")
+    profiles = cohort(args.students, args.distinct_gaps, args.gap_size, args.seed)
+    with mock_llm_server(args, workdir) as mock:
+        for mode in ("off", "on"):
+            print(f"Analyzing {args.students} students with RECOMMENDATION_LIBRARY_MODE={mode}...", file=sys.stderr)
+            run_dir = os.path.join(workdir, mode)
+            os.makedirs(run_dir)
+            model_calls_before = httpx.get(f"{mock.url}/stats").json()["requests"]
+            server = backend_server(args, run_dir, mock, extra_env={"RECOMMENDATION_LIBRARY_MODE": mode})
+            with server:
+                result = asyncio.run(analyze_cohort(server.url, profiles, args.batch_size, args.concurrency))
+                result["library"] = httpx.get(f"{server.url}/recommendation-library/stats").json()
+            result["model_calls"] = httpx.get(f"{mock.url}/stats").json()["requests"] - model_calls_before
+            result["model_calls_per_student"] = round(result["model_calls"] / args.students, 3)
+            report["modes"][mode] = result
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model calls and throughput with and without the recommendation library")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--distinct-gaps", type=int, default=20, help="Distinct skillsToAcquire sets shared across the cohort")
+    parser.add_argument("--gap-size", type=int, default=3, help="Skills per skillsToAcquire set")
+    parser.add_argument("--batch-size", type=int, default=20, help="Profiles per /analyze request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent client requests")
+    parser.add_argument("--llm-concurrency", type=int, default=16)
+    parser.add_argument("--backend", default="local", choices=["local", "gemini"])
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_recommendations_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+    # The library serves the recommendation call of the two-step flow
+    args.mode = "two_step"
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({mode: {key: result[key] for key in ("students_per_second", "model_calls_per_student", "recommendation_sources")}
+                      for mode, result in report["modes"].items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from profile_generator import REPO_ROOT, TAXONOMY_PATH, generate_profiles, to_api_profile, write_profiles
+
+BACKEND_DIR = os.path.join(REPO_ROOT, "backend-server")
+SCENARIOS = ("analyze", "analyze_single", "results", "cli")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, Optional[float]]:
+    if not seconds:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    return {
+        "p50_ms": round(percentile(seconds, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(seconds, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(seconds, 0.99) * 1000, 2),
+        "mean_ms": round(sum(seconds) / len(seconds) * 1000, 2),
+        "max_ms": round(max(seconds) * 1000, 2),
+    }
+
+
+def wait_for_exit(process: subprocess.Popen) -> Optional[float]:
+    """Reap a child process and return its peak RSS in MB"""
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(rusage.ru_maxrss / divisor, 1)
+
+
+class ServerProcess:
+    """A server subprocess that is polled until healthy and reports its peak RSS once stopped"""
+
+    def __init__(self, name: str, command: List[str], port: int, cwd: str, env: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.command = command
+        self.port = port
+        self.cwd = cwd
+        self.env = {**os.environ, **(env or {})}
+        self.process: Optional[subprocess.Popen] = None
+        self.peak_rss_mb: Optional[float] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 60.0):
+        log = open(os.path.join(self.cwd, f"{self.name}.log"), "ab")
+        self.process = subprocess.Popen(self.command, cwd=self.cwd, env=self.env, stdout=log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited during startup, see {log.name}")
+            try:
+                if httpx.get(f"{self.url}/health", timeout=1.0).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"{self.name} did not become healthy within {timeout}s")
+
+    def stop(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+            self.peak_rss_mb = wait_for_exit(self.process)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def mock_llm_server(args, workdir: str) -> ServerProcess:
+    port = free_port()
+    command = [
+        sys.executable, os.path.join(REPO_ROOT, "benchmarks", "mock_llm_server.py"),
+        "--port", str(port),
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--seed", str(args.seed),
+    ]
+    return ServerProcess("mock_llm", command, port, workdir)
+
+
+def backend_server(args, workdir: str, mock: ServerProcess, workers: int = 0, extra_env: Optional[Dict[str, str]] = None) -> ServerProcess:
+    """uvicorn in one process, or the gunicorn multi-worker launcher when workers is set"""
+    port = free_port()
+    if workers:
+        command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"),
+                   "--pythonpath", BACKEND_DIR, "--workers", str(workers), "--bind", f"127.0.0.1:{port}",
+                   "--log-level", "warning", "main:app"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+                   "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    env = {
+        "MODEL_BACKENDS": args.backend,
+        "LOCAL_LLM_URL": f"{mock.url}/v1",
+        "GEMINI_BASE_URL": mock.url,
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "mock"),
+        "ANALYSIS_MODE": args.mode,
+        "LLM_MAX_CONCURRENCY": str(args.llm_concurrency),
+        # The mock has no quota; keep the client-side rate limiter out of the measurement unless one is asked for
+        "LLM_REQUESTS_PER_MINUTE": str(getattr(args, "requests_per_minute", None) or 1000000000),
+        "LLM_TOKENS_PER_MINUTE": "1000000000000",
+        "TAXONOMY_PATH": TAXONOMY_PATH,
+        "CLASSIFICATION_BATCH_SIZE": str(getattr(args, "classification_batch_size", 1)),
+        **(extra_env or {}),
+    }
+    return ServerProcess("backend", command, port, workdir, env)
+
+
+async def drive(requests: List[Any], concurrency: int, send) -> Dict[str, Any]:
+    """Issue requests with at most `concurrency` in flight and time each one"""
+    latencies: List[float] = []
+    errors = 0
+    queue = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for request in queue:
+            started = time.perf_counter()
+            try:
+                ok = await send(request)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += 0 if ok else 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_seconds": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else None,
+        "latency": latency_summary(latencies),
+    }
+
+
+def api_profiles(count: int, seed: int) -> List[Dict[str, Any]]:
+    return [to_api_profile(profile) for profile in generate_profiles(count, seed)]
+
+
+async def scenario_analyze(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    profiles = api_profiles(args.students, args.seed)
+    batches = [profiles[i:i + args.batch_size] for i in range(0, len(profiles), args.batch_size)]
+    students_ok = 0
+
+    async def send(batch):
+        nonlocal students_ok
+        response = await client.post("/analyze", params={"use_cache": args.use_cache}, json={"students": batch})
+        if response.status_code != 200:
+            return False
+        students_ok += sum(1 for item in response.json()["results"] if item.get("status") == "success")
+        return True
+
+    result = await drive(batches, args.concurrency, send)
+    result.update(students=len(profiles), students_succeeded=students_ok, batch_size=args.batch_size,
+                  students_per_second=round(len(profiles) / result["duration_seconds"], 2))
+    return result
+
+
+async def scenario_analyze_single(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    profiles = api_profiles(args.students, args.seed + 1)
+
+    async def send(profile):
+        response = await client.post("/analyze-single", params={"use_cache": args.use_cache}, json=profile)
+        return response.status_code == 200
+
+    result = await drive(profiles, args.concurrency, send)
+    result.update(students=len(profiles), students_per_second=result["throughput_rps"])
+    return result
+
+
+async def scenario_results(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    listing = (await client.get("/results", params={"limit": 1000})).json()
+    names = [item["student_name"] for item in listing.get("results", [])]
+    if not names:
+        # Nothing stored yet: seed (untimed) through /analyze
+        seed = api_profiles(min(args.students, 200), args.seed + 2)
+        await client.post("/analyze", json={"students": seed})
+        names = [profile["fullName"] for profile in seed]
+
+    rng = random.Random(args.seed)
+    pages = itertools.cycle(range(0, max(len(names), 1), 50))
+    requests = [("/results/" + rng.choice(names), None) if i % 2 else ("/results", {"limit": 50, "offset": next(pages)})
+                for i in range(args.result_requests)]
+
+    async def send(request):
+        path, params = request
+        return (await client.get(path, params=params)).status_code == 200
+
+    result = await drive(requests, args.concurrency, send)
+    result["stored_results"] = len(names)
+    return result
+
+
+def scenario_cli(args, workdir: str, mock: ServerProcess) -> Dict[str, Any]:
+    input_path = os.path.join(workdir, "cli_students.ndjson")
+    write_profiles(input_path, args.cli_students, args.seed + 3)
+    report_path = os.path.join(workdir, "cli_report.json")
+    command = [sys.executable, os.path.join(REPO_ROOT, "simple_analysis.py"), input_path,
+               "--workers", str(args.concurrency), "--url", mock.url, "--report", report_path]
+    with open(os.path.join(workdir, "cli.log"), "wb") as log:
+        started = time.perf_counter()
+        process = subprocess.Popen(command, cwd=workdir, stdout=log, stderr=subprocess.STDOUT)
+        peak_rss_mb = wait_for_exit(process)
+        duration = time.perf_counter() - started
+    if process.returncode != 0 or not os.path.exists(report_path):
+        return {"error": f"CLI exited with status {process.returncode}, see {log.name}"}
+    with open(report_path) as f:
+        report = json.load(f)
+    per_student = report["stages"].get("student", {})
+    return {
+        "students": report["processed"],
+        "errors": report["processed"] - report["succeeded"],
+        "workers": report["workers"],
+        "duration_seconds": round(duration, 3),
+        "students_per_second": report["students_per_second"],
+        "latency": {key.replace("_seconds", "_ms"): round(value * 1000, 2) for key, value in per_student.items() if key.endswith("_seconds")},
+        "stages": report["stages"],
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+async def run_http_scenario(name: str, server: ServerProcess, args) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=server.url, limits=limits, timeout=None) as client:
+        if name == "analyze":
+            return await scenario_analyze(client, args)
+        if name == "analyze_single":
+            return await scenario_analyze_single(client, args)
+        return await scenario_results(client, args)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="benchmark_")
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "workdir": workdir,
+        "config": vars(args),
+        "scenarios": {},
+    }
+    with mock_llm_server(args, workdir) as mock:
+        for name in args.scenarios:
+            print(f"Running {name}...", file=sys.stderr)
+            if name == "cli":
+                report["scenarios"][name] = scenario_cli(args, workdir, mock)
+                continue
+            # A fresh server per scenario so peak RSS is attributable; results persist in the shared workdir
+            server = backend_server(args, workdir, mock)
+            with server:
+                result = asyncio.run(run_http_scenario(name, server, args))
+            result["peak_rss_mb"] = server.peak_rss_mb
+            report["scenarios"][name] = result
+        report["mock_llm"] = httpx.get(f"{mock.url}/stats").json()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the analysis API and CLI against a mock model server")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--students", type=int, default=200, help="Profiles sent by the analyze and analyze_single scenarios")
+    parser.add_argument("--cli-students", type=int, default=100, help="Profiles processed by the CLI scenario")
+    parser.add_argument("--batch-size", type=int, default=20, help="Profiles per /analyze request")
+    parser.add_argument("--result-requests", type=int, default=1000, help="GET requests in the results scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent client requests (CLI workers)")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Server LLM_MAX_CONCURRENCY")
+    parser.add_argument("--backend", default="local", choices=["local", "gemini"], help="Which model backend the server talks to the mock through")
+    parser.add_argument("--mode", default="two_step", choices=["two_step", "single_call"], help="Server ANALYSIS_MODE")
+    parser.add_argument("--use-cache", action="store_true", help="Allow LLM cache hits (off by default so every student reaches the mock)")
+    parser.add_argument("--classification-batch-size", type=int, default=1, help="Server CLASSIFICATION_BATCH_SIZE (1 = one classification call per student)")
+    parser.add_argument("--requests-per-minute", type=float, default=None, help="Server LLM_REQUESTS_PER_MINUTE (default: unlimited)")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Mock model base latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="Mock model latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock model calls that fail")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Mock model output token rate (0 = instant)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import httpx
+
+from run_benchmarks import BACKEND_DIR, free_port, git_commit
+
+# Modules the backend defers until first use or the background warm-up; importing main must not load them
+DEFERRED_MODULES = ("pydantic_ai", "scipy", "numpy", "batch_scoring", "semantic_cache", "uvicorn")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `python -X importtime` output into {module, self_us, cumulative_us, depth} rows"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": (len(name) - len(name.lstrip(" ")) - 1) // 2,
+        })
+    return rows
+
+
+def measure_import(env: Dict[str, str], workdir: str) -> Dict[str, Any]:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=workdir, env={**env, "PYTHONPATH": BACKEND_DIR}, capture_output=True, text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{process.stderr[-2000:]}")
+    rows = parse_importtime(process.stderr)
+    main_index = next(index for index, row in enumerate(rows) if row["module"] == "main")
+    # importtime lists a module after its children, so main's direct imports are the depth-1 rows just above it
+    first_child = main_index
+    while first_child > 0 and rows[first_child - 1]["depth"] > 0:
+        first_child -= 1
+    children = [row for row in rows[first_child:main_index] if row["depth"] == 1]
+    imported = {row["module"] for row in rows}
+    return {
+        "import_main_ms": round(rows[main_index]["cumulative_us"] / 1000, 1),
+        "main_self_ms": round(rows[main_index]["self_us"] / 1000, 1),
+        "main_imports": [
+            {"module": row["module"], "cumulative_ms": round(row["cumulative_us"] / 1000, 1)}
+            for row in sorted(children, key=lambda row: -row["cumulative_us"])[:15]
+        ],
+        "deferred_modules_loaded": [name for name in DEFERRED_MODULES if name in imported],
+    }
+
+
+def measure_health(env: Dict[str, str], workdir: str, timeout: float = 30.0) -> Dict[str, Any]:
+    """Seconds from spawning uvicorn to the first 200 from /health, and until the warm-up has finished"""
+    port = free_port()
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+               "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    healthy = warmed = None
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout and warmed is None:
+                if process.poll() is not None:
+                    raise RuntimeError("server exited during startup")
+                try:
+                    response = client.get(f"http://127.0.0.1:{port}/health")
+                except httpx.HTTPError:
+                    time.sleep(0.005)
+                    continue
+                if response.status_code == 200:
+                    elapsed = time.perf_counter() - started
+                    healthy = healthy if healthy is not None else elapsed
+                    if response.json().get("warmed_up"):
+                        warmed = elapsed
+                time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        "health_ms": round(healthy * 1000, 1) if healthy is not None else None,
+        "warmed_up_ms": round(warmed * 1000, 1) if warmed is not None else None,
+    }
+
+
+def median(values: List[float]) -> float:
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 1) if values else None
+
+
+def run(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="benchmark_startup_")
+    env = {**os.environ, "MODEL_BACKENDS": args.backends}
+    imports = [measure_import(env, workdir) for _ in range(args.runs)]
+    health = [measure_health(env, workdir) for _ in range(args.runs)]
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "config": vars(args),
+        "import_main_ms": median([run["import_main_ms"] for run in imports]),
+        "main_self_ms": median([run["main_self_ms"] for run in imports]),
+        "health_ms": median([run["health_ms"] for run in health]),
+        "warmed_up_ms": median([run["warmed_up_ms"] for run in health]),
+        "deferred_modules_loaded": imports[0]["deferred_modules_loaded"],
+        "main_imports": imports[0]["main_imports"],
+        "runs": {"import": imports, "health": health},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start report for the backend: python -X importtime of main and time to first /health")
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions; medians are reported")
+    parser.add_argument("--backends", default="stub", help="MODEL_BACKENDS for the measured server")
+    parser.add_argument("--max-import-ms", type=float, default=None, help="Fail if the median import of main exceeds this")
+    parser.add_argument("--max-health-ms", type=float, default=None, help="Fail if the median time to first /health exceeds this")
+    parser.add_argument("--output", default="benchmark_startup_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({key: value for key, value in report.items() if key != "runs"}, indent=2))
+
+    failures = []
+    if report["deferred_modules_loaded"]:
+        failures.append(f"importing main loaded deferred modules: {', '.join(report['deferred_modules_loaded'])}")
+    if args.max_import_ms is not None and report["import_main_ms"] > args.max_import_ms:
+        failures.append(f"import main took {report['import_main_ms']} ms (budget {args.max_import_ms} ms)")
+    if args.max_health_ms is not None and (report["health_ms"] is None or report["health_ms"] > args.max_health_ms):
+        failures.append(f"first /health after {report['health_ms']} ms (budget {args.max_health_ms} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+from typing import Any, Dict
+
+import httpx
+
+from run_benchmarks import backend_server, git_commit, mock_llm_server, run_http_scenario
+
+
+def run(args) -> Dict[str, Any]:
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "workers": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="benchmark_scaling_")
+    with mock_llm_server(args, workdir) as mock:
+        for workers in args.workers:
+            print(f"Running {args.scenario} with {workers} worker(s)...", file=sys.stderr)
+            # Separate state per run so one run's cached results cannot speed up the next
+            run_dir = os.path.join(workdir, f"workers_{workers}")
+            os.makedirs(run_dir)
+            server = backend_server(args, run_dir, mock, workers=workers)
+            with server:
+                result = asyncio.run(run_http_scenario(args.scenario, server, args))
+            report["workers"][str(workers)] = result
+        report["mock_llm"] = httpx.get(f"{mock.url}/stats").json()
+
+    baseline = report["workers"][str(args.workers[0])]["students_per_second"]
+    for workers, result in report["workers"].items():
+        result["speedup"] = round(result["students_per_second"] / baseline, 2) if baseline else None
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the gunicorn multi-worker launcher by worker count, against the mock model server")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to compare")
+    parser.add_argument("--scenario", default="analyze_single", choices=["analyze", "analyze_single"])
+    parser.add_argument("--students", type=int, default=2000, help="Profiles sent per worker count")
+    parser.add_argument("--batch-size", type=int, default=20, help="Profiles per /analyze request")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent client requests")
+    parser.add_argument("--llm-concurrency", type=int, default=32, help="Server LLM_MAX_CONCURRENCY per worker")
+    parser.add_argument("--backend", default="local", choices=["local", "gemini"])
+    parser.add_argument("--mode", default="two_step", choices=["two_step", "single_call"])
+    parser.add_argument("--use-cache", action="store_true")
+    # A fast mock makes the server's own CPU work the bottleneck, which is what extra workers add capacity for
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_scaling_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+    args.workers = [int(count) for count in args.workers.split(",") if count.strip()]
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({workers: {key: result[key] for key in ("students_per_second", "speedup", "latency")}
+                      for workers, result in report["workers"].items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
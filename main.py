@@ -1,6 +1,9 @@
 import json
 import requests
 
+# Keep-alive session so repeated calls reuse the connection to LM Studio
+session = requests.Session()
+
 def call_llm(prompt, endpoint="http://localhost:1234/v1/chat/completions"):
     """
     Sends a prompt to the local LLM endpoint and returns the response text.
@@ -22,7 +25,7 @@ def call_llm(prompt, endpoint="http://localhost:1234/v1/chat/completions"):
     })
 
     try:
-        response = requests.post(endpoint, headers=headers, data=payload) # Uncomment locally
+        response = session.post(endpoint, headers=headers, data=payload) # Uncomment locally
         response.raise_for_status() 
         llm_response = response.json()
         # Extract the actual text response based on LM Studio's output format
@@ -1,15 +1,44 @@
+import argparse
 import requests
 import json
 import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
 
-def analyze_with_lm_studio(profile_data, lm_studio_url="http://localhost:1234"):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend-server"))
+from ingestion import iter_records_file
+
+DEFAULT_LM_STUDIO_URL = "http://localhost:1234"
+# (connect, read) seconds, so a hung request fails its student instead of holding a worker forever
+DEFAULT_TIMEOUT = (5.0, 120.0)
+
+_session = None
+_session_lock = threading.Lock()
+_print_lock = threading.Lock()
+
+def get_session(pool_size=10):
+    """Shared keep-alive session so every call reuses pooled connections to LM Studio"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+def analyze_with_lm_studio(profile_data, lm_studio_url=DEFAULT_LM_STUDIO_URL, session=None, timeout=DEFAULT_TIMEOUT):
     prompt = f"""Analyze the following user profile and classify their primary area of interest (e.g., Blockchain Development, AI Engineering, etc.) based on their skills, experience, and career goals: {json.dumps(profile_data)}"""
     classification = None
+    session = session or get_session()
     try:
-        response = requests.post(f"{lm_studio_url}/v1/chat/completions", json={
+        response = session.post(f"{lm_studio_url}/v1/chat/completions", json={
             "messages": [{"role": "user", "content": prompt}],
             "max_tokens": 100
-        })
+        }, timeout=timeout)
         response.raise_for_status()  # Raise an exception for bad status codes
         result = response.json()
         classification = result['choices'][0]['message']['content'].strip()
@@ -23,47 +52,150 @@ def analyze_with_lm_studio(profile_data, lm_studio_url="http://localhost:1234"):
         print(f"Classification saved to: {filepath}")
 
         return classification
+    except requests.exceptions.Timeout as e:
+        print(f"Timed out waiting for LM Studio: {e}")
+        return None
     except requests.exceptions.RequestException as e:
         print(f"Error connecting to LM Studio: {e}")
         return None
 
-def recommend_tasks(classification, lm_studio_url="http://localhost:1234"):
+def recommend_tasks(classification, lm_studio_url=DEFAULT_LM_STUDIO_URL, session=None, timeout=DEFAULT_TIMEOUT):
+    """Recommended tasks for a classification, or None when the request failed or timed out"""
     prompt = f"Based on the profile classification: '{classification}', recommend 2-3 specific learning tasks or areas to explore."
     recommendations = []
+    session = session or get_session()
     try:
-        response = requests.post(f"{lm_studio_url}/v1/chat/completions", json={
+        response = session.post(f"{lm_studio_url}/v1/chat/completions", json={
             "messages": [{"role": "user", "content": prompt}],
             "max_tokens": 150
-        })
+        }, timeout=timeout)
         response.raise_for_status()
         result = response.json()
         recommendations = [task.strip() for task in result['choices'][0]['message']['content'].strip().split('\n') if task.strip()]
         return recommendations
+    except requests.exceptions.Timeout as e:
+        print(f"Timed out waiting for a recommendation: {e}")
+        return None
     except requests.exceptions.RequestException as e:
         print(f"Error during recommendation: {e}")
-        return []
+        return None
+
+def load_students(filepath):
+    """Stream student records one at a time from a {"students": [...]} JSON file or an NDJSON file"""
+    return iter_records_file(filepath)
+
+def process_student(student, lm_studio_url=DEFAULT_LM_STUDIO_URL, session=None, timeout=DEFAULT_TIMEOUT):
+    """Classify then recommend for one student, returning its report lines and stage timings"""
+    name = student.get('personalInformation', {}).get('fullName', 'unknown')
+    lines = []
+    timings = {}
+
+    student_started = started = time.perf_counter()
+    classification = analyze_with_lm_studio(student, lm_studio_url, session, timeout)
+    timings["classify"] = time.perf_counter() - started
+    if not classification:
+        lines.append(f"Failed to classify profile for {name}.")
+        timings["student"] = time.perf_counter() - student_started
+        return lines, timings, False
 
-def load_json(filepath):
-    with open(filepath, 'r') as f:
-        return json.load(f)
+    lines.append(f"Profile Classification for {name}: {classification}")
+    started = time.perf_counter()
+    recommendations = recommend_tasks(classification, lm_studio_url, session, timeout)
+    timings["recommend"] = time.perf_counter() - started
+    timings["student"] = time.perf_counter() - student_started
+    if recommendations is None:
+        lines.append(f"Failed to get recommendations for {name}.")
+        return lines, timings, False
+    if recommendations:
+        lines.append("Recommended Tasks:")
+        lines.extend(f"- {task}" for task in recommendations)
+    return lines, timings, True
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def timing_summary(stage_timings, processed, succeeded, elapsed, workers):
+    """Throughput and per-stage latency percentiles of a pipeline run"""
+    return {
+        "processed": processed,
+        "succeeded": succeeded,
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "students_per_second": round(processed / elapsed if elapsed else 0, 3),
+        "stages": {
+            stage: {
+                "count": len(values),
+                "avg_seconds": round(sum(values) / len(values), 4),
+                "p50_seconds": round(percentile(values, 0.5), 4),
+                "p95_seconds": round(percentile(values, 0.95), 4),
+                "p99_seconds": round(percentile(values, 0.99), 4)
+            }
+            for stage, values in stage_timings.items() if values
+        }
+    }
+
+def print_timing_summary(summary):
+    print(f"\nProcessed {summary['processed']} students ({summary['succeeded']} succeeded) in {summary['elapsed_seconds']:.2f}s "
+          f"with {summary['workers']} worker(s): {summary['students_per_second']:.2f} students/s")
+    for stage, stats in summary["stages"].items():
+        print(f"  {stage}: avg {stats['avg_seconds']:.3f}s, "
+              f"p50 {stats['p50_seconds']:.3f}s, p95 {stats['p95_seconds']:.3f}s, p99 {stats['p99_seconds']:.3f}s")
+
+def run_pipeline(students, workers=1, lm_studio_url=DEFAULT_LM_STUDIO_URL, timeout=DEFAULT_TIMEOUT):
+    """Pipeline students through classify and recommend with up to `workers` requests in flight"""
+    session = get_session(pool_size=workers)
+    stage_timings = {"classify": [], "recommend": [], "student": []}
+    processed = succeeded = 0
+    started = time.perf_counter()
+
+    def report(future):
+        nonlocal processed, succeeded
+        lines, timings, ok = future.result()
+        processed += 1
+        succeeded += int(ok)
+        for stage, seconds in timings.items():
+            stage_timings[stage].append(seconds)
+        with _print_lock:
+            print("\n".join(lines))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        for student in students:
+            in_flight.add(executor.submit(process_student, student, lm_studio_url, session, timeout))
+            # Keep reading the input lazily: at most two students queued per worker
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report(future)
+        for future in wait(in_flight).done:
+            report(future)
+
+    summary = timing_summary(stage_timings, processed, succeeded, time.perf_counter() - started, workers)
+    print_timing_summary(summary)
+    return summary
 
 def main():
-    student_profile_data = load_json("data/studentProfile.json")
-
-    if student_profile_data and 'students' in student_profile_data:
-        for student in student_profile_data['students']:
-            classification = analyze_with_lm_studio(student)
-            if classification:
-                print(f"Profile Classification for {student['personalInformation']['fullName']}: {classification}")
-                recommendations = recommend_tasks(classification)
-                if recommendations:
-                    print("Recommended Tasks:")
-                    for task in recommendations:
-                        print(f"- {task}")
-            else:
-                print(f"Failed to classify profile for {student['personalInformation']['fullName']}.")
-    else:
-        print("Failed to load student profile data correctly.")
+    parser = argparse.ArgumentParser(description="Classify student profiles and recommend learning tasks with a local LM Studio model")
+    parser.add_argument("input", nargs="?", default="data/studentProfile.json", help="JSON ({\"students\": [...]}) or NDJSON file of student profiles")
+    parser.add_argument("--workers", type=int, default=1, help="Number of concurrent requests to LM Studio (default: 1)")
+    parser.add_argument("--url", default=DEFAULT_LM_STUDIO_URL, help=f"LM Studio server URL (default: {DEFAULT_LM_STUDIO_URL})")
+    parser.add_argument("--connect-timeout", type=float, default=DEFAULT_TIMEOUT[0], help=f"Seconds to wait for a connection to LM Studio (default: {DEFAULT_TIMEOUT[0]:g})")
+    parser.add_argument("--read-timeout", type=float, default=DEFAULT_TIMEOUT[1], help=f"Seconds to wait for each LM Studio response; a timed-out student counts as failed (default: {DEFAULT_TIMEOUT[1]:g})")
+    parser.add_argument("--report", help="Also write the timing summary as JSON to this file")
+    args = parser.parse_args()
+
+    try:
+        summary = run_pipeline(load_students(args.input), workers=max(1, args.workers), lm_studio_url=args.url,
+                               timeout=(args.connect_timeout, args.read_timeout))
+    except (OSError, ValueError) as e:
+        print(f"Failed to load student profile data correctly: {e}")
+        return
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(summary, f, indent=4)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()